@@ -0,0 +1,54 @@
+"""Unique attendance per member and per-status meeting counters
+
+Revision ID: 0b9e4f7a2c63
+Revises: f3a6d1c8b572
+Create Date: 2026-10-17 20:41:53.902611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b9e4f7a2c63'
+down_revision: Union[str, Sequence[str], None] = 'f3a6d1c8b572'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTERS = {'SI': 'attendeeCount', 'TAL_VEZ': 'maybeCount', 'NO': 'declinedCount'}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    attendance = sa.table('meeting_attendance', sa.column('id'), sa.column('meeting_id'), sa.column('user_id'), sa.column('status'))
+    # Keep each member's latest answer so the unique constraint can be created
+    latest = sa.select(sa.func.max(attendance.c.id)).group_by(attendance.c.meeting_id, attendance.c.user_id)
+    op.execute(attendance.delete().where(attendance.c.id.not_in(latest)))
+    with op.batch_alter_table('meeting_attendance') as batch_op:
+        batch_op.drop_index('ix_meeting_attendance_meeting_id')
+        batch_op.create_unique_constraint('uq_meeting_attendance_meeting_user', ['meeting_id', 'user_id'])
+
+    op.add_column('meetings', sa.Column('maybeCount', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('meetings', sa.Column('declinedCount', sa.Integer(), server_default='0', nullable=False))
+    meetings = sa.table('meetings', sa.column('id'), *[sa.column(name) for name in COUNTERS.values()])
+    op.execute(meetings.update().values({
+        name: sa.select(sa.func.count())
+            .where(attendance.c.meeting_id == meetings.c.id, attendance.c.status == status)
+            .scalar_subquery()
+        for status, name in COUNTERS.items()
+    }))
+    with op.batch_alter_table('meetings') as batch_op:
+        batch_op.alter_column('attendeeCount', existing_type=sa.Integer(), nullable=False, server_default='0')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('meetings') as batch_op:
+        batch_op.alter_column('attendeeCount', existing_type=sa.Integer(), nullable=True, server_default=None)
+        batch_op.drop_column('declinedCount')
+        batch_op.drop_column('maybeCount')
+    with op.batch_alter_table('meeting_attendance') as batch_op:
+        batch_op.drop_constraint('uq_meeting_attendance_meeting_user', type_='unique')
+        batch_op.create_index('ix_meeting_attendance_meeting_id', ['meeting_id'], unique=False)
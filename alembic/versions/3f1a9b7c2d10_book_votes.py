@@ -0,0 +1,39 @@
+"""Book votes ledger
+
+Revision ID: 3f1a9b7c2d10
+Revises: c22c9f2ca0eb
+Create Date: 2026-10-17 09:12:41.503117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1a9b7c2d10'
+down_revision: Union[str, Sequence[str], None] = 'c22c9f2ca0eb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('book_votes',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_date', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['book_id'], ['libros.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('book_id', 'user_id', name='uq_book_votes_book_user')
+    )
+    op.create_index(op.f('ix_book_votes_id'), 'book_votes', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_book_votes_id'), table_name='book_votes')
+    op.drop_table('book_votes')
@@ -0,0 +1,48 @@
+"""Per-book review aggregates
+
+Revision ID: 5b7c9e1d3a42
+Revises: 8d4e2a6b1f37
+Create Date: 2026-10-17 12:40:05.918233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7c9e1d3a42'
+down_revision: Union[str, Sequence[str], None] = '8d4e2a6b1f37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('review_stats',
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('review_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('rating_1', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('rating_2', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('rating_3', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('rating_4', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('rating_5', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['book_id'], ['libros.id'], ),
+    sa.PrimaryKeyConstraint('book_id')
+    )
+    # Backfill from the reviews already there
+    op.execute(
+        "INSERT INTO review_stats (book_id, review_count, rating_sum, rating_1, rating_2, rating_3, rating_4, rating_5) "
+        "SELECT book_id, COUNT(*), COALESCE(SUM(rating), 0), "
+        "SUM(CASE WHEN rating = 1 THEN 1 ELSE 0 END), SUM(CASE WHEN rating = 2 THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN rating = 3 THEN 1 ELSE 0 END), SUM(CASE WHEN rating = 4 THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN rating = 5 THEN 1 ELSE 0 END) "
+        "FROM reviews GROUP BY book_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('review_stats')
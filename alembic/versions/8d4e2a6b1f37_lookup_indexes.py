@@ -0,0 +1,34 @@
+"""Indexes for foreign-key lookups
+
+Revision ID: 8d4e2a6b1f37
+Revises: 3f1a9b7c2d10
+Create Date: 2026-10-17 11:02:18.274906
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4e2a6b1f37'
+down_revision: Union[str, Sequence[str], None] = '3f1a9b7c2d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_libros_club_id_id', 'libros', ['club_id', 'id'], unique=False)
+    op.create_index('ix_reviews_club_id_book_id', 'reviews', ['club_id', 'book_id'], unique=False)
+    op.create_index('ix_meetings_club_id_id', 'meetings', ['club_id', 'id'], unique=False)
+    op.create_index('ix_meeting_attendance_meeting_id', 'meeting_attendance', ['meeting_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_meeting_attendance_meeting_id', table_name='meeting_attendance')
+    op.drop_index('ix_meetings_club_id_id', table_name='meetings')
+    op.drop_index('ix_reviews_club_id_book_id', table_name='reviews')
+    op.drop_index('ix_libros_club_id_id', table_name='libros')
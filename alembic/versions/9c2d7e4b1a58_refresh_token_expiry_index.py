@@ -0,0 +1,28 @@
+"""Refresh token expiry index
+
+Revision ID: 9c2d7e4b1a58
+Revises: 0b9e4f7a2c63
+Create Date: 2026-10-17 22:05:31.417206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c2d7e4b1a58'
+down_revision: Union[str, Sequence[str], None] = '0b9e4f7a2c63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_refresh_tokens_expires_at'), 'refresh_tokens', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_refresh_tokens_expires_at'), table_name='refresh_tokens')
@@ -0,0 +1,50 @@
+"""Per-member reading progress and club rollup
+
+Revision ID: a6f3d8c2e915
+Revises: 5b7c9e1d3a42
+Create Date: 2026-10-17 14:18:52.730614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6f3d8c2e915'
+down_revision: Union[str, Sequence[str], None] = '5b7c9e1d3a42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('reading_progress',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('progress', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['book_id'], ['libros.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('book_id', 'user_id', name='uq_reading_progress_book_user')
+    )
+    op.create_index(op.f('ix_reading_progress_id'), 'reading_progress', ['id'], unique=False)
+    op.create_table('progress_stats',
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('reader_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('progress_sum', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('finished_count', sa.Integer(), server_default='0', nullable=False),
+    *[sa.Column(f'bucket_{bucket}', sa.Integer(), server_default='0', nullable=False) for bucket in range(10)],
+    sa.ForeignKeyConstraint(['book_id'], ['libros.id'], ),
+    sa.PrimaryKeyConstraint('book_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('progress_stats')
+    op.drop_index(op.f('ix_reading_progress_id'), table_name='reading_progress')
+    op.drop_table('reading_progress')
@@ -0,0 +1,29 @@
+"""Club version counter for ETags
+
+Revision ID: c4e8a1f6b203
+Revises: a6f3d8c2e915
+Create Date: 2026-10-17 15:51:37.402166
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1f6b203'
+down_revision: Union[str, Sequence[str], None] = 'a6f3d8c2e915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('clubes', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('clubes') as batch_op:
+        batch_op.drop_column('version')
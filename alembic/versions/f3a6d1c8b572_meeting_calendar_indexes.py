@@ -0,0 +1,30 @@
+"""Meeting calendar indexes
+
+Revision ID: f3a6d1c8b572
+Revises: e7b2c5d9a841
+Create Date: 2026-10-17 19:22:05.184907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a6d1c8b572'
+down_revision: Union[str, Sequence[str], None] = 'e7b2c5d9a841'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_meetings_club_id_scheduled_at', 'meetings', ['club_id', 'scheduled_at', 'id'], unique=False)
+    op.create_index('ix_meeting_attendance_user_id_meeting_id', 'meeting_attendance', ['user_id', 'meeting_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_meeting_attendance_user_id_meeting_id', table_name='meeting_attendance')
+    op.drop_index('ix_meetings_club_id_scheduled_at', table_name='meetings')
@@ -0,0 +1,87 @@
+import json
+import os
+from pydantic import ValidationError
+from app import crud
+
+# Configuration
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+class InvalidPayload(ValueError):
+    pass
+
+
+def _parse_line(line: bytes):
+    try:
+        return json.loads(line), None
+    except ValueError as e:
+        return None, f"Invalid JSON: {e}"
+
+
+async def iter_records(request):
+    """Yields ``(record, error)`` from a JSON array body or a streamed NDJSON body."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        # Parsed as it arrives, so the whole upload never sits in memory
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield _parse_line(line)
+        if buffer.strip():
+            yield _parse_line(buffer)
+        return
+
+    try:
+        payload = json.loads(await request.body())
+    except ValueError as e:
+        raise InvalidPayload(f"Invalid JSON: {e}")
+    if not isinstance(payload, list):
+        raise InvalidPayload("Expected a JSON array or an NDJSON stream")
+    for record in payload:
+        yield record, None
+
+
+def _validate(record, schema, defaults: dict):
+    if not isinstance(record, dict):
+        return None, "Expected a JSON object"
+    for key, value in defaults.items():
+        if record.get(key, value) != value:
+            return None, f"{key} must be {value}"
+    try:
+        return schema.model_validate({**defaults, **record}).model_dump(), None
+    except ValidationError as e:
+        return None, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+
+
+async def import_records(db, request, schema, model, defaults: dict | None = None, chunk_size: int = BULK_CHUNK_SIZE):
+    """Validates every record against ``schema`` and inserts the valid ones in chunks.
+
+    ``defaults`` fills fields implied by the URL (e.g. ``club_id``); records that
+    disagree with them are rejected. Each chunk is one executemany INSERT in its
+    own transaction.
+    """
+    defaults = defaults or {}
+    results = []
+    pending = []
+    index = 0
+    async for record, error in iter_records(request):
+        if error is None:
+            values, error = _validate(record, schema, defaults)
+        if error is not None:
+            results.append({"index": index, "status": "error", "detail": error})
+        else:
+            pending.append((index, values))
+            if len(pending) >= chunk_size:
+                results.extend(await crud.bulk_insert(db, model, pending))
+                pending = []
+        index += 1
+    if pending:
+        results.extend(await crud.bulk_insert(db, model, pending))
+
+    results.sort(key=lambda row: row["index"])
+    created = sum(1 for row in results if row["status"] == "created")
+    return {"created": created, "failed": len(results) - created, "results": results}
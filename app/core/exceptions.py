@@ -12,6 +12,16 @@ class ItemAlreadyExists(BaseAppException):
     """Raised when an item already exists."""
     pass
 
+class UniqueViolation(ItemAlreadyExists):
+    """Raised when a write hits a unique constraint; `field` names the column."""
+    def __init__(self, field: str, message: str = None):
+        self.field = field
+        super().__init__(message or f"{field} already exists")
+
 class DatabaseError(BaseAppException):
     """Raised when a database error occurs."""
     pass
+
+class ServiceUnavailable(BaseAppException):
+    """Raised when the server is too busy to take the request."""
+    pass
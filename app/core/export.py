@@ -0,0 +1,35 @@
+import json
+import os
+import zlib
+from datetime import date, datetime
+from app import crud
+
+# Configuration
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode(kind: str, rows) -> bytes:
+    return "".join(
+        json.dumps({"type": kind, **row}, default=_json_default) + "\n" for row in rows
+    ).encode()
+
+
+async def club_export(db, club_id: int, compress: bool = False, batch_size: int = EXPORT_BATCH_SIZE):
+    """Yields the club's data as NDJSON, one chunk per fetched batch, optionally gzipped."""
+    # wbits=31 -> gzip container
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    async for kind, rows in crud.stream_club_export(db, club_id, batch_size=batch_size):
+        chunk = _encode(kind, rows)
+        if compressor is not None:
+            chunk = compressor.compress(chunk)
+        if chunk:
+            yield chunk
+    if compressor is not None:
+        yield compressor.flush()
@@ -0,0 +1,28 @@
+import os
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Configuration (opt-in): orjson for every JSON response, and list endpoints
+# encode column rows directly instead of validating ORM objects per item
+FAST_JSON_ENABLED = os.getenv("FAST_JSON_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def response_class(enabled: bool = FAST_JSON_ENABLED):
+    if not enabled:
+        return JSONResponse
+    if orjson is None:
+        raise RuntimeError("FAST_JSON_ENABLED is set but the 'orjson' package is not installed")
+    return ORJSONResponse
+
+
+def rows_response(rows: list[dict], headers: dict | None = None) -> ORJSONResponse:
+    """Encodes rows that already have the response schema's shape.
+
+    Returning a Response skips FastAPI's response_model pass, so callers
+    select exactly the schema's columns (see crud.get_club_rows).
+    """
+    return ORJSONResponse(rows, headers=headers)
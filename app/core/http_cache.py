@@ -0,0 +1,19 @@
+import os
+
+# Clients may keep responses but must revalidate them (If-None-Match) before each use
+HTTP_CACHE_CONTROL = os.getenv("HTTP_CACHE_CONTROL", "private, no-cache")
+
+
+def club_etag(club_id: int, version: int) -> str:
+    # Weak: the same version may be serialized with different bytes (e.g. key order)
+    return f'W/"club-{club_id}-v{version}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison as required for If-None-Match (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
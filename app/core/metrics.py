@@ -0,0 +1,33 @@
+import hmac
+import os
+from app import database
+from app.core import security
+from app.core.progress_buffer import progress_buffer
+from app.core.result_cache import result_cache
+from app.core.user_cache import user_cache
+from app.core.vote_buffer import vote_buffer
+
+# Configuration
+# GET /metrics answers only requests sending this value in X-Metrics-Token; empty turns it off
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+def token_matches(supplied: str | None) -> bool:
+    return bool(METRICS_TOKEN) and supplied is not None and hmac.compare_digest(supplied, METRICS_TOKEN)
+
+
+def snapshot() -> dict:
+    """Counters of this worker's pools, caches and buffers; each worker reports its own."""
+    stats = {
+        "pid": os.getpid(),
+        "db_pool": database.pool_stats(),
+        "user_cache": user_cache.stats(),
+        "token_cache": security.token_cache.stats(),
+        "password_hashing": security.password_hashing_stats(),
+        "result_cache": result_cache.stats(),
+        "vote_buffer": vote_buffer.stats(),
+        "progress_buffer": progress_buffer.stats(),
+    }
+    if database.replica_engine is not None:
+        stats["db_replica_pool"] = database.pool_stats(database.replica_engine)
+    return stats
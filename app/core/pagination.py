@@ -0,0 +1,56 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+# Opaque keyset cursors: base64url-encoded JSON holding the last row's id
+CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))["id"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    if not isinstance(last_id, int):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return last_id
+
+
+def next_cursor(rows, limit: int) -> Optional[str]:
+    # A full page means there may be more rows after the last one
+    if limit > 0 and len(rows) == limit:
+        last = rows[-1]
+        return encode_cursor(last["id"] if isinstance(last, dict) else last.id)
+    return None
+
+
+# Calendar listings walk (scheduled_at, id); the cursor carries both
+def encode_time_cursor(at: Optional[datetime], last_id: int) -> str:
+    raw = json.dumps({"at": at.isoformat() if at else None, "id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_time_cursor(cursor: str) -> tuple[Optional[datetime], int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        at = datetime.fromisoformat(payload["at"]) if payload["at"] is not None else None
+        last_id = payload["id"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    if not isinstance(last_id, int):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return at, last_id
+
+
+def next_time_cursor(rows, limit: int) -> Optional[str]:
+    if limit > 0 and len(rows) == limit:
+        return encode_time_cursor(rows[-1].scheduled_at, rows[-1].id)
+    return None
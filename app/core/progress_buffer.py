@@ -0,0 +1,72 @@
+import os
+from app import crud
+from app.core.write_behind import WriteBehindBuffer
+
+# Configuration (opt-in, like the vote buffer: pending updates live in one process)
+PROGRESS_BUFFER_ENABLED = os.getenv("PROGRESS_BUFFER_ENABLED", "false").lower() in ("1", "true", "yes")
+PROGRESS_BUFFER_FLUSH_MS = int(os.getenv("PROGRESS_BUFFER_FLUSH_MS", "2000"))
+PROGRESS_BUFFER_MAX_PENDING = int(os.getenv("PROGRESS_BUFFER_MAX_PENDING", "1000"))
+
+
+class ProgressBuffer(WriteBehindBuffer):
+    """Coalesces reading-progress updates before they reach the database.
+
+    Only the latest value per (club_id, book_id, user_id) is kept, so a reader
+    turning pages every few seconds costs one write per flush instead of one
+    per request. Reads merge the caller's pending value; club aggregates catch
+    up at the next flush.
+    """
+
+    name = "Progress"
+
+    def __init__(self, flush_ms: int = PROGRESS_BUFFER_FLUSH_MS, max_pending: int = PROGRESS_BUFFER_MAX_PENDING):
+        super().__init__(flush_ms, max_pending)
+        self._pending = {}
+        self._flushing = {}
+        self.received = 0
+        self.flushes = 0
+        self.flushed_updates = 0
+
+    def pending_progress(self, club_id: int, book_id: int, user_id: int):
+        key = (club_id, book_id, user_id)
+        if key in self._pending:
+            return self._pending[key]
+        return self._flushing.get(key)
+
+    async def update(self, db, book_id: int, club_id: int, user_id: int, progress: int):
+        # Validated now so the client gets its 404 instead of a silent drop at flush time
+        await crud.get_book_by_id(db, book_id=book_id, club_id=club_id)
+        self._pending[(club_id, book_id, user_id)] = max(0, min(100, progress))
+        self.received += 1
+        if len(self._pending) >= self.max_pending:
+            self.wake()
+
+    async def flush(self):
+        async with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            self._flushing = batch
+            try:
+                async with self._session_factory() as db:
+                    await crud.update_reading_progress_batch(db, batch)
+                self.flushes += 1
+                self.flushed_updates += len(batch)
+            except Exception:
+                # Values that arrived meanwhile are newer and win
+                for key, progress in batch.items():
+                    self._pending.setdefault(key, progress)
+                raise
+            finally:
+                self._flushing = {}
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "received": self.received,
+            "flushes": self.flushes,
+            "flushed_updates": self.flushed_updates,
+        }
+
+
+progress_buffer = ProgressBuffer()
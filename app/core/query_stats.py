@@ -0,0 +1,142 @@
+import json
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Server-Timing reveals query counts and DB time; turn it off for untrusted clients
+QUERY_STATS_SERVER_TIMING = os.getenv("QUERY_STATS_SERVER_TIMING", "true").lower() in ("1", "true", "yes")
+# The same SQL this many times in one request is logged as a likely N+1
+QUERY_STATS_REPEAT_THRESHOLD = int(os.getenv("QUERY_STATS_REPEAT_THRESHOLD", "5"))
+QUERY_STATS_WARN_QUERIES = int(os.getenv("QUERY_STATS_WARN_QUERIES", "25"))
+
+_current = ContextVar("request_queries", default=None)
+
+
+class RequestQueries:
+    """Statements one request sent to the database."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+        self.statements = Counter()
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total += elapsed
+        self.statements[statement] += 1
+        if elapsed >= self.slowest:
+            self.slowest = elapsed
+            self.slowest_statement = statement
+
+    def repeated(self, threshold: int = QUERY_STATS_REPEAT_THRESHOLD) -> dict:
+        return {statement: n for statement, n in self.statements.items() if n >= threshold}
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total * 1000:.2f};desc="{self.count} queries", db-slowest;dur={self.slowest * 1000:.2f}'
+
+
+@contextmanager
+def track():
+    """Counts every statement run in this context, on any engine."""
+    queries = RequestQueries()
+    token = _current.set(queries)
+    try:
+        yield queries
+    finally:
+        _current.reset(token)
+
+
+# Listening on Engine covers the primary, the replica and test engines alike.
+# The async engines fire these from the greenlet that carries the caller's context.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_stats_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = _current.get()
+    starts = conn.info.get("query_stats_start")
+    if queries is not None and starts:
+        queries.record(statement, time.perf_counter() - starts.pop())
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # A statement that failed (e.g. a unique violation) was still a round trip
+    starts = exception_context.connection.info.get("query_stats_start") if exception_context.connection else None
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    queries = _current.get()
+    if queries is not None and exception_context.statement is not None:
+        queries.record(exception_context.statement, elapsed)
+
+
+def _log(scope, status: int, queries: RequestQueries, elapsed: float):
+    repeated = queries.repeated()
+    level = logging.WARNING if repeated or queries.count > QUERY_STATS_WARN_QUERIES else logging.DEBUG
+    if not logger.isEnabledFor(level):
+        return
+    record = {
+        "event": "request_queries",
+        "method": scope["method"],
+        "path": scope["path"],
+        "status": status,
+        "duration_ms": round(elapsed * 1000, 2),
+        "queries": queries.count,
+        "db_ms": round(queries.total * 1000, 2),
+        "slowest_ms": round(queries.slowest * 1000, 2),
+        "slowest_sql": (queries.slowest_statement or "")[:200],
+    }
+    if repeated:
+        record["repeated"] = [{"sql": statement[:200], "times": n} for statement, n in repeated.items()]
+    logger.log(level, json.dumps(record))
+
+
+class QueryStatsMiddleware:
+    """Per-request query count and DB time, as Server-Timing and a log line.
+
+    Plain ASGI rather than BaseHTTPMiddleware so the header is added to the
+    response start message without buffering the body; streamed responses
+    report what ran before their first byte.
+    """
+
+    def __init__(self, app, enabled: bool = QUERY_STATS_ENABLED, server_timing: bool = QUERY_STATS_SERVER_TIMING):
+        self.app = app
+        self.enabled = enabled
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+        with track() as queries:
+            async def send_with_timing(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    if self.server_timing:
+                        MutableHeaders(scope=message).append("Server-Timing", queries.server_timing())
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                _log(scope, status, queries, time.perf_counter() - start)
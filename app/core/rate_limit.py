@@ -1,4 +1,191 @@
-from slowapi import Limiter
+import asyncio
+import inspect
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from jose import JWTError
+from limits.storage import MemoryStorage, Storage
+from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+from slowapi.middleware import SlowAPIMiddleware, _find_route_handler, _get_route_name
 from slowapi.util import get_remote_address
+from app.core import security
 
-limiter = Limiter(key_func=get_remote_address)
+# Configuration
+# memory:// counts per process. With several workers use a shared store:
+#   sqlite:////var/run/bookcircle/ratelimit.db  every worker on one node
+#   redis://host:6379/0                         every node (needs the redis package)
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+RATE_LIMIT_KEY_PREFIX = os.getenv("RATE_LIMIT_KEY_PREFIX", "bookcircle")
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# Threads for limit checks against a store that blocks (sqlite://, redis://)
+RATE_LIMIT_WORKERS = int(os.getenv("RATE_LIMIT_WORKERS", "4"))
+
+
+class SQLiteStorage(Storage):
+    """Fixed-window counters in a SQLite file shared by the workers of a node.
+
+    Each hit is a single ``INSERT ... ON CONFLICT DO UPDATE ... RETURNING``,
+    so the read-modify-write happens inside SQLite and concurrent workers
+    can't both see the last free slot. Expired windows restart in the same
+    statement.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+    # Expired rows are only reused by their own key; sweep them now and then
+    PURGE_EVERY = 1000
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, busy_timeout_ms: int = 5000, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        # Same form as SQLAlchemy URLs: sqlite:////abs/path.db, sqlite:///rel.db
+        self.path = urlparse(uri).path[1:] or ":memory:"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            "key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._hits = 0
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _execute(self, sql: str, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        (count,) = self._execute(
+            "INSERT INTO rate_limits (key, count, expires_at) VALUES (:key, :amount, :now + :expiry) "
+            "ON CONFLICT (key) DO UPDATE SET "
+            "count = CASE WHEN expires_at <= :now THEN excluded.count ELSE count + excluded.count END, "
+            "expires_at = CASE WHEN expires_at <= :now THEN excluded.expires_at ELSE expires_at END "
+            "RETURNING count",
+            {"key": key, "amount": amount, "now": now, "expiry": expiry},
+        )
+        self._hits += 1
+        if self._hits % self.PURGE_EVERY == 0:
+            self._execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+        return count
+
+    def get(self, key: str) -> int:
+        row = self._execute("SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?", (key, time.time()))
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        row = self._execute("SELECT expires_at FROM rate_limits WHERE key = ? AND expires_at > ?", (key, time.time()))
+        return row[0] if row else time.time()
+
+    def check(self) -> bool:
+        try:
+            self._execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key: str) -> None:
+        self._execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+
+def rate_limit_key(request) -> str:
+    """Buckets authenticated callers by user and everyone else by address.
+
+    The middleware runs before route dependencies, so this reads the same
+    bearer token ``get_current_user`` will check (the decode is cached, so
+    the second check is a lookup). A bad token falls back to the address;
+    the request is rejected with 401 afterwards anyway.
+    """
+    # Resolved on the event loop by RateLimitMiddleware before it leaves for a worker thread
+    key = getattr(request.state, "rate_limit_key", None)
+    if key is not None:
+        return key
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = security.decode_access_token(token)
+        except JWTError:
+            payload = {}
+        username = payload.get("sub")
+        if username:
+            return f"user:{username}"
+    return f"ip:{get_remote_address(request)}"
+
+
+_limit_executor = ThreadPoolExecutor(max_workers=RATE_LIMIT_WORKERS, thread_name_prefix="rate-limit")
+
+
+def _check_request_limits(limiter: Limiter, request, handler) -> None:
+    # The check slowapi would make: @limit routes in their endpoint wrapper,
+    # every other route against the default limits in its middleware
+    name = _get_route_name(handler)
+    decorated = name in limiter._route_limits or name in limiter._dynamic_route_limits
+    limiter._check_request_limit(request, handler, not decorated)
+    request.state._rate_limiting_complete = True
+
+
+class RateLimitMiddleware(SlowAPIMiddleware):
+    """SlowAPIMiddleware that checks every limit before the route runs.
+
+    slowapi checks ``@limiter.limit`` routes inside the endpoint wrapper,
+    after FastAPI has resolved the dependencies. A dependency that answers
+    early (the 304 of ``club_cache_validator``) would then never be counted.
+    Here the check runs in the middleware and the request is marked as
+    checked, so the wrapper skips its own. slowapi only speaks the
+    synchronous ``limits`` API, so a sqlite:// or redis:// store is hit on a
+    worker thread; memory:// stays inline, as a dict lookup is cheaper than
+    the hand-off.
+    """
+
+    async def dispatch(self, request, call_next):
+        app = request.app
+        limiter: Limiter = app.state.limiter
+        if not limiter.enabled:
+            return await call_next(request)
+
+        handler = _find_route_handler(app.routes, request.scope)
+        if handler is None or _get_route_name(handler) in limiter._exempt_routes:
+            return await call_next(request)
+
+        # The token cache behind the key isn't thread-safe; read it here
+        request.state.rate_limit_key = rate_limit_key(request)
+        try:
+            if isinstance(limiter._storage, MemoryStorage):
+                _check_request_limits(limiter, request, handler)
+            else:
+                await asyncio.get_running_loop().run_in_executor(
+                    _limit_executor, _check_request_limits, limiter, request, handler
+                )
+        except RateLimitExceeded as e:
+            exception_handler = app.exception_handlers.get(RateLimitExceeded, _rate_limit_exceeded_handler)
+            response = exception_handler(request, e)
+            return await response if inspect.isawaitable(response) else response
+
+        response = await call_next(request)
+        return limiter._inject_headers(response, request.state.view_rate_limit)
+
+
+def build_limiter(storage_uri: str = RATE_LIMIT_STORAGE_URI, **storage_options) -> Limiter:
+    return Limiter(
+        key_func=rate_limit_key,
+        storage_uri=storage_uri,
+        strategy="fixed-window",
+        key_prefix=RATE_LIMIT_KEY_PREFIX,
+        storage_options=storage_options,
+        enabled=RATE_LIMIT_ENABLED,
+    )
+
+
+limiter = build_limiter()
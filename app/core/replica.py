@@ -0,0 +1,60 @@
+import os
+import time
+
+# Configuration
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+REPLICA_STICKY_MAX_USERS = int(os.getenv("REPLICA_STICKY_MAX_USERS", "10000"))
+# Set on write responses so a read landing on another worker still goes to the primary
+REPLICA_STICKY_COOKIE = os.getenv("REPLICA_STICKY_COOKIE", "bc_primary_until")
+
+
+class ReplicaRouter:
+    """Decides whether a user's reads may go to the replica.
+
+    After a user writes, their reads stay on the primary for ``sticky_seconds``
+    so they see their own changes while the replica catches up. The process
+    remembers its own writers; the write response also carries a cookie
+    (``sticky_cookie``) so the other workers honour the window too.
+    """
+
+    def __init__(self, sticky_seconds: float = REPLICA_STICKY_SECONDS, max_users: int = REPLICA_STICKY_MAX_USERS):
+        self.sticky_seconds = sticky_seconds
+        self.max_users = max_users
+        self._primary_until = {}
+
+    def mark_write(self, user_key: str):
+        now = time.monotonic()
+        if len(self._primary_until) >= self.max_users:
+            self._primary_until = {k: t for k, t in self._primary_until.items() if t > now}
+        self._primary_until[user_key] = now + self.sticky_seconds
+
+    def use_primary(self, user_key: str) -> bool:
+        until = self._primary_until.get(user_key)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._primary_until[user_key]
+            return False
+        return True
+
+    def sticky_cookie(self, user_key: str) -> str:
+        # Wall clock, unlike the in-process map: the cookie is read by other processes
+        return f"{user_key}:{time.time() + self.sticky_seconds:.3f}"
+
+    def cookie_wants_primary(self, user_key: str, cookie: str | None) -> bool:
+        if not cookie:
+            return False
+        owner, _, until = cookie.rpartition(":")
+        try:
+            until = float(until)
+        except ValueError:
+            return False
+        now = time.time()
+        # Bound to the user who wrote, and never longer than one window from now
+        return owner == user_key and now < until <= now + self.sticky_seconds
+
+    def reset(self):
+        self._primary_until.clear()
+
+
+replica_router = ReplicaRouter()
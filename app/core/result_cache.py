@@ -0,0 +1,199 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+
+# Configuration
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# memory:// (per process) or redis://host:6379/0 (shared by every worker; needs the redis package)
+RESULT_CACHE_URL = os.getenv("RESULT_CACHE_URL", "memory://")
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "2048"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "30"))
+# Lists keyed on no database version (GET /clubs) are only cached in a shared backend,
+# where invalidations reach every worker. A single worker can opt in with memory://
+RESULT_CACHE_UNVERSIONED_LOCAL = os.getenv("RESULT_CACHE_UNVERSIONED_LOCAL", "false").lower() in ("1", "true", "yes")
+
+
+class MemoryBackend:
+    """In-process TTL + LRU store."""
+
+    name = "memory"
+    # Generations are per process: another worker's invalidate() is never seen here
+    shared = False
+
+    def __init__(self, maxsize: int = RESULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._generations = {}
+
+    async def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    async def bump(self, namespace: str):
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def clear(self):
+        self._entries.clear()
+        self._generations.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Shared store; entries expire on their own and generations live in Redis too."""
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "bookcircle:cache:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("RESULT_CACHE_URL points at Redis but the 'redis' package is not installed")
+        self._redis = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str):
+        return await self._redis.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self._redis.set(self.prefix + key, value, ex=max(1, math.ceil(ttl)))
+
+    async def generation(self, namespace: str) -> int:
+        return int(await self._redis.get(f"{self.prefix}gen:{namespace}") or 0)
+
+    async def bump(self, namespace: str):
+        await self._redis.incr(f"{self.prefix}gen:{namespace}")
+
+    def clear(self):
+        pass
+
+
+# Handed to waiters when the load they joined was cancelled
+_RETRY = object()
+
+
+def build_backend(url: str = RESULT_CACHE_URL):
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    raise ValueError(f"Unsupported RESULT_CACHE_URL: {url}")
+
+
+class ResultCache:
+    """Read-through cache for crud list queries.
+
+    Entries live under ``namespace:generation:key``. Writers call
+    ``invalidate(namespace)`` after committing, which bumps the generation so
+    every older entry becomes unreachable at once, including one a concurrent
+    reader stores from a snapshot taken before the commit. Concurrent misses
+    on the same key share a single load (single-flight).
+
+    Generations only reach every worker through a shared backend. Callers
+    whose key carries a version read from the database (``versioned``) are
+    safe without one; the others are served uncached from a per-process
+    backend unless ``unversioned_local`` says there is a single worker.
+    """
+
+    def __init__(self, backend=None, ttl: float = RESULT_CACHE_TTL_SECONDS, enabled: bool = RESULT_CACHE_ENABLED,
+                 unversioned_local: bool = RESULT_CACHE_UNVERSIONED_LOCAL):
+        self.backend = backend if backend is not None else build_backend()
+        self.ttl = ttl
+        self.enabled = enabled
+        self.unversioned_local = unversioned_local
+        self._inflight = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    async def get_or_load(self, namespace: str, key: str, loader, adapter, versioned: bool = True):
+        """Returns ``adapter``-validated results, running ``loader()`` only on a miss."""
+        if not self.enabled or not (versioned or self.backend.shared or self.unversioned_local):
+            return adapter.validate_python(await loader(), from_attributes=True)
+        while True:
+            generation = await self.backend.generation(namespace)
+            cache_key = f"{namespace}:{generation}:{key}"
+            raw = await self.backend.get(cache_key)
+            if raw is not None:
+                self.hits += 1
+                return adapter.validate_json(raw)
+
+            inflight = self._inflight.get(cache_key)
+            if inflight is None:
+                break
+            value = await asyncio.shield(inflight)
+            if value is not _RETRY:
+                self.coalesced += 1
+                return value
+            # The loading request was cancelled; load again, with this caller's loader
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        try:
+            value = adapter.validate_python(await loader(), from_attributes=True)
+            await self.backend.set(cache_key, adapter.dump_json(value), self.ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            # The cancellation belongs to this request (a client gone away), not to the
+            # waiters. The loader runs on this request's session, so they can't take it over
+            future.set_result(_RETRY)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Waiters re-raise it; don't warn when there are none
+            raise
+        finally:
+            self._inflight.pop(cache_key, None)
+
+    async def invalidate(self, namespace: str):
+        if not self.enabled:
+            return
+        await self.backend.bump(namespace)
+        self.invalidations += 1
+
+    def reset(self):
+        self.backend.clear()
+        self._inflight.clear()
+        self._reset_counters()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            # Coalesced lookups were served without their own query
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+result_cache = ResultCache()
@@ -1,14 +1,36 @@
+import asyncio
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import jwt
+from jose import jwt, JWTError, ExpiredSignatureError
 from passlib.context import CryptContext
+from app.core.exceptions import ServiceUnavailable
 
 # Configuration
 SECRET_KEY = "SECRET_KEY_GOES_HERE" # In production, verify this is loaded from env
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+# jose (default) or pyjwt (needs the PyJWT package)
+JWT_BACKEND = os.getenv("JWT_BACKEND", "jose")
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with a different cost are flagged by needs_update and rehashed on login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt releases the GIL, so a small thread pool keeps it off the event loop
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_pending = 0
+_hash_rejected = 0
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -16,6 +38,131 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+async def _run_hashing(func, *args):
+    global _hash_pending, _hash_rejected
+    # Back-pressure: fail fast instead of queueing unbounded work behind bcrypt
+    if _hash_pending >= PASSWORD_HASH_MAX_PENDING:
+        _hash_rejected += 1
+        raise ServiceUnavailable("Too many password operations in progress, try again later")
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_pending -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hashing(pwd_context.verify, plain_password, hashed_password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str):
+    """Returns (verified, new_hash); new_hash is set when the stored hash is outdated."""
+    return await _run_hashing(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_hashing(pwd_context.hash, password)
+
+def password_hashing_stats() -> dict:
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "in_flight": _hash_pending,
+        "queue_depth": max(0, _hash_pending - PASSWORD_HASH_WORKERS),
+        "rejected": _hash_rejected,
+    }
+
+class JoseBackend:
+    name = "jose"
+
+    def encode(self, claims: dict) -> str:
+        return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+    def decode(self, token: str) -> dict:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+
+class PyJWTBackend:
+    """PyJWT behind the same interface; its errors are re-raised as jose's."""
+
+    name = "pyjwt"
+
+    def __init__(self):
+        try:
+            import jwt as pyjwt
+        except ImportError:
+            raise RuntimeError("JWT_BACKEND=pyjwt but the 'PyJWT' package is not installed")
+        self._jwt = pyjwt
+
+    def encode(self, claims: dict) -> str:
+        return self._jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return self._jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except self._jwt.ExpiredSignatureError as e:
+            raise ExpiredSignatureError(str(e))
+        except self._jwt.PyJWTError as e:
+            raise JWTError(str(e))
+
+
+def build_jwt_backend(name: str = JWT_BACKEND):
+    if name == "jose":
+        return JoseBackend()
+    if name == "pyjwt":
+        return PyJWTBackend()
+    raise ValueError(f"Unsupported JWT_BACKEND: {name}")
+
+
+class TokenCache:
+    """Bounded LRU of verified claims, keyed by the token's SHA-256 digest.
+
+    Only tokens that passed full verification are stored. A hit re-checks
+    ``exp`` with python-jose's rule (expired once ``exp`` is before the
+    current whole second), so an expired token still fails with
+    ExpiredSignatureError and callers answer 401 as before.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes) -> Optional[dict]:
+        claims = self._entries.get(key)
+        if claims is None:
+            self.misses += 1
+            return None
+        if "exp" in claims and int(claims["exp"]) < int(time.time()):
+            del self._entries[key]
+            raise ExpiredSignatureError("Signature has expired.")
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return claims
+
+    def set(self, key: bytes, claims: dict):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = claims
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+jwt_backend = build_jwt_backend()
+token_cache = TokenCache()
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -24,5 +171,28 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt_backend.encode(to_encode)
     return encoded_jwt
+
+
+def decode_access_token(token: str) -> dict:
+    """Verified claims of an access token; raises JWTError like jose.jwt.decode.
+
+    Callers must not mutate the returned dict: it is shared with the cache.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(key)
+    if claims is None:
+        claims = jwt_backend.decode(token)
+        token_cache.set(key, claims)
+    return claims
+
+
+def generate_refresh_token() -> str:
+    """An opaque random token; only hash_refresh_token(token) is stored."""
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    # The token is random, so a keyed hash is enough: no bcrypt on refresh
+    return hmac.new(SECRET_KEY.encode(), token.encode(), hashlib.sha256).hexdigest()
@@ -0,0 +1,62 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+from app import models
+
+# Configuration
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+_user_columns = [column.key for column in models.User.__table__.columns]
+
+
+class UserCache:
+    """Bounded TTL + LRU cache of authenticated users, keyed by the token ``sub``."""
+
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username: str) -> Optional[models.User]:
+        entry = self._entries.get(username)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[username]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(username)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, user: models.User):
+        if self.maxsize <= 0:
+            return
+        # Keep a transient copy: the loaded instance belongs to the request's
+        # session and would be expired by that session's commit or rollback.
+        copy = models.User(**{key: getattr(user, key) for key in _user_columns})
+        self._entries[user.username] = (time.monotonic() + self.ttl, copy)
+        self._entries.move_to_end(user.username)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, username: Optional[str] = None):
+        if username is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(username, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+user_cache = UserCache()
@@ -0,0 +1,206 @@
+import logging
+import os
+from sqlalchemy import insert, update, delete, func, bindparam
+from sqlalchemy.exc import IntegrityError
+from app import models, crud, schemas
+from app.core.exceptions import ItemNotFound, ItemAlreadyExists
+from app.core.write_behind import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+# Configuration (opt-in: votes are written straight to the DB unless enabled)
+VOTE_BUFFER_ENABLED = os.getenv("VOTE_BUFFER_ENABLED", "false").lower() in ("1", "true", "yes")
+VOTE_BUFFER_FLUSH_MS = int(os.getenv("VOTE_BUFFER_FLUSH_MS", "500"))
+VOTE_BUFFER_MAX_PENDING = int(os.getenv("VOTE_BUFFER_MAX_PENDING", "1000"))
+
+_books = models.Book.__table__
+_clubs = models.Club.__table__
+_votes = models.BookVote.__table__
+
+
+class VoteBuffer(WriteBehindBuffer):
+    """In-process write-behind accumulator for book votes.
+
+    Votes are validated against the DB (book exists, user has / hasn't voted)
+    but only recorded in memory; a background task writes them every
+    ``flush_ms`` milliseconds or ``max_pending`` votes as one transaction with
+    batched statements. Reads merge the pending deltas so a client always sees
+    its own vote. Meant for a single worker process: pending votes live in
+    this process only.
+    """
+
+    name = "Vote"
+
+    def __init__(self, flush_ms: int = VOTE_BUFFER_FLUSH_MS, max_pending: int = VOTE_BUFFER_MAX_PENDING):
+        super().__init__(flush_ms, max_pending)
+        self._reset_pending()
+        self._flushing_added = set()
+        self._flushing_removed = set()
+        self._flushing_deltas = {}
+        self.flushes = 0
+        self.flushed_votes = 0
+
+    def _reset_pending(self):
+        # Keys are (club_id, book_id, user_id); deltas are keyed by (club_id, book_id)
+        self._added = set()
+        self._removed = set()
+        self._deltas = {}
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._added) + len(self._removed)
+
+    def pending_votes(self, club_id: int, book_id: int) -> int:
+        key = (club_id, book_id)
+        return self._deltas.get(key, 0) + self._flushing_deltas.get(key, 0)
+
+    def has_pending(self, club_id: int) -> bool:
+        # Pending votes change the club's book listing before its version is bumped
+        return any(key[0] == club_id and delta for deltas in (self._deltas, self._flushing_deltas) for key, delta in deltas.items())
+
+    def merge_book(self, book):
+        delta = self.pending_votes(book.club_id, book.id)
+        if not delta:
+            return book
+        return schemas.BookOut(
+            id=book.id,
+            club_id=book.club_id,
+            title=book.title,
+            author=book.author,
+            votes=(book.votes or 0) + delta,
+            progress=book.progress or 0,
+            review_count=book.review_count,
+            average_rating=book.average_rating,
+        )
+
+    def merge_books(self, books):
+        if not self._deltas and not self._flushing_deltas:
+            return books
+        return [self.merge_book(book) for book in books]
+
+    async def _had_vote(self, db, key):
+        # Vote state as the DB will see it once the in-flight flush (if any) commits
+        club_id, book_id, user_id = key
+        in_db = await crud.has_user_voted(db, book_id=book_id, user_id=user_id)
+        return (in_db or key in self._flushing_added) and key not in self._flushing_removed
+
+    def _record(self, key, delta: int):
+        book_key = key[:2]
+        self._deltas[book_key] = self._deltas.get(book_key, 0) + delta
+        if self.pending_count >= self.max_pending:
+            self.wake()
+
+    async def add_vote(self, db, book_id: int, club_id: int, user_id: int):
+        book = await crud.get_book_by_id(db, book_id=book_id, club_id=club_id)
+        key = (club_id, book_id, user_id)
+        had_vote = await self._had_vote(db, key)
+        # No awaits below: the decision and the bookkeeping happen atomically
+        if key in self._removed:
+            self._removed.discard(key)
+        elif key in self._added or had_vote:
+            raise ItemAlreadyExists(f"User {user_id} already voted for book {book_id}")
+        else:
+            self._added.add(key)
+        self._record(key, 1)
+        return (book.votes or 0) + self.pending_votes(club_id, book_id)
+
+    async def remove_vote(self, db, book_id: int, club_id: int, user_id: int):
+        book = await crud.get_book_by_id(db, book_id=book_id, club_id=club_id)
+        key = (club_id, book_id, user_id)
+        had_vote = await self._had_vote(db, key)
+        if key in self._added:
+            self._added.discard(key)
+        elif key in self._removed or not had_vote:
+            raise ItemNotFound(f"Vote from user {user_id} not found for book {book_id}")
+        else:
+            self._removed.add(key)
+        self._record(key, -1)
+        return (book.votes or 0) + self.pending_votes(club_id, book_id)
+
+    async def flush(self):
+        async with self._lock:
+            if not self._added and not self._removed:
+                return
+            added, removed = self._added, self._removed
+            deltas = {key: delta for key, delta in self._deltas.items() if delta}
+            self._reset_pending()
+            self._flushing_added, self._flushing_removed, self._flushing_deltas = added, removed, deltas
+            try:
+                async with self._session_factory() as db:
+                    try:
+                        await self._write_batch(db, added, removed, deltas)
+                    except IntegrityError:
+                        # A vote recorded by another worker in the meantime; replay
+                        # one by one so a single conflict doesn't lose the batch.
+                        await db.rollback()
+                        logger.warning("Batched vote flush conflicted, replaying %d votes individually", len(added) + len(removed))
+                        await self._replay(db, added, removed)
+                self.flushes += 1
+                self.flushed_votes += len(added) + len(removed)
+            except Exception:
+                self._requeue(added, removed, deltas)
+                raise
+            finally:
+                self._flushing_added, self._flushing_removed, self._flushing_deltas = set(), set(), {}
+
+    def _requeue(self, added, removed, deltas):
+        # Merge a failed batch back under the votes that arrived since
+        for key in added:
+            if key in self._removed:
+                self._removed.discard(key)
+            else:
+                self._added.add(key)
+        for key in removed:
+            if key in self._added:
+                self._added.discard(key)
+            else:
+                self._removed.add(key)
+        for book_key, delta in deltas.items():
+            self._deltas[book_key] = self._deltas.get(book_key, 0) + delta
+
+    async def _write_batch(self, db, added, removed, deltas):
+        if added:
+            await db.execute(
+                insert(_votes),
+                [{"book_id": book_id, "user_id": user_id} for _, book_id, user_id in added],
+            )
+        if removed:
+            await db.execute(
+                delete(_votes).where(_votes.c.book_id == bindparam("b_book_id"), _votes.c.user_id == bindparam("b_user_id")),
+                [{"b_book_id": book_id, "b_user_id": user_id} for _, book_id, user_id in removed],
+            )
+        if deltas:
+            await db.execute(
+                update(_books)
+                .where(_books.c.id == bindparam("b_book_id"), _books.c.club_id == bindparam("b_club_id"))
+                .values(votes=func.coalesce(_books.c.votes, 0) + bindparam("b_delta")),
+                [{"b_book_id": book_id, "b_club_id": club_id, "b_delta": delta} for (club_id, book_id), delta in deltas.items()],
+            )
+            await db.execute(
+                update(_clubs).where(_clubs.c.id == bindparam("b_club_id")).values(version=_clubs.c.version + 1),
+                [{"b_club_id": club_id} for club_id in sorted({club_id for club_id, _ in deltas})],
+            )
+        await db.commit()
+        await crud.invalidate_club_books(*(club_id for club_id, _ in deltas))
+
+    async def _replay(self, db, added, removed):
+        for club_id, book_id, user_id in removed:
+            try:
+                await crud.delete_votes_by_book_id(db, book_id=book_id, club_id=club_id, user_id=user_id)
+            except ItemNotFound:
+                pass
+        for club_id, book_id, user_id in added:
+            try:
+                await crud.add_votes_by_book_id(db, book_id=book_id, club_id=club_id, user_id=user_id)
+            except (ItemAlreadyExists, ItemNotFound):
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending_count,
+            "flushes": self.flushes,
+            "flushed_votes": self.flushed_votes,
+        }
+
+
+vote_buffer = VoteBuffer()
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Background flush loop shared by the in-process write-behind buffers.
+
+    Subclasses keep their pending writes and implement ``flush()``; this class
+    runs it every ``flush_ms`` milliseconds, or sooner once ``wake()`` is
+    called, and once more on ``stop()`` so nothing pending is lost at shutdown.
+    Pending writes live in one process only, which is why every buffer is opt-in.
+    """
+
+    # Used in the log line of a failed flush
+    name = "write-behind"
+
+    def __init__(self, flush_ms: int, max_pending: int):
+        self.flush_ms = flush_ms
+        self.max_pending = max_pending
+        self._session_factory = None
+        self._task = None
+        self._stopping = False
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._stopping
+
+    def start(self, session_factory):
+        self._session_factory = session_factory
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        # Not cancelled: a flush interrupted halfway would drop the writes it took
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        await self.flush()
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("%s flush failed, will retry", self.name)
+
+    async def flush(self):
+        raise NotImplementedError
@@ -1,11 +1,20 @@
 # app/crud.py
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import insert, update, delete, func, case, or_, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import joinedload
 from . import models, schemas
 from app.core import security
-from app.core.exceptions import ItemNotFound, DatabaseError, ItemAlreadyExists
-from datetime import datetime
+from app.core.user_cache import user_cache
+from app.core.result_cache import result_cache
+from app.core.exceptions import ItemNotFound, DatabaseError, ItemAlreadyExists, UniqueViolation
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.exc import IntegrityError
+from collections import Counter
+from typing import Any
+from pydantic import TypeAdapter
+import uuid
 
 async def get_user_by_email(db: AsyncSession, email: str):
     result = await db.execute(select(models.User).filter(models.User.email == email))
@@ -17,53 +26,271 @@ async def get_user_by_username(db: AsyncSession, username: str):
     return result.scalars().first()
 
 
+# Unique indexes on users, by the name PostgreSQL reports for them
+_USER_UNIQUE_CONSTRAINTS = {"ix_users_email": "email", "ix_users_username": "username"}
+
+
+def _user_unique_field(e: IntegrityError):
+    """The users column whose unique index ``e`` violated, or None for any other failure."""
+    orig = e.orig
+    # psycopg exposes diag.constraint_name; asyncpg's error, wrapped by the dialect, has constraint_name
+    diag = getattr(orig, "diag", None)
+    constraint = getattr(diag, "constraint_name", None) or getattr(orig.__cause__, "constraint_name", None)
+    if constraint is not None:
+        return _USER_UNIQUE_CONSTRAINTS.get(constraint)
+    # SQLite names the column instead: "UNIQUE constraint failed: users.email"
+    message = str(orig)
+    if message.startswith("UNIQUE constraint failed"):
+        for field in ("email", "username"):
+            if f"users.{field}" in message:
+                return field
+    return None
+
+
 async def create_user(db: AsyncSession, user: schemas.UserCreate):
-    hashed_password = security.get_password_hash(user.password)
-    db_user = models.User(
-        email=user.email,
-        username=user.username,
-        hashed_password=hashed_password,
-        full_name=user.fullName
-    )
-    db.add(db_user)
+    hashed_password = await security.get_password_hash_async(user.password)
+    # INSERT ... RETURNING brings back id and server defaults without a refresh.
+    # The unique indexes decide duplicates: no lookups first, and no race between them and the insert
+    try:
+        result = await db.execute(
+            insert(models.User).values(
+                email=user.email,
+                username=user.username,
+                hashed_password=hashed_password,
+                full_name=user.fullName
+            ).returning(models.User)
+        )
+    except IntegrityError as e:
+        await db.rollback()
+        field = _user_unique_field(e)
+        if field is None:
+            raise
+        raise UniqueViolation(field, f"User with this {field} already exists")
+    db_user = result.scalar_one()
     await db.commit()
-    await db.refresh(db_user)
+    user_cache.invalidate(db_user.username)
     return db_user
 
 
-async def get_clubs(db: AsyncSession, skip: int = 0, limit: int = 100):
-    result = await db.execute(select(models.Club).offset(skip).limit(limit))
-    return result.scalars().all()
+async def update_user_password_hash(db: AsyncSession, user: models.User, hashed_password: str):
+    await db.execute(
+        update(models.User).where(models.User.id == user.id).values(hashed_password=hashed_password)
+    )
+    await db.commit()
+    user_cache.invalidate(user.username)
+
+
+async def create_refresh_token(db: AsyncSession, user_id: int, family_id: str | None = None) -> str:
+    """Stores a new refresh token for the user and returns it; only its hash is kept."""
+    token = security.generate_refresh_token()
+    await db.execute(
+        insert(models.RefreshToken).values(
+            token_hash=security.hash_refresh_token(token),
+            user_id=user_id,
+            family_id=family_id or uuid.uuid4().hex,
+            expires_at=datetime.now(timezone.utc) + timedelta(days=security.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+    )
+    await db.commit()
+    return token
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str):
+    """Spends a refresh token: returns (username, next_token), or None if it is not usable.
+
+    A token that was already rotated or revoked being presented again means
+    someone else holds a copy, so the rest of its family is revoked too.
+    """
+    now = datetime.now(timezone.utc)
+    token_hash = security.hash_refresh_token(token)
+    # Revoking and reading in one statement: of two concurrent refreshes only one gets the row
+    result = await db.execute(
+        update(models.RefreshToken)
+        .where(
+            models.RefreshToken.token_hash == token_hash,
+            models.RefreshToken.revoked_at.is_(None),
+            models.RefreshToken.expires_at > now,
+        )
+        .values(revoked_at=now)
+        .returning(
+            models.RefreshToken.user_id,
+            models.RefreshToken.family_id,
+            select(models.User.username).where(models.User.id == models.RefreshToken.user_id).scalar_subquery(),
+        )
+    )
+    row = result.first()
+    if row is None:
+        reused = select(models.RefreshToken.family_id).where(
+            models.RefreshToken.token_hash == token_hash,
+            models.RefreshToken.revoked_at.is_not(None),
+        )
+        await db.execute(
+            update(models.RefreshToken)
+            .where(models.RefreshToken.family_id.in_(reused), models.RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=now)
+        )
+        await db.commit()
+        return None
+    user_id, family_id, username = row
+    return username, await create_refresh_token(db, user_id, family_id=family_id)
+
+
+async def revoke_refresh_token(db: AsyncSession, token: str) -> int:
+    """Logs the session out: revokes the token and every other token of its family."""
+    family = select(models.RefreshToken.family_id).where(
+        models.RefreshToken.token_hash == security.hash_refresh_token(token)
+    )
+    result = await db.execute(
+        update(models.RefreshToken)
+        .where(models.RefreshToken.family_id.in_(family), models.RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc))
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def purge_refresh_tokens(db: AsyncSession) -> int:
+    """Deletes refresh tokens that can no longer matter; returns how many.
+
+    That is every expired token, and every token of a family with no usable
+    token left (logged out or revoked on reuse). Rotated tokens of a live
+    family stay until they expire: presenting one again is how reuse is caught.
+    """
+    now = datetime.now(timezone.utc)
+    live_families = select(models.RefreshToken.family_id).where(
+        models.RefreshToken.revoked_at.is_(None),
+        models.RefreshToken.expires_at > now,
+    )
+    result = await db.execute(
+        delete(models.RefreshToken).where(
+            (models.RefreshToken.expires_at <= now) | models.RefreshToken.family_id.not_in(live_families)
+        )
+    )
+    await db.commit()
+    return result.rowcount
+
+
+def _out_columns(model, schema, exclude=()):
+    # Exactly the columns the response schema returns, in its field order
+    return [model.__table__.c[name] for name in schema.model_fields if name not in exclude]
+
+
+def _clubs_page(skip: int, limit: int, after_id: int | None):
+    # List reads select columns, not entities: no instances, no identity map
+    query = select(*_out_columns(models.Club, schemas.ClubOut)).order_by(models.Club.id).limit(limit)
+    # Keyset pagination walks the primary key index; skip is the deprecated fallback
+    if after_id is not None:
+        query = query.filter(models.Club.id > after_id)
+    else:
+        query = query.offset(skip)
+    return query
+
+
+async def get_clubs(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: int | None = None):
+    result = await db.execute(_clubs_page(skip, limit, after_id))
+    return result.all()
+
+
+async def get_club_rows(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: int | None = None):
+    """get_clubs as plain ClubOut-shaped dicts, ready for fast_json.rows_response."""
+    result = await db.execute(_clubs_page(skip, limit, after_id))
+    return [dict(row) for row in result.mappings()]
+
+
+# Cached list reads. Writers invalidate after commit; see app/core/result_cache.py
+CLUBS_NAMESPACE = "clubs"
+_club_list = TypeAdapter(list[schemas.ClubOut])
+_book_list = TypeAdapter(list[schemas.BookOut])
+_rows = TypeAdapter(list[dict[str, Any]])
+
+
+def books_namespace(club_id: int) -> str:
+    return f"club:{club_id}:books"
+
+
+async def invalidate_club_books(*club_ids: int):
+    for club_id in sorted(set(club_ids)):
+        await result_cache.invalidate(books_namespace(club_id))
+
+
+def _list_key(db: AsyncSession, skip: int, limit: int, after_id: int | None) -> str:
+    # Replica results are kept apart: a lagging replica must not hide a
+    # writer's own change from its read-your-writes reads on the primary
+    source = "replica" if db.info.get("replica") else "primary"
+    return f"{source}:skip={skip}:limit={limit}:after={after_id}"
+
+
+async def get_clubs_cached(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: int | None = None):
+    # No version to key the club list on: cached only where every worker sees the invalidations
+    return await result_cache.get_or_load(
+        CLUBS_NAMESPACE, _list_key(db, skip, limit, after_id),
+        lambda: get_clubs(db, skip=skip, limit=limit, after_id=after_id), _club_list, versioned=False,
+    )
+
+
+async def get_club_rows_cached(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: int | None = None):
+    return await result_cache.get_or_load(
+        CLUBS_NAMESPACE, "rows:" + _list_key(db, skip, limit, after_id),
+        lambda: get_club_rows(db, skip=skip, limit=limit, after_id=after_id), _rows, versioned=False,
+    )
+
+
+async def get_books_by_club_id_cached(db: AsyncSession, club_id: int, version: int, skip: int = 0, limit: int = 100, after_id: int | None = None):
+    # The club version the ETag was built from is part of the key: a worker whose
+    # memory cache missed another worker's invalidation loads the new body instead
+    # of serving its old one under the new ETag
+    return await result_cache.get_or_load(
+        books_namespace(club_id), f"v{version}:" + _list_key(db, skip, limit, after_id),
+        lambda: get_books_by_club_id(db, club_id=club_id, skip=skip, limit=limit, after_id=after_id), _book_list,
+    )
 
 
 async def create_club(db: AsyncSession, club: schemas.ClubCreate):
-    db_club = models.Club(
-        name=club.name,
-        description=club.description,
-        favorite_genre=club.favorite_genre,
-        members=club.members
+    result = await db.execute(
+        insert(models.Club).values(
+            name=club.name,
+            description=club.description,
+            favorite_genre=club.favorite_genre,
+            members=club.members
+        ).returning(models.Club)
     )
-    db.add(db_club)
+    db_club = result.scalar_one()
     await db.commit()
-    await db.refresh(db_club)
+    await result_cache.invalidate(CLUBS_NAMESPACE)
     return db_club
 
 
 async def update_club(db: AsyncSession, club: schemas.ClubCreate, club_id: int):
-    result = await db.execute(select(models.Club).filter(models.Club.id == club_id))
-    db_club = result.scalars().first()
+    result = await db.execute(
+        update(models.Club).where(models.Club.id == club_id).values(
+            name=club.name,
+            description=club.description,
+            favorite_genre=club.favorite_genre,
+            members=club.members,
+            version=models.Club.version + 1
+        ).returning(models.Club)
+    )
+    db_club = result.scalar_one_or_none()
     if not db_club:
         raise ItemNotFound(f"Club with id {club_id} not found")
-    db_club.name = club.name
-    db_club.description = club.description
-    db_club.favorite_genre = club.favorite_genre
-    db_club.members = club.members
-    db.add(db_club)
     await db.commit()
-    await db.refresh(db_club)
+    await result_cache.invalidate(CLUBS_NAMESPACE)
     return db_club
 
 
+async def get_club_version(db: AsyncSession, club_id: int):
+    result = await db.execute(select(models.Club.version).filter(models.Club.id == club_id))
+    version = result.scalar_one_or_none()
+    if version is None:
+        raise ItemNotFound(f"Club with id {club_id} not found")
+    return version
+
+
+async def bump_club_version(db: AsyncSession, club_id: int):
+    # Part of the caller's transaction: the new version commits with the change it describes
+    await db.execute(update(models.Club).where(models.Club.id == club_id).values(version=models.Club.version + 1))
+
+
 async def get_club_by_id(db: AsyncSession, club_id: int):
     result = await db.execute(select(models.Club).filter(models.Club.id == club_id))
     club = result.scalars().first()
@@ -73,33 +300,110 @@ async def get_club_by_id(db: AsyncSession, club_id: int):
 
 
 async def delete_club(db: AsyncSession, club_id: int):
-    result = await db.execute(select(models.Club).filter(models.Club.id == club_id))
-    db_club = result.scalars().first()
+    result = await db.execute(delete(models.Club).where(models.Club.id == club_id).returning(models.Club))
+    db_club = result.scalar_one_or_none()
     if not db_club:
         raise ItemNotFound(f"Club with id {club_id} not found")
-    await db.delete(db_club)
     await db.commit()
+    await result_cache.invalidate(CLUBS_NAMESPACE)
+    await invalidate_club_books(club_id)
     return db_club
 
 
+async def _after_bulk_insert(db: AsyncSession, model, inserted: list):
+    if model is models.Review:
+        await _apply_bulk_review_stats(db, inserted)
+    if "club_id" in model.__table__.c:
+        for club_id in sorted({values["club_id"] for values in inserted}):
+            await bump_club_version(db, club_id)
+
+
+async def _invalidate_after_bulk_insert(model, inserted: list):
+    if model is models.Club:
+        await result_cache.invalidate(CLUBS_NAMESPACE)
+    elif "club_id" in model.__table__.c:
+        await invalidate_club_books(*(values["club_id"] for values in inserted))
+
+
+async def bulk_insert(db: AsyncSession, model, rows: list):
+    """Inserts ``(index, values)`` rows in one transaction; returns per-row results."""
+    try:
+        result = await db.execute(
+            insert(model).returning(model.id, sort_by_parameter_order=True),
+            [values for _, values in rows],
+        )
+        ids = result.scalars().all()
+        await _after_bulk_insert(db, model, [values for _, values in rows])
+        await db.commit()
+        await _invalidate_after_bulk_insert(model, [values for _, values in rows])
+        return [{"index": index, "status": "created", "id": row_id} for (index, _), row_id in zip(rows, ids)]
+    except IntegrityError:
+        await db.rollback()
+
+    # Slow path: a savepoint per row isolates the ones that violate a constraint
+    results = []
+    inserted = []
+    for index, values in rows:
+        try:
+            async with db.begin_nested():
+                result = await db.execute(insert(model).values(**values).returning(model.id))
+                row_id = result.scalar_one()
+            results.append({"index": index, "status": "created", "id": row_id})
+            inserted.append(values)
+        except IntegrityError:
+            results.append({"index": index, "status": "error", "detail": "Database integrity error"})
+    if inserted:
+        await _after_bulk_insert(db, model, inserted)
+    await db.commit()
+    if inserted:
+        await _invalidate_after_bulk_insert(model, inserted)
+    return results
+
+
 ## BOOKS
-async def get_books_by_club_id(db: AsyncSession, club_id: int, skip: int = 0, limit: int = 100):
-    result = await db.execute(select(models.Book).filter(models.Book.club_id == club_id).offset(skip).limit(limit))
-    return result.scalars().all()
+async def get_books_by_club_id(db: AsyncSession, club_id: int, skip: int = 0, limit: int = 100, after_id: int | None = None):
+    query = (
+        select(
+            *_out_columns(models.Book, schemas.BookOut, exclude=("review_count", "average_rating")),
+            func.coalesce(models.ReviewStats.review_count, 0).label("review_count"),
+            models.ReviewStats.rating_sum,
+        )
+        .outerjoin(models.ReviewStats, models.ReviewStats.book_id == models.Book.id)
+        .filter(models.Book.club_id == club_id)
+        .order_by(models.Book.id)
+        .limit(limit)
+    )
+    if after_id is not None:
+        query = query.filter(models.Book.id > after_id)
+    else:
+        query = query.offset(skip)
+    result = await db.execute(query)
+    # The average is rounded in Python, as ReviewStats.average_rating does for single books
+    return [
+        schemas.BookOut.model_construct(
+            id=row.id, club_id=row.club_id, title=row.title, author=row.author,
+            votes=row.votes or 0, progress=row.progress or 0, review_count=row.review_count,
+            average_rating=models.ReviewStats.mean(row.rating_sum, row.review_count),
+        )
+        for row in result
+    ]
 
 
 async def create_book(db: AsyncSession, book: schemas.BookCreate):
     try:
-        db_book = models.Book(
-            club_id=book.club_id,
-            title=book.title,
-            author=book.author,
-            votes=book.votes,
-            progress=book.progress
+        result = await db.execute(
+            insert(models.Book).values(
+                club_id=book.club_id,
+                title=book.title,
+                author=book.author,
+                votes=book.votes,
+                progress=book.progress
+            ).returning(models.Book)
         )
-        db.add(db_book) 
+        db_book = result.scalar_one()
+        await bump_club_version(db, db_book.club_id)
         await db.commit()
-        await db.refresh(db_book)
+        await invalidate_club_books(db_book.club_id)
         return db_book
 
 
@@ -110,78 +414,187 @@ async def create_book(db: AsyncSession, book: schemas.BookCreate):
 
 
 async def get_book_by_id(db: AsyncSession, book_id: int, club_id: int):
-    result = await db.execute(select(models.Book).filter(models.Book.id == book_id, models.Book.club_id == club_id))
+    result = await db.execute(
+        select(models.Book)
+        .options(joinedload(models.Book.stats))
+        .filter(models.Book.id == book_id, models.Book.club_id == club_id)
+    )
     book = result.scalars().first()
     if not book:
         raise ItemNotFound(f"Book with id {book_id} not found in club {club_id}")
     return book
 
 
-async def add_votes_by_book_id(db: AsyncSession, book_id: int, club_id: int):
-    result = await db.execute(select(models.Book).filter(models.Book.id == book_id, models.Book.club_id == club_id))
-    book = result.scalars().first()
-    if not book:
+async def has_user_voted(db: AsyncSession, book_id: int, user_id: int):
+    result = await db.execute(
+        select(models.BookVote.id).filter(models.BookVote.book_id == book_id, models.BookVote.user_id == user_id)
+    )
+    return result.first() is not None
+
+
+async def _bump_votes(db: AsyncSession, book_id: int, club_id: int, delta: int):
+    # UPDATE ... RETURNING: the increment happens in the database, so concurrent
+    # voters never overwrite each other and we skip the SELECT + refresh.
+    result = await db.execute(
+        update(models.Book)
+        .where(models.Book.id == book_id, models.Book.club_id == club_id)
+        .values(votes=func.coalesce(models.Book.votes, 0) + delta)
+        .returning(models.Book.votes)
+    )
+    return result.scalar_one_or_none()
+
+
+async def add_votes_by_book_id(db: AsyncSession, book_id: int, club_id: int, user_id: int):
+    # Book first: a missing book is a 404, never a foreign-key failure on the ledger
+    # insert misread as "already voted". The ledger's unique constraint then decides
+    # duplicates, and rolling back undoes the increment
+    votes = await _bump_votes(db, book_id, club_id, 1)
+    if votes is None:
+        await db.rollback()
         raise ItemNotFound(f"Book with id {book_id} not found in club {club_id}")
-    votes = book.votes
-    book.votes = votes + 1
-    db.add(book)
+    try:
+        await db.execute(insert(models.BookVote).values(book_id=book_id, user_id=user_id))
+    except IntegrityError:
+        await db.rollback()
+        raise ItemAlreadyExists(f"User {user_id} already voted for book {book_id}")
+    await bump_club_version(db, club_id)
     await db.commit()
-    await db.refresh(book)
-    return book.votes
+    await invalidate_club_books(club_id)
+    return votes
 
 
-async def delete_votes_by_book_id(db: AsyncSession, book_id: int, club_id: int):
-    result = await db.execute(select(models.Book).filter(models.Book.id == book_id, models.Book.club_id == club_id))
-    book = result.scalars().first()
-    if not book:
+async def delete_votes_by_book_id(db: AsyncSession, book_id: int, club_id: int, user_id: int):
+    result = await db.execute(
+        delete(models.BookVote).where(models.BookVote.book_id == book_id, models.BookVote.user_id == user_id)
+    )
+    if result.rowcount == 0:
+        await db.rollback()
+        raise ItemNotFound(f"Vote from user {user_id} not found for book {book_id}")
+    votes = await _bump_votes(db, book_id, club_id, -1)
+    if votes is None:
+        await db.rollback()
         raise ItemNotFound(f"Book with id {book_id} not found in club {club_id}")
-    votes = book.votes
-    book.votes = votes - 1
-    db.add(book)
+    await bump_club_version(db, club_id)
     await db.commit()
-    await db.refresh(book)
-    return book.votes
+    await invalidate_club_books(club_id)
+    return votes
 
 
-#Funcioens faltantes Books 
-async def get_book_progress(db: AsyncSession, book_id: int, club_id: int):
-    result = await db.execute(select(models.Book).filter(models.Book.id == book_id, models.Book.club_id == club_id))
-    book = result.scalars().first()
-    if book:
-        return book.progress
-    raise ItemNotFound(f"Book with id {book_id} not found in club {club_id}")
+# =========REVIEWS ============
+def _upsert(db: AsyncSession, table):
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(table)
+
+
+async def _locked(db: AsyncSession, query, model, *criteria):
+    """Returns ``query`` set to read under the write lock of ``model``'s rows matching ``criteria``.
+
+    PostgreSQL locks the rows with FOR UPDATE OF. SQLite has no row locks and pysqlite only
+    opens the transaction at the first write, so a no-op write takes the database lock before
+    the read and holds it until commit.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return query.with_for_update(of=model)
+    await db.execute(update(model).where(*criteria).values(id=model.id))
+    return query
+
+
+async def _apply_review_stats(db: AsyncSession, book_id: int, added=(), removed=()):
+    """Adds and removes ratings from a book's aggregates within the caller's transaction."""
+    table = models.ReviewStats.__table__
+    histogram = Counter(added)
+    histogram.subtract(removed)
+    buckets = {f"rating_{rating}": n for rating, n in histogram.items() if rating in models.ReviewStats.BUCKETS and n}
+    count = len(added) - len(removed)
+    total = sum(added) - sum(removed)
+    stmt = _upsert(db, table).values(book_id=book_id, review_count=count, rating_sum=total, **buckets)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.book_id],
+        set_={
+            "review_count": table.c.review_count + count,
+            "rating_sum": table.c.rating_sum + total,
+            **{name: table.c[name] + n for name, n in buckets.items()},
+        },
+    )
+    await db.execute(stmt)
 
 
-async def update_book_progress(db: AsyncSession, book_id: int, club_id: int, progress: int):
-    result = await db.execute(select(models.Book).filter(models.Book.id == book_id, models.Book.club_id == club_id))
-    book = result.scalars().first()
-    if book:
-        book.progress = max(0, min(100, progress))
-        await db.commit()
-        await db.refresh(book)
-        return book
-    raise ItemNotFound(f"Book with id {book_id} not found in club {club_id}")
+async def _apply_bulk_review_stats(db: AsyncSession, reviews: list):
+    ratings = {}
+    for values in reviews:
+        ratings.setdefault(values["book_id"], []).append(values["rating"])
+    for book_id, added in ratings.items():
+        await _apply_review_stats(db, book_id, added=added)
 
 
+async def get_review_stats(db: AsyncSession, book_id: int, club_id: int):
+    result = await db.execute(
+        select(models.Book.id, models.ReviewStats)
+        .outerjoin(models.ReviewStats, models.ReviewStats.book_id == models.Book.id)
+        .filter(models.Book.id == book_id, models.Book.club_id == club_id)
+    )
+    row = result.first()
+    if row is None:
+        raise ItemNotFound(f"Book with id {book_id} not found in club {club_id}")
+    if row.ReviewStats is None:
+        return models.ReviewStats(book_id=book_id, review_count=0, rating_sum=0,
+                                  **{f"rating_{rating}": 0 for rating in models.ReviewStats.BUCKETS})
+    return row.ReviewStats
+
+
+async def rebuild_review_stats(db: AsyncSession, book_id: int | None = None):
+    """Recomputes the aggregates from `reviews`; returns how many books have stats."""
+    review = models.Review
+    aggregates = select(
+        review.book_id,
+        func.count(),
+        func.coalesce(func.sum(review.rating), 0),
+        *[func.coalesce(func.sum(case((review.rating == rating, 1), else_=0)), 0) for rating in models.ReviewStats.BUCKETS],
+    ).group_by(review.book_id)
+    clear = delete(models.ReviewStats)
+    if book_id is not None:
+        aggregates = aggregates.where(review.book_id == book_id)
+        clear = clear.where(models.ReviewStats.book_id == book_id)
+    columns = ["book_id", "review_count", "rating_sum", *[f"rating_{rating}" for rating in models.ReviewStats.BUCKETS]]
+    await db.execute(clear)
+    result = await db.execute(insert(models.ReviewStats.__table__).from_select(columns, aggregates))
+    # Book lists show the aggregates: their clubs get a new version (ETag) and cache entry
+    clubs = select(models.Book.club_id)
+    if book_id is not None:
+        clubs = clubs.where(models.Book.id == book_id)
+    bumped = await db.execute(
+        update(models.Club).where(models.Club.id.in_(clubs)).values(version=models.Club.version + 1).returning(models.Club.id)
+    )
+    club_ids = bumped.scalars().all()
+    await db.commit()
+    await invalidate_club_books(*club_ids)
+    return result.rowcount
+
 
-# =========REVIEWS ============
 async def get_reviews_by_book_id(db: AsyncSession, book_id: int, club_id: int):
-    result = await db.execute(select(models.Review).filter(models.Review.book_id == book_id, models.Review.club_id == club_id))
-    return result.scalars().all()
+    result = await db.execute(
+        select(*_out_columns(models.Review, schemas.ReviewOut))
+        .filter(models.Review.book_id == book_id, models.Review.club_id == club_id)
+    )
+    return result.all()
 
 
 async def create_review(db: AsyncSession, review: schemas.ReviewCreate):
     try:
-        db_review = models.Review(
-            club_id=review.club_id,
-            book_id=review.book_id,
-            user_id=review.user_id,
-            rating=review.rating,
-            comment=review.comment
+        result = await db.execute(
+            insert(models.Review).values(
+                club_id=review.club_id,
+                book_id=review.book_id,
+                user_id=review.user_id,
+                rating=review.rating,
+                comment=review.comment
+            ).returning(models.Review)
         )
-        db.add(db_review) 
+        db_review = result.scalar_one()
+        await _apply_review_stats(db, db_review.book_id, added=[db_review.rating])
+        await bump_club_version(db, db_review.club_id)
         await db.commit()
-        await db.refresh(db_review)
+        await invalidate_club_books(db_review.club_id)
         return db_review
 
     except Exception as e:
@@ -189,31 +602,48 @@ async def create_review(db: AsyncSession, review: schemas.ReviewCreate):
 
 
 async def update_review(db: AsyncSession, review: schemas.ReviewUpdate):
+    match = (models.Review.id == review.id, models.Review.club_id == review.club_id, models.Review.book_id == review.book_id)
     try:
-        result = await db.execute(select(models.Review).filter(models.Review.id == review.id, models.Review.club_id == review.club_id, models.Review.book_id == review.book_id))
-        db_review = result.scalars().first()
+        # The old rating is needed to move it between histogram buckets; it must not change before they move
+        result = await db.execute(await _locked(db, select(models.Review.rating).where(*match), models.Review, *match))
+        old_rating = result.scalar_one_or_none()
+        if old_rating is None:
+            await db.rollback()
+            raise ItemNotFound(f"Review not found")
+        result = await db.execute(
+            update(models.Review)
+            .where(*match)
+            .values(rating=review.rating, comment=review.comment)
+            .returning(models.Review)
+        )
+        db_review = result.scalar_one_or_none()
         if not db_review:
             raise ItemNotFound(f"Review not found")
-
-        db_review.rating = review.rating
-        db_review.comment = review.comment
-        db.add(db_review) 
+        if old_rating != db_review.rating:
+            await _apply_review_stats(db, db_review.book_id, added=[db_review.rating], removed=[old_rating])
+            # Only the aggregates on the club's book listing can change
+            await bump_club_version(db, db_review.club_id)
         await db.commit()
-        await db.refresh(db_review)
+        if old_rating != db_review.rating:
+            await invalidate_club_books(db_review.club_id)
         return db_review
 
+    except ItemNotFound:
+        raise
     except Exception as e:
         raise DatabaseError(f"An error occurred: {str(e)}")
 
 
 async def delete_review(db: AsyncSession, review_id: int):
     try:
-        result = await db.execute(select(models.Review).filter(models.Review.id == review_id))
-        db_review = result.scalars().first()
+        result = await db.execute(delete(models.Review).where(models.Review.id == review_id).returning(models.Review))
+        db_review = result.scalar_one_or_none()
         if not db_review:
             raise ItemNotFound(f"Review with id {review_id} not found")
-        await db.delete(db_review)
+        await _apply_review_stats(db, db_review.book_id, removed=[db_review.rating])
+        await bump_club_version(db, db_review.club_id)
         await db.commit()
+        await invalidate_club_books(db_review.club_id)
         return db_review
 
     except ItemNotFound:
@@ -222,9 +652,178 @@ async def delete_review(db: AsyncSession, review_id: int):
         raise DatabaseError(f"An error occurred: {str(e)}")
 
 
+# =========READING PROGRESS============
+async def _apply_progress_stats(db: AsyncSession, book_id: int, added: int | None = None, removed: int | None = None):
+    """Moves one reader within the book's progress aggregates; returns the new totals."""
+    table = models.ProgressStats.__table__
+    count = (added is not None) - (removed is not None)
+    total = (added or 0) - (removed or 0)
+    finished = (added == 100) - (removed == 100)
+    buckets = Counter()
+    if added is not None:
+        buckets[f"bucket_{models.ProgressStats.bucket_for(added)}"] += 1
+    if removed is not None:
+        buckets[f"bucket_{models.ProgressStats.bucket_for(removed)}"] -= 1
+    buckets = {name: n for name, n in buckets.items() if n}
+    stmt = _upsert(db, table).values(book_id=book_id, reader_count=count, progress_sum=total, finished_count=finished, **buckets)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.book_id],
+        set_={
+            "reader_count": table.c.reader_count + count,
+            "progress_sum": table.c.progress_sum + total,
+            "finished_count": table.c.finished_count + finished,
+            **{name: table.c[name] + n for name, n in buckets.items()},
+        },
+    ).returning(table.c.reader_count, table.c.progress_sum)
+    result = await db.execute(stmt)
+    return result.one()
+
+
+async def _record_reading_progress(db: AsyncSession, book_id: int, club_id: int, user_id: int, progress: int):
+    """Stores one reader's progress without committing; returns the book's new totals, or None if unchanged."""
+    progress = max(0, min(100, progress))
+    # One query checks the book belongs to the club and fetches the reader's previous value.
+    # The previous value must not change before the stats move by it, so writers of the book are serialized
+    match = (models.Book.id == book_id, models.Book.club_id == club_id)
+    query = (
+        select(models.Book.id, models.ReadingProgress.progress)
+        .outerjoin(
+            models.ReadingProgress,
+            (models.ReadingProgress.book_id == models.Book.id) & (models.ReadingProgress.user_id == user_id),
+        )
+        .filter(*match)
+    )
+    result = await db.execute(await _locked(db, query, models.Book, *match))
+    row = result.first()
+    if row is None:
+        raise ItemNotFound(f"Book with id {book_id} not found in club {club_id}")
+    previous = row.progress
+    if previous == progress:
+        return None
+    table = models.ReadingProgress.__table__
+    stmt = _upsert(db, table).values(book_id=book_id, user_id=user_id, progress=progress)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.book_id, table.c.user_id],
+        set_={"progress": progress, "updated_at": func.now()},
+    )
+    await db.execute(stmt)
+    return await _apply_progress_stats(db, book_id, added=progress, removed=previous)
+
+
+async def _sync_book_progress(db: AsyncSession, book_id: int, club_id: int, totals):
+    # libros.progress (BookOut.progress) mirrors the club average
+    reader_count, progress_sum = totals
+    average = round(progress_sum / reader_count) if reader_count else 0
+    result = await db.execute(
+        update(models.Book)
+        .where(models.Book.id == book_id, models.Book.progress.is_distinct_from(average))
+        .values(progress=average)
+    )
+    if result.rowcount:
+        await bump_club_version(db, club_id)
+    return bool(result.rowcount)
+
+
+async def update_reading_progress(db: AsyncSession, book_id: int, club_id: int, user_id: int, progress: int):
+    totals = await _record_reading_progress(db, book_id, club_id, user_id, progress)
+    changed = totals is not None and await _sync_book_progress(db, book_id, club_id, totals)
+    await db.commit()
+    if changed:
+        await invalidate_club_books(club_id)
+
+
+async def update_reading_progress_batch(db: AsyncSession, updates: dict):
+    """Writes ``{(club_id, book_id, user_id): progress}`` in one transaction.
+
+    Books that no longer exist are skipped; the club average is synced once per book.
+    """
+    totals_by_book = {}
+    for (club_id, book_id, user_id), progress in updates.items():
+        try:
+            totals = await _record_reading_progress(db, book_id, club_id, user_id, progress)
+        except ItemNotFound:
+            continue
+        if totals is not None:
+            totals_by_book[(club_id, book_id)] = totals
+    changed_clubs = set()
+    for (club_id, book_id), totals in totals_by_book.items():
+        if await _sync_book_progress(db, book_id, club_id, totals):
+            changed_clubs.add(club_id)
+    await db.commit()
+    await invalidate_club_books(*changed_clubs)
+
+
+async def get_reading_progress(db: AsyncSession, book_id: int, club_id: int, user_id: int):
+    result = await db.execute(
+        select(models.Book.id, models.ReadingProgress.progress, models.ProgressStats)
+        .outerjoin(
+            models.ReadingProgress,
+            (models.ReadingProgress.book_id == models.Book.id) & (models.ReadingProgress.user_id == user_id),
+        )
+        .outerjoin(models.ProgressStats, models.ProgressStats.book_id == models.Book.id)
+        .filter(models.Book.id == book_id, models.Book.club_id == club_id)
+    )
+    row = result.first()
+    if row is None:
+        raise ItemNotFound(f"Book with id {book_id} not found in club {club_id}")
+    stats = row.ProgressStats
+    return {
+        "book_id": book_id,
+        "progress": row.progress or 0,
+        "readers": stats.reader_count if stats else 0,
+        "mean_progress": stats.mean_progress if stats else None,
+        "median_bucket": stats.median_bucket if stats else None,
+        "finished_count": stats.finished_count if stats else 0,
+    }
+
+
 # =========MEETINGS ============
-async def get_meetings_by_club_id(db: AsyncSession, club_id: int):
-    result = await db.execute(select(models.Meeting).filter(models.Meeting.club_id == club_id))
+def _calendar_page(query, start: datetime | None, end: datetime | None, after: tuple | None, limit: int):
+    # Keyset on (scheduled_at, id): a year-long calendar is an index range, not an OFFSET walk.
+    # Undated meetings sort last and can't fall inside a range, so ranged reads never see them
+    at = models.Meeting.scheduled_at
+    ranged = start is not None or end is not None
+    if start is not None:
+        query = query.filter(at >= start)
+    if end is not None:
+        query = query.filter(at < end)
+    if after is not None:
+        after_at, after_id = after
+        if after_at is None:
+            query = query.filter(at.is_(None), models.Meeting.id > after_id)
+        elif ranged:
+            query = query.filter(tuple_(at, models.Meeting.id) > tuple_(after_at, after_id))
+        else:
+            query = query.filter(or_(tuple_(at, models.Meeting.id) > tuple_(after_at, after_id), at.is_(None)))
+    if ranged:
+        query = query.order_by(at, models.Meeting.id)
+    else:
+        query = query.order_by(at.is_(None), at, models.Meeting.id)
+    return query.limit(limit)
+
+
+async def get_meetings_by_club_id(db: AsyncSession, club_id: int, start: datetime | None = None, end: datetime | None = None,
+                                  status: str | None = None, limit: int = 100, after: tuple | None = None):
+    """A club's meetings in [start, end), in date order; ``after`` is a decoded time cursor."""
+    query = select(models.Meeting).filter(models.Meeting.club_id == club_id)
+    if status is not None:
+        query = query.filter(models.Meeting.status == status)
+    result = await db.execute(_calendar_page(query, start, end, after, limit))
+    return result.scalars().all()
+
+
+async def get_upcoming_meetings_for_user(db: AsyncSession, user_id: int, start: datetime | None = None, end: datetime | None = None,
+                                         limit: int = 100, after: tuple | None = None):
+    """Meetings in any club the user said they would (or might) attend, from ``start`` (default now)."""
+    # A semi-join on the user's attendance rows: walks ix_meeting_attendance_user_id_meeting_id,
+    # then meetings by primary key, and never repeats a meeting
+    attending = select(models.MeetingAttendance.meeting_id).where(
+        models.MeetingAttendance.user_id == user_id,
+        models.MeetingAttendance.status != schemas.AttendanceValue.NO.value,
+    )
+    query = select(models.Meeting).filter(models.Meeting.id.in_(attending))
+    start = start or datetime.now(timezone.utc)
+    result = await db.execute(_calendar_page(query, start, end, after, limit))
     return result.scalars().all()
 
 
@@ -245,7 +844,7 @@ async def create_meeting(db: AsyncSession, meeting: schemas.MeetingCreate):
             except ValueError:
                 pass
 
-        db_meeting = models.Meeting(
+        result = await db.execute(insert(models.Meeting).values(
             book_id = meeting.bookId,
             club_id = meeting.clubId,
             book_title = meeting.bookTitle,
@@ -255,14 +854,13 @@ async def create_meeting(db: AsyncSession, meeting: schemas.MeetingCreate):
             locationUrl = meeting.locationUrl,
             description = meeting.description,
             createdBy = meeting.createdBy,
-            attendeeCount = meeting.attendeeCount,
             status = meeting.status,
             isVirtual = meeting.isVirtual,
             virtualMeetingUrl  = meeting.virtualMeetingUrl,
-        )
-        db.add(db_meeting) 
+        ).returning(models.Meeting))
+        db_meeting = result.scalar_one()
+        await bump_club_version(db, db_meeting.club_id)
         await db.commit()
-        await db.refresh(db_meeting)
         return db_meeting
 
     except Exception as e:
@@ -271,14 +869,14 @@ async def create_meeting(db: AsyncSession, meeting: schemas.MeetingCreate):
 # = = = = = Implementación DELETE CLUBS = = = = = 
 async def delete_meeting(db: AsyncSession, club_id: int, meeting_id: int):
     try:
-        result = await db.execute(select(models.Meeting).filter(
+        result = await db.execute(delete(models.Meeting).where(
             models.Meeting.id == meeting_id,
             models.Meeting.club_id == club_id
-        ))
-        db_meeting = result.scalars().first()
+        ).returning(models.Meeting))
+        db_meeting = result.scalar_one_or_none()
 
         if db_meeting:
-            await db.delete(db_meeting)
+            await bump_club_version(db, club_id)
             await db.commit()
             return db_meeting  # para confirmar
         raise ItemNotFound(f"Meeting with id {meeting_id} not found in club {club_id}") 
@@ -291,17 +889,77 @@ async def delete_meeting(db: AsyncSession, club_id: int, meeting_id: int):
 # =========MEETINGS ATTENDANCE============
 
 async def create_attendance_meeting(db: AsyncSession, meeting_id, meeting: schemas.MeetingAttendanceCreate):
+    """Records or changes a member's answer; the meeting's per-status counters move in the same transaction."""
+    status = schemas.AttendanceValue(meeting.status).value
     try:
-        db_attendance = models.MeetingAttendance(
-            meeting_id = meeting_id,
-            user_id = meeting.user_id,
-            status = meeting.status
+        # One query checks the meeting exists and fetches the member's previous answer.
+        # Locking the meeting serializes answers to it, so the deltas below can't race
+        query = (
+            select(models.Meeting.club_id, models.MeetingAttendance)
+            .outerjoin(
+                models.MeetingAttendance,
+                (models.MeetingAttendance.meeting_id == models.Meeting.id) & (models.MeetingAttendance.user_id == meeting.user_id),
+            )
+            .filter(models.Meeting.id == meeting_id)
         )
-
-        db.add(db_attendance) 
+        result = await db.execute(await _locked(db, query, models.Meeting, models.Meeting.id == meeting_id))
+        row = result.first()
+        if row is None:
+            await db.rollback()
+            raise ItemNotFound(f"Meeting with id {meeting_id} not found")
+        previous = row.MeetingAttendance.status if row.MeetingAttendance else None
+        if previous == status:
+            await db.commit()
+            return row.MeetingAttendance
+
+        stmt = _upsert(db, models.MeetingAttendance).values(meeting_id=meeting_id, user_id=meeting.user_id, status=status)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.MeetingAttendance.meeting_id, models.MeetingAttendance.user_id],
+            set_={"status": status},
+        ).returning(models.MeetingAttendance)
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        db_attendance = result.scalar_one()
+        counters = {models.Meeting.COUNTERS[status]: 1}
+        if previous is not None:
+            counters[models.Meeting.COUNTERS[previous]] = -1
+        await db.execute(
+            update(models.Meeting)
+            .where(models.Meeting.id == meeting_id)
+            .values({name: getattr(models.Meeting, name) + n for name, n in counters.items()})
+        )
+        # The counts are part of the club's meeting listing (ETag)
+        await bump_club_version(db, row.club_id)
         await db.commit()
-        await db.refresh(db_attendance)
         return db_attendance
 
+    except ItemNotFound:
+        raise
     except Exception as e:
         raise DatabaseError(f"An error occurred: {str(e)}")
+
+# =========EXPORT============
+async def stream_club_export(db: AsyncSession, club_id: int, batch_size: int = 1000):
+    """Yields ``(kind, rows)`` batches of a club's data through server-side cursors.
+
+    Core table selects keep rows out of the session identity map, so memory
+    stays bounded by ``batch_size`` whatever the size of the club.
+    """
+    attendance = models.MeetingAttendance.__table__
+    meetings = models.Meeting.__table__
+    queries = [
+        ("club", select(models.Club.__table__).where(models.Club.id == club_id)),
+        ("book", select(models.Book.__table__).where(models.Book.club_id == club_id).order_by(models.Book.id)),
+        ("review", select(models.Review.__table__).where(models.Review.club_id == club_id).order_by(models.Review.id)),
+        ("meeting", select(meetings).where(meetings.c.club_id == club_id).order_by(meetings.c.id)),
+        ("attendance", select(attendance)
+            .join(meetings, attendance.c.meeting_id == meetings.c.id)
+            .where(meetings.c.club_id == club_id)
+            .order_by(attendance.c.id)),
+    ]
+    for kind, query in queries:
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        try:
+            async for partition in result.partitions(batch_size):
+                yield kind, [row._mapping for row in partition]
+        finally:
+            await result.close()
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Boolean
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Boolean, UniqueConstraint, Index
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -14,6 +15,21 @@ class User(Base):
     created_at  = Column(DateTime(timezone=True), server_default=func.now())
 
 
+class RefreshToken(Base):
+    """One refresh token; rotating it revokes this row and adds the next one to the same family."""
+    __tablename__ = "refresh_tokens"
+    id         = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    # HMAC of the token: a leaked table can't be replayed
+    token_hash = Column(String, unique=True, index=True, nullable=False)
+    user_id    = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    # Every token issued from one login; reuse of a rotated token revokes them all
+    family_id  = Column(String, nullable=False, index=True)
+    # Indexed for purge_refresh_tokens
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class Club(Base):
     __tablename__ = "clubes"
     id             = Column(Integer, primary_key=True, index=True, autoincrement=True)
@@ -22,10 +38,14 @@ class Club(Base):
     favorite_genre = Column(String)
     members        = Column(Integer)
     created_date   = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by every write that changes what the club's read endpoints return (ETags)
+    version        = Column(Integer, nullable=False, default=1, server_default="1")
 
 
 class Book(Base):
     __tablename__ = "libros"
+    # club_id first: serves the club listing (keyset on id) and id + club_id lookups
+    __table_args__ = (Index("ix_libros_club_id_id", "club_id", "id"),)
     id             = Column(Integer, primary_key=True, index=True, autoincrement=True)
     club_id        = Column(Integer, ForeignKey("clubes.id"), nullable=False)
     title          = Column(String, nullable=False)
@@ -33,10 +53,81 @@ class Book(Base):
     votes          = Column(Integer, default=0)
     progress       = Column(Integer, default=0)  # Porcentaje    
     created_date   = Column(DateTime(timezone=True), server_default=func.now())
+    # Never loaded implicitly; read queries opt in with joinedload(Book.stats)
+    stats          = relationship("ReviewStats", uselist=False, viewonly=True, lazy="noload")
+
+    @property
+    def review_count(self):
+        return self.stats.review_count if self.stats else 0
+
+    @property
+    def average_rating(self):
+        return self.stats.average_rating if self.stats else None
+
+
+class BookVote(Base):
+    __tablename__ = "book_votes"
+    __table_args__ = (UniqueConstraint("book_id", "user_id", name="uq_book_votes_book_user"),)
+    id           = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    book_id      = Column(Integer, ForeignKey("libros.id"), nullable=False)
+    user_id      = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_date = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ReadingProgress(Base):
+    __tablename__ = "reading_progress"
+    __table_args__ = (UniqueConstraint("book_id", "user_id", name="uq_reading_progress_book_user"),)
+    id         = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    book_id    = Column(Integer, ForeignKey("libros.id"), nullable=False)
+    user_id    = Column(Integer, ForeignKey("users.id"), nullable=False)
+    progress   = Column(Integer, nullable=False, default=0)  # Porcentaje
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class ProgressStats(Base):
+    """Club-wide reading progress per book, kept in step with `reading_progress`."""
+    __tablename__ = "progress_stats"
+    BUCKETS = range(10)  # 0-9%, 10-19%, ..., 90-100%
+    book_id        = Column(Integer, ForeignKey("libros.id"), primary_key=True)
+    reader_count   = Column(Integer, nullable=False, default=0, server_default="0")
+    progress_sum   = Column(Integer, nullable=False, default=0, server_default="0")
+    finished_count = Column(Integer, nullable=False, default=0, server_default="0")
+    bucket_0       = Column(Integer, nullable=False, default=0, server_default="0")
+    bucket_1       = Column(Integer, nullable=False, default=0, server_default="0")
+    bucket_2       = Column(Integer, nullable=False, default=0, server_default="0")
+    bucket_3       = Column(Integer, nullable=False, default=0, server_default="0")
+    bucket_4       = Column(Integer, nullable=False, default=0, server_default="0")
+    bucket_5       = Column(Integer, nullable=False, default=0, server_default="0")
+    bucket_6       = Column(Integer, nullable=False, default=0, server_default="0")
+    bucket_7       = Column(Integer, nullable=False, default=0, server_default="0")
+    bucket_8       = Column(Integer, nullable=False, default=0, server_default="0")
+    bucket_9       = Column(Integer, nullable=False, default=0, server_default="0")
+
+    @staticmethod
+    def bucket_for(progress: int) -> int:
+        return min(progress // 10, 9)
+
+    @property
+    def mean_progress(self):
+        return round(self.progress_sum / self.reader_count, 2) if self.reader_count else None
+
+    @property
+    def median_bucket(self):
+        if not self.reader_count:
+            return None
+        # Lower median: the bucket holding the ((n - 1) // 2)-th reader in progress order
+        position = (self.reader_count - 1) // 2
+        seen = 0
+        for bucket in self.BUCKETS:
+            seen += getattr(self, f"bucket_{bucket}") or 0
+            if seen > position:
+                return f"{bucket * 10}-{bucket * 10 + 9}" if bucket < 9 else "90-100"
+        return None
 
 
 class Review(Base):
     __tablename__ = "reviews"
+    __table_args__ = (Index("ix_reviews_club_id_book_id", "club_id", "book_id"),)
     id           = Column(Integer, primary_key=True, index=True, autoincrement=True)
     book_id      = Column(Integer, ForeignKey("libros.id"), nullable=False)
     club_id      = Column(Integer, ForeignKey("clubes.id"), nullable=False)
@@ -46,6 +137,32 @@ class Review(Base):
     created_date = Column(DateTime(timezone=True), server_default=func.now())
 
 
+class ReviewStats(Base):
+    """Per-book review aggregates, kept in step with `reviews` by the crud writers."""
+    __tablename__ = "review_stats"
+    BUCKETS = range(1, 6)
+    book_id      = Column(Integer, ForeignKey("libros.id"), primary_key=True)
+    review_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum   = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_1     = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_2     = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_3     = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_4     = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_5     = Column(Integer, nullable=False, default=0, server_default="0")
+
+    @staticmethod
+    def mean(rating_sum, review_count):
+        return round(rating_sum / review_count, 2) if review_count else None
+
+    @property
+    def average_rating(self):
+        return self.mean(self.rating_sum, self.review_count)
+
+    @property
+    def histogram(self):
+        return {rating: getattr(self, f"rating_{rating}") or 0 for rating in self.BUCKETS}
+
+
 class Testing(Base):
     __tablename__ = "testing"
     id           = Column(Integer, primary_key=True, index=True, autoincrement=True)
@@ -55,6 +172,13 @@ class Testing(Base):
 
 class Meeting(Base):
     __tablename__ = "meetings"
+    # AttendanceValue -> the column counting it
+    COUNTERS = {"SI": "attendeeCount", "TAL_VEZ": "maybeCount", "NO": "declinedCount"}
+    __table_args__ = (
+        Index("ix_meetings_club_id_id", "club_id", "id"),
+        # Calendar reads: a club's meetings in a time range, in (scheduled_at, id) order
+        Index("ix_meetings_club_id_scheduled_at", "club_id", "scheduled_at", "id"),
+    )
     id                = Column(Integer, primary_key=True, index=True, autoincrement=True)
     book_id           = Column(Integer, ForeignKey("libros.id"), nullable=False)
     club_id           = Column(Integer, ForeignKey("clubes.id"), nullable=False)
@@ -65,7 +189,10 @@ class Meeting(Base):
     locationUrl       = Column(String)
     description       = Column(String)
     createdBy         = Column(String)
-    attendeeCount     = Column(Integer)
+    # Attendance answers per status, kept in step with `meeting_attendance` by the crud writers
+    attendeeCount     = Column(Integer, nullable=False, default=0, server_default="0")
+    maybeCount        = Column(Integer, nullable=False, default=0, server_default="0")
+    declinedCount     = Column(Integer, nullable=False, default=0, server_default="0")
     status            = Column(String)
     isVirtual         = Column(Boolean)
     virtualMeetingUrl = Column(String)
@@ -73,6 +200,12 @@ class Meeting(Base):
 
 class MeetingAttendance(Base):
     __tablename__ = "meeting_attendance"
+    __table_args__ = (
+        # One answer per member; its index also serves the per-meeting lookups
+        UniqueConstraint("meeting_id", "user_id", name="uq_meeting_attendance_meeting_user"),
+        # "My meetings": a user's attendance rows without scanning every meeting
+        Index("ix_meeting_attendance_user_id_meeting_id", "user_id", "meeting_id"),
+    )
     id         = Column(Integer, primary_key=True, index=True, autoincrement=True)
     meeting_id = Column(Integer, ForeignKey("meetings.id"), nullable=False)
     user_id    = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -59,21 +59,32 @@ class BookOut(BaseModel):
     author: str
     votes: int = 0
     progress: int = 0  
+    review_count: int = 0
+    average_rating: Optional[float] = None
 
 
 
+class ReadingProgressOut(BaseModel):
+    book_id: int
+    progress: int = 0  # Porcentaje del usuario actual
+    readers: int = 0
+    mean_progress: Optional[float] = None
+    median_bucket: Optional[str] = None
+    finished_count: int = 0
+
+
 class ReviewCreate(BaseModel):
     club_id: int
     book_id: int
     user_id: int
-    rating: int
+    rating: int = Field(ge=1, le=5)
     comment: str  
 
 class ReviewUpdate(BaseModel):
     id: int
     club_id: int
     book_id: int
-    rating: int
+    rating: int = Field(ge=1, le=5)
     comment: str 
 
 class ReviewOut(BaseModel):
@@ -85,6 +96,15 @@ class ReviewOut(BaseModel):
     comment: str  
 
 
+class ReviewStatsOut(BaseModel):
+    book_id: int
+    review_count: int = 0
+    average_rating: Optional[float] = None
+    histogram: dict[int, int]
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class MeetingCreate(BaseModel):
     bookId: int| int = None
     clubId: int| int = None
@@ -95,7 +115,6 @@ class MeetingCreate(BaseModel):
     locationUrl: str| str = None
     description: str| str = None
     createdBy: str | None = None
-    attendeeCount: int | None = None
     status: str | None = None  # Próxima | Vencida | Cancelada
     isVirtual: bool | None = None
     virtualMeetingUrl: str| str = None
@@ -111,7 +130,6 @@ class MeetingUpdate(BaseModel):
     locationUrl: str| str = None
     description: str| str = None
     createdBy: str | None = None
-    attendeeCount: int | None = None
     status: str | None = None  # Próxima | Vencida | Cancelada
     isVirtual: bool | None = None
     virtualMeetingUrl: str| str = None
@@ -128,6 +146,8 @@ class MeetingOut(BaseModel):
     description: str| str = None
     createdBy: str | None = None
     attendeeCount: int | None = None
+    maybeCount: int | None = None
+    declinedCount: int | None = None
     status: str | None = None  # Próxima | Vencida | Cancelada
     isVirtual: bool | None = None
     virtualMeetingUrl: str| str = None
@@ -142,9 +162,27 @@ class MeetingAttendanceOut(BaseModel):
     user_id: int | int = None
     status: str | None = None  
 
+class BulkRowResult(BaseModel):
+    index: int
+    status: str  # created | error
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class BulkImportResult(BaseModel):
+    created: int
+    failed: int
+    results: list[BulkRowResult]
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
     
 class Config:
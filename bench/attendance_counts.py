@@ -0,0 +1,107 @@
+"""Meeting listing with attendance counts: COUNT(*) per meeting vs the stored counters.
+
+    python bench/attendance_counts.py --meetings 200 --members 100 --repeat 30
+
+"count per meeting" lists a club's meetings, then counts each meeting's
+answers by status, as a listing had to before the counters existed.
+"grouped count" does it in one aggregate query. "counters" is
+crud.get_meetings_by_club_id, which reads attendeeCount / maybeCount /
+declinedCount off the meeting rows. The last line times one changed answer.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from os.path import dirname, abspath
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+from sqlalchemy import insert, func
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models, schemas, crud
+
+STATUSES = [value.value for value in schemas.AttendanceValue]
+
+
+async def seed(SessionLocal, engine, args):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(models.Club.__table__), {"id": 1, "name": "Big"})
+        await conn.execute(insert(models.Meeting.__table__), [{"club_id": 1, "book_id": 1} for _ in range(args.meetings)])
+    rng = random.Random(1)
+    # Through the crud writer, so the counters are the ones it maintains
+    async with SessionLocal() as db:
+        for meeting_id in range(1, args.meetings + 1):
+            for user_id in range(1, args.members + 1):
+                answer = schemas.MeetingAttendanceCreate(user_id=user_id, status=rng.choice(STATUSES))
+                await crud.create_attendance_meeting(db, meeting_id, answer)
+
+
+async def count_per_meeting(db):
+    meetings = (await db.execute(select(models.Meeting).filter(models.Meeting.club_id == 1))).scalars().all()
+    counts = {}
+    for meeting in meetings:
+        result = await db.execute(
+            select(models.MeetingAttendance.status, func.count())
+            .filter(models.MeetingAttendance.meeting_id == meeting.id)
+            .group_by(models.MeetingAttendance.status)
+        )
+        counts[meeting.id] = dict(result.all())
+    return counts
+
+
+async def grouped_count(db):
+    meetings = (await db.execute(select(models.Meeting).filter(models.Meeting.club_id == 1))).scalars().all()
+    result = await db.execute(
+        select(models.MeetingAttendance.meeting_id, models.MeetingAttendance.status, func.count())
+        .join(models.Meeting, models.Meeting.id == models.MeetingAttendance.meeting_id)
+        .filter(models.Meeting.club_id == 1)
+        .group_by(models.MeetingAttendance.meeting_id, models.MeetingAttendance.status)
+    )
+    return meetings, result.all()
+
+
+async def counters(db):
+    return await crud.get_meetings_by_club_id(db, club_id=1, limit=100_000)
+
+
+async def best_of(SessionLocal, read, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        async with SessionLocal() as db:
+            start = time.perf_counter()
+            await read(db)
+            best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+async def main(args):
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+    await seed(SessionLocal, engine, args)
+
+    print(f"{'listing':>18} {'ms':>9}")
+    for label, read in (("count per meeting", count_per_meeting), ("grouped count", grouped_count), ("counters", counters)):
+        print(f"{label:>18} {await best_of(SessionLocal, read, args.repeat):>9.2f}")
+
+    answers = iter(STATUSES * args.repeat)
+
+    async def change_answer(db):
+        # Cycling through the statuses makes every call a real change
+        await crud.create_attendance_meeting(db, 1, schemas.MeetingAttendanceCreate(user_id=args.members + 1, status=next(answers)))
+    print(f"{'answer write':>18} {await best_of(SessionLocal, change_answer, args.repeat):>9.2f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--meetings", type=int, default=200)
+    parser.add_argument("--members", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,96 @@
+"""Cost of bearer-token auth per request, by JWT backend and with the decoded-token cache.
+
+    python bench/auth_overhead.py --calls 20000 --requests 3000
+
+The first table times security.decode_access_token alone. The second
+sends requests to two no-op routes, one behind get_current_user, with the
+user already in user_cache, so the difference is the token check.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from os.path import dirname, abspath
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+from fastapi import Depends
+from httpx import AsyncClient, ASGITransport
+from app import models
+from app.core import security
+from app.core.rate_limit import limiter
+from app.core.user_cache import user_cache
+from main import app, get_current_user
+
+
+@app.get("/bench/open")
+async def open_route():
+    return {}
+
+
+@app.get("/bench/authed")
+async def authed_route(current_user: models.User = Depends(get_current_user)):
+    return {}
+
+
+def backends():
+    yield "jose", security.JoseBackend()
+    try:
+        yield "pyjwt", security.PyJWTBackend()
+    except RuntimeError:
+        print("(PyJWT not installed; skipping the pyjwt backend)")
+
+
+def setups():
+    for name, backend in backends():
+        yield f"{name}, no cache", backend, 0
+        yield f"{name}, cached", backend, security.TOKEN_CACHE_SIZE
+
+
+def use(backend, cache_size):
+    security.jwt_backend = backend
+    security.token_cache = security.TokenCache(maxsize=cache_size)
+
+
+def per_call(token, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        security.decode_access_token(token)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def per_request(client, url, headers, requests):
+    for _ in range(50):
+        await client.get(url, headers=headers)
+    start = time.perf_counter()
+    for _ in range(requests):
+        res = await client.get(url, headers=headers)
+        assert res.status_code == 200, res.text
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(args):
+    user_cache.set(models.User(id=1, username="bench", email="bench@example.com"))
+    token = security.create_access_token({"sub": "bench"})
+    headers = {"Authorization": f"Bearer {token}"}
+    limiter.enabled = False
+
+    print(f"{'decode':24} {'us/call':>9}")
+    for label, backend, cache_size in setups():
+        use(backend, cache_size)
+        print(f"{label:24} {per_call(token, args.calls):>9.2f}")
+
+    print(f"\n{'request':24} {'us/req':>9} {'auth us':>9}")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        baseline = await per_request(client, "/bench/open", headers, args.requests)
+        print(f"{'no auth':24} {baseline:>9.1f} {'-':>9}")
+        for label, backend, cache_size in setups():
+            use(backend, cache_size)
+            elapsed = await per_request(client, "/bench/authed", headers, args.requests)
+            print(f"{label:24} {elapsed:>9.1f} {elapsed - baseline:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=3000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,78 @@
+"""Steady polling of a club's book list, with and without If-None-Match.
+
+    python bench/etag_polling.py --books 500 --polls 2000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from os.path import dirname, abspath
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models
+from app.core.rate_limit import limiter
+from main import app, get_db, get_current_user
+
+
+async def poll(client, url, polls, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    start = time.perf_counter()
+    for _ in range(polls):
+        res = await client.get(url, headers=headers)
+    return (time.perf_counter() - start) / polls * 1000, res
+
+
+async def main(args):
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(models.Club.__table__).values(id=1, name="Bench Club", description="desc"))
+        await conn.execute(
+            insert(models.Book.__table__),
+            [{"club_id": 1, "title": f"Book {i}", "author": "Author"} for i in range(args.books)],
+        )
+
+    statements = 0
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        nonlocal statements
+        statements += 1
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    async def bench_user():
+        return models.User(id=1, username="bench", email="bench@example.com")
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = bench_user
+    limiter.enabled = False
+
+    url = f"/clubs/1/books?limit={args.books}"
+    print(f"{'mode':>12} {'ms/poll':>10} {'queries/poll':>13}")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        statements = 0
+        ms, res = await poll(client, url, args.polls)
+        print(f"{'full':>12} {ms:>10.2f} {statements / args.polls:>13.2f}")
+        statements = 0
+        ms, res = await poll(client, url, args.polls, etag=res.headers["etag"])
+        assert res.status_code == 304
+        print(f"{'conditional':>12} {ms:>10.2f} {statements / args.polls:>13.2f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=100)
+    parser.add_argument("--polls", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,305 @@
+"""Load test for the main API paths, with a stored baseline to catch regressions.
+
+    python bench/harness.py                                 # in-process, small scale
+    python bench/harness.py --mode uvicorn --workers 2 --concurrency 16
+    python bench/harness.py --clubs 200 --books 20 --reviews 20 --users 200 --requests 2000
+    python bench/harness.py --out results.json --baseline bench/baseline.json
+    python bench/harness.py --update-baseline bench/baseline.json
+
+Seeds a fresh SQLite database, then drives the real app: over ASGITransport
+in this process, or over HTTP against `uvicorn main:app`. Each scenario
+reports throughput and p50/p95/p99 latency. With --baseline the run exits 1
+when a scenario's p95 grows, or its throughput drops, by more than
+--threshold. Baselines are machine-specific; refresh them on the machine
+that runs the comparison.
+
+The other scripts in bench/ each isolate one mechanism; this one is the
+end-to-end number.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from os.path import dirname, abspath
+
+ROOT = dirname(dirname(abspath(__file__)))
+sys.path.append(ROOT)
+# Login cost is dominated by bcrypt; keep it realistic unless told otherwise
+os.environ.setdefault("BCRYPT_ROUNDS", "12")
+
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models, crud
+from app.core import security
+
+PASSWORD = "bench-password"
+SCENARIOS = ("login", "list_clubs", "vote", "list_reviews")
+
+
+async def seed(url: str, args):
+    engine = create_async_engine(url)
+    hashed = security.get_password_hash(PASSWORD)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(models.User.__table__),
+            [{"username": f"bench{i}", "email": f"bench{i}@example.com", "hashed_password": hashed, "full_name": f"Bench {i}"} for i in range(args.users)],
+        )
+        await conn.execute(
+            insert(models.Club.__table__),
+            [{"name": f"Club {i}", "description": "A reading club", "members": args.users} for i in range(args.clubs)],
+        )
+        books = [{"club_id": c + 1, "title": f"Book {c}-{b}", "author": "Author"} for c in range(args.clubs) for b in range(args.books)]
+        await conn.execute(insert(models.Book.__table__), books)
+        await conn.execute(
+            insert(models.Review.__table__),
+            [
+                {"club_id": book["club_id"], "book_id": book_id, "user_id": r % args.users + 1, "rating": r % 5 + 1, "comment": "Bench review"}
+                for book_id, book in enumerate(books, start=1)
+                for r in range(args.reviews)
+            ],
+        )
+    SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with SessionLocal() as db:
+        await crud.rebuild_review_stats(db)
+    await engine.dispose()
+    return len(books)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    # Nearest-rank on sorted samples
+    ordered = sorted(samples)
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+class Workload:
+    """The requests each scenario sends. Worker i acts as user i, so its votes never collide."""
+
+    def __init__(self, client, args, book_count: int):
+        self.client = client
+        self.args = args
+        self.book_count = book_count
+        self.tokens = {}
+        self.voted = set()
+
+    async def login_all(self, workers: int):
+        for worker in range(workers):
+            res = await self._login(worker)
+            self.tokens[worker] = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+    def _login(self, worker: int):
+        return self.client.post("/token", data={"username": f"bench{worker % self.args.users}", "password": PASSWORD})
+
+    def _book(self, rng):
+        book_id = rng.randrange(self.book_count) + 1
+        return (book_id - 1) // self.args.books + 1, book_id
+
+    async def login(self, worker, rng):
+        return await self._login(worker)
+
+    async def list_clubs(self, worker, rng):
+        return await self.client.get("/clubs", params={"limit": 100}, headers=self.tokens[worker])
+
+    async def vote(self, worker, rng):
+        club_id, book_id = self._book(rng)
+        url = f"/clubs/{club_id}/books/{book_id}/votes"
+        key = (worker, book_id)
+        if key in self.voted:
+            self.voted.discard(key)
+            return await self.client.delete(url, headers=self.tokens[worker])
+        self.voted.add(key)
+        return await self.client.get(url, headers=self.tokens[worker])
+
+    async def list_reviews(self, worker, rng):
+        club_id, book_id = self._book(rng)
+        return await self.client.get(f"/clubs/{club_id}/books/{book_id}/reviews", headers=self.tokens[worker])
+
+
+async def run_scenario(workload: Workload, name: str, requests: int, concurrency: int, seed: int) -> dict:
+    send = getattr(workload, name)
+    latencies, errors = [], 0
+    counter = iter(range(requests))
+
+    async def worker(index):
+        nonlocal errors
+        rng = random.Random(seed * 1000 + index)
+        for _ in counter:
+            start = time.perf_counter()
+            res = await send(index, rng)
+            latencies.append(time.perf_counter() - start)
+            if res.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(i) for i in range(concurrency)])
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def drive(client, args, book_count: int) -> dict:
+    workload = Workload(client, args, book_count)
+    await workload.login_all(args.concurrency)
+    results = {}
+    for name in args.scenarios:
+        requests = args.login_requests if name == "login" else args.requests
+        # Warm caches and connections so the first requests don't skew p99
+        await run_scenario(workload, name, min(requests, args.concurrency * 5), args.concurrency, seed=args.seed + 1)
+        results[name] = await run_scenario(workload, name, requests, args.concurrency, seed=args.seed)
+    return results
+
+
+async def run_inprocess(url: str, args, book_count: int) -> dict:
+    from main import app, get_db
+    from app.core.rate_limit import limiter
+
+    engine = create_async_engine(url)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def bench_db():
+        async with SessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = bench_db
+    limiter_enabled, limiter.enabled = limiter.enabled, False
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            return await drive(client, args, book_count)
+    finally:
+        limiter.enabled = limiter_enabled
+        app.dependency_overrides.pop(get_db, None)
+        await engine.dispose()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_uvicorn(url: str, args, book_count: int) -> dict:
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=url, RATE_LIMIT_ENABLED="false")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    try:
+        limits = {"max_connections": args.concurrency, "max_keepalive_connections": args.concurrency}
+        import httpx
+        async with AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=httpx.Limits(**limits), timeout=30) as client:
+            for _ in range(100):
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except Exception:
+                    pass
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not come up")
+            return await drive(client, args, book_count)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Returns one line per scenario that regressed past ``threshold`` (0.2 = 20%)."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        if current["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms")
+        if current["rps"] < before["rps"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {before['rps']:.1f} -> {current['rps']:.1f} req/s")
+        if current["errors"] > before.get("errors", 0):
+            regressions.append(f"{name}: errors {before.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+
+async def run(args) -> dict:
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    url = f"sqlite+aiosqlite:///{db_path}"
+    book_count = await seed(url, args)
+    runner = run_uvicorn if args.mode == "uvicorn" else run_inprocess
+    scenarios = await runner(url, args, book_count)
+    return {
+        "meta": {
+            "mode": args.mode,
+            "workers": args.workers if args.mode == "uvicorn" else 1,
+            "concurrency": args.concurrency,
+            "scale": {"clubs": args.clubs, "books_per_club": args.books, "reviews_per_book": args.reviews, "users": args.users},
+            "bcrypt_rounds": security.BCRYPT_ROUNDS,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "scenarios": scenarios,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500, help="per scenario")
+    parser.add_argument("--login-requests", type=int, default=50, help="login is bcrypt-bound; fewer samples")
+    parser.add_argument("--clubs", type=int, default=50)
+    parser.add_argument("--books", type=int, default=10, help="per club")
+    parser.add_argument("--reviews", type=int, default=10, help="per book")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--update-baseline", metavar="PATH", help="write results as the new baseline")
+    args = parser.parse_args(argv)
+    if args.users < args.concurrency:
+        parser.error("--users must be at least --concurrency (each worker votes as its own user)")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = asyncio.run(run(args))
+    print(f"{'scenario':>14} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, row in results["scenarios"].items():
+        print(f"{name:>14} {row['rps']:>9.1f} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['errors']:>7}")
+    for path in filter(None, (args.out, args.update_baseline)):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
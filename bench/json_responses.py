@@ -0,0 +1,90 @@
+"""Requests/sec for GET /clubs?limit=100, stdlib JSON vs FAST_JSON_ENABLED.
+
+    python bench/json_responses.py --requests 2000
+    python bench/json_responses.py --cache   # with the result cache on
+
+Each mode runs in its own interpreter because the default response class is
+fixed when main.py builds the app.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from os.path import dirname, abspath
+
+ROOT = dirname(dirname(abspath(__file__)))
+sys.path.append(ROOT)
+
+
+async def child(args):
+    from httpx import AsyncClient, ASGITransport
+    from sqlalchemy import insert
+    from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+    from sqlalchemy.orm import sessionmaker
+    from app.database import Base
+    from app import models
+    from app.core.rate_limit import limiter
+    from main import app, get_db, get_read_db, get_current_user
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(models.Club.__table__),
+            [{"name": f"Club {i}", "description": "A club that reads " * 5, "favorite_genre": "fiction", "members": 12} for i in range(args.clubs)],
+        )
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    async def bench_user():
+        return models.User(id=1, username="bench", email="bench@example.com")
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_current_user] = bench_user
+    limiter.enabled = False
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(50):
+            await client.get("/clubs?limit=100")
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            res = await client.get("/clubs?limit=100")
+            assert res.status_code == 200 and len(res.json()) == 100
+        elapsed = time.perf_counter() - start
+    await engine.dispose()
+    print(f"{args.requests / elapsed:.1f}")
+
+
+def main(args):
+    print(f"{'mode':>10} {'req/s':>10}")
+    baseline = None
+    for mode, enabled in (("stdlib", "false"), ("fast", "true")):
+        env = dict(os.environ, FAST_JSON_ENABLED=enabled, RESULT_CACHE_ENABLED="true" if args.cache else "false")
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", "--requests", str(args.requests), "--clubs", str(args.clubs)],
+            env=env, cwd=ROOT, check=True, capture_output=True, text=True,
+        )
+        rps = float(out.stdout.strip().splitlines()[-1])
+        baseline = baseline or rps
+        print(f"{mode:>10} {rps:>10.1f}  x{rps / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--clubs", type=int, default=500)
+    parser.add_argument("--cache", action="store_true")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(child(args))
+    else:
+        main(args)
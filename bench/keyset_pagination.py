@@ -0,0 +1,66 @@
+"""Deep-page latency of GET /clubs: offset (skip) vs keyset (cursor).
+
+    python bench/keyset_pagination.py --rows 1000000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from os.path import dirname, abspath
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models, crud
+
+CHUNK = 50_000
+
+
+async def seed(engine, rows):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        for start in range(0, rows, CHUNK):
+            await conn.execute(
+                insert(models.Club.__table__),
+                [{"name": f"Club {i}", "description": "desc", "members": 0} for i in range(start, min(rows, start + CHUNK))],
+            )
+
+
+async def timed(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+async def main(args):
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+    print(f"seeding {args.rows} clubs...")
+    await seed(engine, args.rows)
+
+    print(f"{'depth':>10} {'offset ms':>10} {'cursor ms':>10}")
+    depths = [d for d in (args.limit, 1_000, 10_000, 100_000) if d < args.rows] + [args.rows - args.limit]
+    for depth in depths:
+        async with SessionLocal() as db:
+            # The cursor for a page at this depth is the id of the row just before it
+            after_id = depth
+            offset_ms = await timed(lambda: crud.get_clubs(db, skip=depth, limit=args.limit), args.repeat)
+            cursor_ms = await timed(lambda: crud.get_clubs(db, limit=args.limit, after_id=after_id), args.repeat)
+        print(f"{depth:>10} {offset_ms:>10.2f} {cursor_ms:>10.2f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
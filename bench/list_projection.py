@@ -0,0 +1,119 @@
+"""Large list pages: full entity loads vs the column-projected crud reads.
+
+    python bench/list_projection.py --rows 1000 --repeat 50
+
+"entities" is the query each list read used before it selected columns;
+"columns" is the crud function today. Both include the schema validation
+the endpoint does, so the numbers are per page as served. Allocations are
+tracemalloc's peak for one page.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from os.path import dirname, abspath
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker, joinedload
+from app.database import Base
+from app import models, schemas, crud
+
+
+async def seed(engine, rows):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(models.Club.__table__),
+            [{"name": f"Club {i}", "description": "desc " * 20, "favorite_genre": "fiction", "members": 12} for i in range(rows)],
+        )
+        await conn.execute(insert(models.Book.__table__), [{"club_id": 1, "title": f"Book {i}", "author": "Author"} for i in range(rows)])
+        await conn.execute(
+            insert(models.ReviewStats.__table__),
+            [{"book_id": i, "review_count": 3, "rating_sum": 13, "rating_4": 2, "rating_5": 1} for i in range(1, rows + 1)],
+        )
+        await conn.execute(
+            insert(models.Review.__table__),
+            [{"club_id": 1, "book_id": 1, "user_id": i, "rating": 4, "comment": "comment " * 20} for i in range(rows)],
+        )
+
+
+def entity_reads(limit):
+    async def clubs(db):
+        result = await db.execute(select(models.Club).order_by(models.Club.id).limit(limit))
+        return result.scalars().all()
+
+    async def books(db):
+        result = await db.execute(
+            select(models.Book).options(joinedload(models.Book.stats)).filter(models.Book.club_id == 1).order_by(models.Book.id).limit(limit)
+        )
+        return result.scalars().all()
+
+    async def reviews(db):
+        result = await db.execute(select(models.Review).filter(models.Review.book_id == 1, models.Review.club_id == 1))
+        return result.scalars().all()
+
+    return {"clubs": clubs, "books": books, "reviews": reviews}
+
+
+def column_reads(limit):
+    return {
+        "clubs": lambda db: crud.get_clubs(db, limit=limit),
+        "books": lambda db: crud.get_books_by_club_id(db, club_id=1, limit=limit),
+        "reviews": lambda db: crud.get_reviews_by_book_id(db, book_id=1, club_id=1),
+    }
+
+
+ADAPTERS = {
+    "clubs": TypeAdapter(list[schemas.ClubOut]),
+    "books": TypeAdapter(list[schemas.BookOut]),
+    "reviews": TypeAdapter(list[schemas.ReviewOut]),
+}
+
+
+async def measure(SessionLocal, name, read, repeat):
+    adapter = ADAPTERS[name]
+
+    async def page():
+        # A fresh session per page, like a request
+        async with SessionLocal() as db:
+            return adapter.validate_python(await read(db), from_attributes=True)
+
+    await page()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await page()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    await page()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best * 1000, peak / 1024
+
+
+async def main(args):
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+    await seed(engine, args.rows)
+
+    print(f"{'list':>8} {'mode':>9} {'ms/page':>9} {'peak KiB':>9}")
+    for name in ("clubs", "books", "reviews"):
+        for mode, reads in (("entities", entity_reads(args.rows)), ("columns", column_reads(args.rows))):
+            ms, kib = await measure(SessionLocal, name, reads[name], args.repeat)
+            print(f"{name:>8} {mode:>9} {ms:>9.2f} {kib:>9.0f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=30)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+"""p99 latency of /health while logins are running.
+
+    python bench/login_health_latency.py            # bcrypt on the worker pool
+    python bench/login_health_latency.py --inline   # bcrypt on the event loop (old behaviour)
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from os.path import dirname, abspath
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models
+from app.core import security
+from app.core.rate_limit import limiter
+from main import app, get_db
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+async def main(args):
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as db:
+        db.add(models.User(email="bench@example.com", username="bench", hashed_password=security.get_password_hash("password")))
+        await db.commit()
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    limiter.enabled = False
+    if args.inline:
+        async def inline_verify(plain, hashed):
+            return security.pwd_context.verify_and_update(plain, hashed)
+        security.verify_and_update_password_async = inline_verify
+
+    stop = asyncio.Event()
+    latencies = []
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        async def login_worker():
+            while not stop.is_set():
+                await client.post("/token", data={"username": "bench", "password": "password"})
+
+        async def health_probe():
+            while not stop.is_set():
+                start = time.perf_counter()
+                await client.get("/health")
+                latencies.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.005)
+
+        tasks = [asyncio.create_task(login_worker()) for _ in range(args.logins)]
+        tasks.append(asyncio.create_task(health_probe()))
+        await asyncio.sleep(args.seconds)
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    await engine.dispose()
+    mode = "inline" if args.inline else f"pool({security.PASSWORD_HASH_WORKERS} workers)"
+    print(f"bcrypt {mode}, rounds={security.BCRYPT_ROUNDS}, {args.logins} concurrent logins")
+    print(f"/health samples={len(latencies)} p50={statistics.median(latencies):.1f}ms "
+          f"p99={percentile(latencies, 99):.1f}ms max={max(latencies):.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--inline", action="store_true", help="verify passwords on the event loop")
+    parser.add_argument("--logins", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+"""Year-long calendar view of a large club: full listing vs the ranged, indexed read.
+
+    python bench/meeting_calendar.py --meetings 20000 --repeat 30
+
+Seeds one club with meetings spread over --years years (plus a second
+club of the same size) and times crud.get_meetings_by_club_id for one
+year. "unfiltered" is the whole club, as the endpoint returned it before
+it took from/to. "no index" is the ranged read with
+ix_meetings_club_id_scheduled_at dropped.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from os.path import dirname, abspath
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+from sqlalchemy import insert, text
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models, crud
+
+START = datetime(2020, 1, 1, 19)
+
+
+async def seed(engine, args):
+    step = timedelta(days=365 * args.years) / args.meetings
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(models.Club.__table__), [{"id": 1, "name": "Big"}, {"id": 2, "name": "Other"}])
+        await conn.execute(
+            insert(models.Meeting.__table__),
+            [{"club_id": club_id, "book_id": 1, "scheduled_at": START + step * i, "status": "Próxima"}
+             for i in range(args.meetings) for club_id in (1, 2)],
+        )
+        await conn.exec_driver_sql("ANALYZE")
+
+
+async def best_of(SessionLocal, read, repeat):
+    best, rows = float("inf"), 0
+    for _ in range(repeat):
+        async with SessionLocal() as db:
+            start = time.perf_counter()
+            rows = len(await read(db))
+            best = min(best, time.perf_counter() - start)
+    return best * 1000, rows
+
+
+async def main(args):
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+    await seed(engine, args)
+    year = (datetime(2022, 1, 1), datetime(2023, 1, 1))
+
+    async def unfiltered(db):
+        return (await db.execute(select(models.Meeting).filter(models.Meeting.club_id == 1))).scalars().all()
+
+    def ranged(limit):
+        return lambda db: crud.get_meetings_by_club_id(db, club_id=1, start=year[0], end=year[1], limit=limit)
+
+    cases = [("unfiltered", unfiltered), ("year", ranged(args.meetings)), ("year, page 100", ranged(100))]
+    print(f"{'read':>26} {'rows':>7} {'ms':>9}")
+    for label, read in cases:
+        ms, rows = await best_of(SessionLocal, read, args.repeat)
+        print(f"{label:>26} {rows:>7} {ms:>9.2f}")
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP INDEX ix_meetings_club_id_scheduled_at"))
+    for label, read in cases[1:]:
+        ms, rows = await best_of(SessionLocal, read, args.repeat)
+        print(f"{label + ', no index':>26} {rows:>7} {ms:>9.2f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--meetings", type=int, default=20000, help="per club")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,100 @@
+"""Cost of the SlowAPIMiddleware check per request, by storage and key.
+
+    python bench/rate_limit_overhead.py --requests 5000
+    python bench/rate_limit_overhead.py --storage redis://localhost:6379/0
+
+Every row goes through the real middleware on a limited no-op route; the
+"off" row is the same route with the limiter disabled. Storage calls are
+counted at the limits storage, i.e. round trips for a networked backend.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from os.path import dirname, abspath
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+from fastapi import Request
+from httpx import AsyncClient, ASGITransport
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+from slowapi.util import get_remote_address
+from app.core import security
+from app.core.rate_limit import limiter
+from main import app
+
+
+@app.get("/bench/by-address")
+@limiter.limit("100000000/minute", key_func=get_remote_address)
+async def by_address(request: Request):
+    return {}
+
+
+@app.get("/bench/by-user")
+@limiter.limit("100000000/minute")
+async def by_user(request: Request):
+    return {}
+
+
+def count_calls(storage):
+    """Counts outermost storage calls (MemoryStorage.incr calls its own get)."""
+    storage.calls = 0
+    depth = 0
+    for name in ("incr", "get", "get_expiry", "clear"):
+        method = getattr(storage, name)
+        def counted(*args, _method=method, **kwargs):
+            nonlocal depth
+            storage.calls += depth == 0
+            depth += 1
+            try:
+                return _method(*args, **kwargs)
+            finally:
+                depth -= 1
+        setattr(storage, name, counted)
+    return storage
+
+
+def use_storage(uri):
+    storage = count_calls(storage_from_string(uri))
+    storage.reset()
+    limiter._storage = storage
+    limiter._limiter = FixedWindowRateLimiter(storage)
+    return storage
+
+
+async def run(client, url, requests, headers=None):
+    for _ in range(50):
+        await client.get(url, headers=headers)
+    start = time.perf_counter()
+    for _ in range(requests):
+        res = await client.get(url, headers=headers)
+        assert res.status_code == 200, res.status_code
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(args):
+    token = security.create_access_token({"sub": "bench"})
+    auth = {"Authorization": f"Bearer {token}"}
+    storages = ["memory://", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'ratelimit.db')}"] + args.storage
+
+    print(f"{'setup':48} {'us/request':>10} {'calls/check':>12}")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        limiter.enabled = False
+        off = await run(client, "/bench/by-user", args.requests, auth)
+        print(f"{'limiter off':48} {off:10.1f} {'-':>12}")
+        limiter.enabled = True
+        for uri in storages:
+            for label, url, headers in (("address key", "/bench/by-address", None), ("user key", "/bench/by-user", auth)):
+                storage = use_storage(uri)
+                elapsed = await run(client, url, args.requests, headers)
+                calls = storage.calls / (args.requests + 50)
+                print(f"{uri.split('://')[0] + ', ' + label:48} {elapsed:10.1f} {calls:12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--storage", action="append", default=[], help="extra storage URI, e.g. redis://localhost:6379/0")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,72 @@
+"""Getting a new access token: logging in again (bcrypt) vs spending a refresh token.
+
+    python bench/refresh_vs_login.py --requests 200
+
+Both go through the real endpoints in-process, with the rate limiter off
+and BCRYPT_ROUNDS at the production default unless set. "refresh" rotates
+one refresh token per request, as a client would every time its access
+token expires.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from os.path import dirname, abspath
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+os.environ.setdefault("BCRYPT_ROUNDS", "12")
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models
+from app.core import security
+from app.core.rate_limit import limiter
+from main import app, get_db
+
+PASSWORD = "bench-password"
+
+
+async def main(args):
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as db:
+        db.add(models.User(username="bench", email="bench@example.com", hashed_password=security.get_password_hash(PASSWORD)))
+        await db.commit()
+
+    async def bench_db():
+        async with SessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = bench_db
+    limiter.enabled = False
+    print(f"bcrypt rounds: {security.BCRYPT_ROUNDS}")
+    print(f"{'flow':>8} {'req/s':>9} {'ms/req':>9}")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            res = await client.post("/token", data={"username": "bench", "password": PASSWORD})
+            assert res.status_code == 200, res.text
+        elapsed = time.perf_counter() - start
+        print(f"{'login':>8} {args.requests / elapsed:>9.1f} {elapsed / args.requests * 1000:>9.2f}")
+
+        refresh_token = res.json()["refresh_token"]
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            res = await client.post("/token/refresh", json={"refresh_token": refresh_token})
+            assert res.status_code == 200, res.text
+            refresh_token = res.json()["refresh_token"]
+        elapsed = time.perf_counter() - start
+        print(f"{'refresh':>8} {args.requests / elapsed:>9.1f} {elapsed / args.requests * 1000:>9.2f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
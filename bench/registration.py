@@ -0,0 +1,98 @@
+"""Registration throughput with bcrypt taken out: lookups-then-insert vs a single insert.
+
+    python bench/registration.py --users 2000
+
+"lookups" is the old flow (get_user_by_email, get_user_by_username, then
+create_user); "insert" is crud.create_user alone, which relies on the
+unique indexes. Both run with a fresh session per registration, as a
+request would. "endpoint" drives POST /auth/register in-process. The
+duplicate rows register an existing email again.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from os.path import dirname, abspath
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import crud, schemas
+from app.core import security
+from app.core.exceptions import UniqueViolation
+from app.core.rate_limit import limiter
+from main import app, get_db
+
+
+async def no_bcrypt(password: str) -> str:
+    return "$2b$04$benchbenchbenchbenchbenchbenchbenchbenchbenchbenchbe"
+
+
+def user(prefix: str, i: int) -> schemas.UserCreate:
+    return schemas.UserCreate(email=f"{prefix}{i}@example.com", username=f"{prefix}{i}", password="pass", fullName="Bench")
+
+
+async def lookups_then_insert(db, user_in):
+    if await crud.get_user_by_email(db, email=user_in.email):
+        return
+    if await crud.get_user_by_username(db, username=user_in.username):
+        return
+    await crud.create_user(db, user_in)
+
+
+async def single_insert(db, user_in):
+    try:
+        await crud.create_user(db, user_in)
+    except UniqueViolation:
+        pass
+
+
+async def timed(SessionLocal, register, users):
+    start = time.perf_counter()
+    for user_in in users:
+        async with SessionLocal() as db:
+            await register(db, user_in)
+    return len(users) / (time.perf_counter() - start)
+
+
+async def main(args):
+    security.get_password_hash_async = no_bcrypt
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    print(f"{'flow':>10} {'new req/s':>10} {'dup req/s':>10}")
+    for name, register in (("lookups", lookups_then_insert), ("insert", single_insert)):
+        users = [user(name, i) for i in range(args.users)]
+        fresh = await timed(SessionLocal, register, users)
+        duplicate = await timed(SessionLocal, register, users[: args.users // 4])
+        print(f"{name:>10} {fresh:>10.1f} {duplicate:>10.1f}")
+
+    async def bench_db():
+        async with SessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = bench_db
+    limiter.enabled = False
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        rates = []
+        for body in ([user("endpoint", i) for i in range(args.users)], [user("endpoint", i) for i in range(args.users // 4)]):
+            start = time.perf_counter()
+            for user_in in body:
+                res = await client.post("/auth/register", json=user_in.model_dump())
+                assert res.status_code in (201, 400), res.text
+            rates.append(len(body) / (time.perf_counter() - start))
+    print(f"{'endpoint':>10} {rates[0]:>10.1f} {rates[1]:>10.1f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
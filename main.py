@@ -1,28 +1,42 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+import math
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response, Query, Header
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from app import models, schemas, database, crud
-from app.core import security
-from jose import JWTError, jwt
+from app.core import security, pagination, bulk, export, http_cache, fast_json, metrics
+from jose import JWTError
 from contextlib import asynccontextmanager
+from datetime import datetime
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
-from slowapi.middleware import SlowAPIMiddleware
-from app.core.rate_limit import limiter
-from app.core.exceptions import ItemNotFound, ItemAlreadyExists, DatabaseError
-from fastapi.responses import JSONResponse
+from app.core.rate_limit import limiter, RateLimitMiddleware
+from app.core.vote_buffer import vote_buffer, VOTE_BUFFER_ENABLED
+from app.core.progress_buffer import progress_buffer, PROGRESS_BUFFER_ENABLED
+from app.core.user_cache import user_cache
+from app.core.replica import replica_router, REPLICA_STICKY_COOKIE
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.exceptions import ItemNotFound, ItemAlreadyExists, UniqueViolation, DatabaseError, ServiceUnavailable
+from fastapi.responses import JSONResponse, StreamingResponse
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     async with database.engine.begin() as conn:
         await conn.run_sync(models.Base.metadata.create_all)
+    if VOTE_BUFFER_ENABLED:
+        vote_buffer.start(database.SessionLocal)
+    if PROGRESS_BUFFER_ENABLED:
+        progress_buffer.start(database.SessionLocal)
     yield
+    # Pending votes and progress are written before the worker exits
+    await vote_buffer.stop()
+    await progress_buffer.stop()
 
-app = FastAPI(title="BookCircle API", lifespan=lifespan)
+app = FastAPI(title="BookCircle API", lifespan=lifespan, default_response_class=fast_json.response_class())
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
+app.add_middleware(RateLimitMiddleware)
+# Outermost, so rate-limited and failed requests are measured too
+app.add_middleware(QueryStatsMiddleware)
 
 @app.exception_handler(ItemNotFound)
 async def item_not_found_exception_handler(request: Request, exc: ItemNotFound):
@@ -45,6 +59,14 @@ async def database_error_exception_handler(request: Request, exc: DatabaseError)
         content={"detail": exc.message},
     )
 
+@app.exception_handler(ServiceUnavailable)
+async def service_unavailable_exception_handler(request: Request, exc: ServiceUnavailable):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": exc.message},
+        headers={"Retry-After": "1"},
+    )
+
 # models.Base.metadata.create_all(bind=database.engine) # Removed in favor of lifespan
 
 async def get_db():
@@ -59,40 +81,102 @@ async def get_db():
 async def health(request: Request):
     return {"status": "ok"}
 
+@app.get("/metrics", status_code=200)
+async def get_metrics(x_metrics_token: str | None = Header(None)):
+    # Operator endpoint, outside the user auth: a 404 unless METRICS_TOKEN is set and sent
+    if not metrics.token_matches(x_metrics_token):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return metrics.snapshot()
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+def mark_write(response: Response, username: str):
+    replica_router.mark_write(username)
+    response.set_cookie(
+        REPLICA_STICKY_COOKIE, replica_router.sticky_cookie(username),
+        max_age=math.ceil(replica_router.sticky_seconds), httponly=True, samesite="lax",
+    )
+
+async def get_current_user(request: Request, response: Response, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
+        payload = security.decode_access_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    if request.method not in ("GET", "HEAD", "OPTIONS"):
+        mark_write(response, username)
+    user = user_cache.get(username)
+    if user is not None:
+        return user
     user = await crud.get_user_by_username(db, username=username)
     if user is None:
         raise credentials_exception
+    user_cache.set(user)
     return user
 
+async def get_read_db(request: Request, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    # Reads go to the replica unless there is none or the user wrote moments ago, on any worker
+    if (
+        database.ReplicaSessionLocal is None
+        or replica_router.use_primary(current_user.username)
+        or replica_router.cookie_wants_primary(current_user.username, request.cookies.get(REPLICA_STICKY_COOKIE))
+    ):
+        yield db
+        return
+    async with database.ReplicaSessionLocal() as replica_db:
+        replica_db.info["replica"] = True
+        yield replica_db
+
 @app.post("/token", response_model=schemas.Token)
 @limiter.limit("5/minute")
 async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     user = await crud.get_user_by_username(db, username=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    verified, new_hash = False, None
+    if user:
+        verified, new_hash = await security.verify_and_update_password_async(form_data.password, user.hashed_password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        await crud.update_user_password_hash(db, user, new_hash)
     access_token = security.create_access_token(
         data={"sub": user.username}
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    refresh_token = await crud.create_refresh_token(db, user.id)
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+# Refreshing costs an HMAC and two statements, not bcrypt: clients refresh instead of logging in again
+@app.post("/token/refresh", response_model=schemas.Token)
+@limiter.limit("30/minute")
+async def refresh_access_token(request: Request, body: schemas.RefreshRequest, db: AsyncSession = Depends(get_db)):
+    rotated = await crud.rotate_refresh_token(db, body.refresh_token)
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    username, refresh_token = rotated
+    access_token = security.create_access_token(data={"sub": username})
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@app.post("/token/revoke", status_code=204)
+@limiter.limit("30/minute")
+async def revoke_refresh_token(request: Request, body: schemas.RefreshRequest, db: AsyncSession = Depends(get_db)):
+    # Unknown tokens get 204 as well, so the endpoint can't be used to probe for valid ones
+    await crud.revoke_refresh_token(db, body.refresh_token)
+
+REGISTER_CONFLICTS = {"email": "Email ya registrado", "username": "Username ya registrado"}
 
 @app.post("/auth/register", response_model=schemas.UserOut, status_code=201)
 @limiter.limit("5/minute")
@@ -101,23 +185,44 @@ async def register_user(
                     user_in: schemas.UserCreate, 
                     db: AsyncSession = Depends(get_db)
                 ):
-    
-    db_user = await crud.get_user_by_email(db=db, email=user_in.email)
-    if db_user:
-        raise HTTPException(status_code=400, detail="Email ya registrado")
-
-    db_username = await crud.get_user_by_username(db=db, username=user_in.username)
-    if db_username:
-        raise HTTPException(status_code=400, detail="Username ya registrado")
-
-    new_user = await crud.create_user(db=db, user=user_in)
+    try:
+        new_user = await crud.create_user(db=db, user=user_in)
+    except UniqueViolation as e:
+        raise HTTPException(status_code=400, detail=REGISTER_CONFLICTS[e.field])
     return new_user
 
+def get_cursor(cursor: str | None = None):
+    if cursor is None:
+        return None
+    try:
+        return pagination.decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def club_cache_validator(request: Request, response: Response, club_id: int, db: AsyncSession = Depends(get_read_db)):
+    # Runs before the endpoint: a current client copy costs one version lookup, not the query + serialization.
+    # Returns the version, which also keys the result cache
+    version = await crud.get_club_version(db=db, club_id=club_id)
+    if vote_buffer.has_pending(club_id):
+        return version
+    headers = {"ETag": http_cache.club_etag(club_id, version), "Cache-Control": http_cache.HTTP_CACHE_CONTROL}
+    if http_cache.etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return version
+
 # CLUBS
 @app.get("/clubs", response_model=list[schemas.ClubOut], status_code=200)
 @limiter.limit("100/minute")
-async def clubs(request: Request, skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    clubs = await crud.get_clubs(db=db, skip=skip, limit=limit)
+async def clubs(request: Request, response: Response, skip: int = Query(0, deprecated=True), limit: int = 100, after_id: int | None = Depends(get_cursor), db: AsyncSession = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
+    if fast_json.FAST_JSON_ENABLED:
+        rows = await crud.get_club_rows_cached(db=db, skip=skip, limit=limit, after_id=after_id)
+        cursor = pagination.next_cursor(rows, limit)
+        return fast_json.rows_response(rows, headers={pagination.CURSOR_HEADER: cursor} if cursor else None)
+    clubs = await crud.get_clubs_cached(db=db, skip=skip, limit=limit, after_id=after_id)
+    cursor = pagination.next_cursor(clubs, limit)
+    if cursor:
+        response.headers[pagination.CURSOR_HEADER] = cursor
     return clubs
 
 
@@ -133,8 +238,8 @@ async def update_club(club_id: int, club_in: schemas.ClubCreate, db: AsyncSessio
     return new_club
 
 
-@app.get("/clubs/{club_id}", response_model=schemas.ClubOut, status_code=200)
-async def get_club(club_id: int, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+@app.get("/clubs/{club_id}", response_model=schemas.ClubOut, status_code=200, dependencies=[Depends(club_cache_validator)])
+async def get_club(club_id: int, db: AsyncSession = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     club = await crud.get_club_by_id(db=db, club_id=club_id)
     return club
 
@@ -148,9 +253,12 @@ async def delete_club(club_id: int, db: AsyncSession = Depends(get_db), current_
 
 @app.get("/clubs/{club_id}/books", response_model=list[schemas.BookOut], status_code=200)
 @limiter.limit("100/minute")
-async def get_books_by_club_id(request: Request, club_id: int, skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    books = await crud.get_books_by_club_id(db=db, club_id=club_id, skip=skip, limit=limit)
-    return books
+async def get_books_by_club_id(request: Request, response: Response, club_id: int, skip: int = Query(0, deprecated=True), limit: int = 100, after_id: int | None = Depends(get_cursor), version: int = Depends(club_cache_validator), db: AsyncSession = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
+    books = await crud.get_books_by_club_id_cached(db=db, club_id=club_id, version=version, skip=skip, limit=limit, after_id=after_id)
+    cursor = pagination.next_cursor(books, limit)
+    if cursor:
+        response.headers[pagination.CURSOR_HEADER] = cursor
+    return vote_buffer.merge_books(books)
 
 
 @app.post("/clubs/{club_id}/books", response_model=schemas.BookOut, status_code=201)
@@ -160,41 +268,64 @@ async def create_book(club_id: int, book_in: schemas.BookCreate, db: AsyncSessio
 
 
 @app.get("/clubs/{club_id}/books/{book_id}", response_model=schemas.BookOut, status_code=200)
-async def get_book_details(club_id: int, book_id: int, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+async def get_book_details(club_id: int, book_id: int, db: AsyncSession = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     book = await crud.get_book_by_id(db=db, book_id=book_id, club_id=club_id)
-    return book
+    return vote_buffer.merge_book(book)
 
 
 @app.get("/clubs/{club_id}/books/{book_id}/votes", status_code=200)
-async def get_book_votes(club_id: int, book_id: int, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return await crud.add_votes_by_book_id(db=db, book_id=book_id, club_id=club_id)
+async def get_book_votes(response: Response, club_id: int, book_id: int, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    # Voting is a write even though it arrives as a GET
+    mark_write(response, current_user.username)
+    if vote_buffer.running:
+        return await vote_buffer.add_vote(db=db, book_id=book_id, club_id=club_id, user_id=current_user.id)
+    return await crud.add_votes_by_book_id(db=db, book_id=book_id, club_id=club_id, user_id=current_user.id)
 
 
 @app.delete("/clubs/{club_id}/books/{book_id}/votes", status_code=204)
 async def delete_book_votes(club_id: int, book_id: int, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return await crud.delete_votes_by_book_id(db=db, book_id=book_id, club_id=club_id)    
+    if vote_buffer.running:
+        await vote_buffer.remove_vote(db=db, book_id=book_id, club_id=club_id, user_id=current_user.id)
+        return
+    await crud.delete_votes_by_book_id(db=db, book_id=book_id, club_id=club_id, user_id=current_user.id)
+    return
 
 #FUnciones faltantes GET progres y PUT update_progress
-@app.get("/clubs/{clubId}/books/{bookId}/progress", status_code=200)
-async def get_reading_progress(clubId: int, bookId: int, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    progress = await crud.get_book_progress(db=db, book_id=bookId, club_id=clubId)
-    return {"progress": progress}
-
-@app.put("/clubs/{clubId}/books/{bookId}/progress", response_model=schemas.BookOut, status_code=200)
+async def reading_progress(db: AsyncSession, club_id: int, book_id: int, user_id: int):
+    result = await crud.get_reading_progress(db=db, book_id=book_id, club_id=club_id, user_id=user_id)
+    pending = progress_buffer.pending_progress(club_id, book_id, user_id)
+    if pending is not None:
+        result["progress"] = pending
+    return result
+
+@app.get("/clubs/{clubId}/books/{bookId}/progress", response_model=schemas.ReadingProgressOut, status_code=200)
+async def get_reading_progress(clubId: int, bookId: int, db: AsyncSession = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
+    return await reading_progress(db, clubId, bookId, current_user.id)
+
+@app.put("/clubs/{clubId}/books/{bookId}/progress", response_model=schemas.ReadingProgressOut, status_code=200)
 async def update_reading_progress(clubId: int, bookId: int, progress: int, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    updated_book = await crud.update_book_progress(db=db, book_id=bookId, club_id=clubId, progress=progress)
-    return updated_book
+    # Buffered updates are coalesced per reader; the club figures catch up on flush
+    if progress_buffer.running:
+        await progress_buffer.update(db=db, book_id=bookId, club_id=clubId, user_id=current_user.id, progress=progress)
+    else:
+        await crud.update_reading_progress(db=db, book_id=bookId, club_id=clubId, user_id=current_user.id, progress=progress)
+    return await reading_progress(db, clubId, bookId, current_user.id)
 
 
 
 
 # REVIEWS
 @app.get("/clubs/{club_id}/books/{book_id}/reviews", response_model=list[schemas.ReviewOut], status_code=200)
-async def get_reviews_by_book_id(club_id: int, book_id: int, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+async def get_reviews_by_book_id(club_id: int, book_id: int, db: AsyncSession = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     reviews = await crud.get_reviews_by_book_id(db=db, book_id=book_id, club_id=club_id)
     return reviews
 
 
+@app.get("/clubs/{club_id}/books/{book_id}/reviews/stats", response_model=schemas.ReviewStatsOut, status_code=200)
+async def get_review_stats(club_id: int, book_id: int, db: AsyncSession = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
+    return await crud.get_review_stats(db=db, book_id=book_id, club_id=club_id)
+
+
 @app.post("/clubs/{club_id}/books/{book_id}/reviews", response_model=schemas.ReviewOut, status_code=201)
 async def create_review(review_in: schemas.ReviewCreate, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     new_review = await crud.create_review(db=db, review=review_in)
@@ -213,14 +344,70 @@ async def delete_review(review_id: int, db: AsyncSession = Depends(get_db), curr
     return
 
 
+# BULK IMPORT (JSON array or NDJSON stream)
+async def import_records(db: AsyncSession, request: Request, schema, model, defaults: dict | None = None):
+    try:
+        return await bulk.import_records(db, request, schema, model, defaults=defaults)
+    except bulk.InvalidPayload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/clubs/bulk", response_model=schemas.BulkImportResult, status_code=200)
+async def bulk_create_clubs(request: Request, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    return await import_records(db, request, schemas.ClubCreate, models.Club)
+
+
+@app.post("/clubs/{club_id}/books/bulk", response_model=schemas.BulkImportResult, status_code=200)
+async def bulk_create_books(request: Request, club_id: int, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    return await import_records(db, request, schemas.BookCreate, models.Book, defaults={"club_id": club_id})
+
+
+@app.post("/clubs/{club_id}/reviews/bulk", response_model=schemas.BulkImportResult, status_code=200)
+async def bulk_create_reviews(request: Request, club_id: int, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    return await import_records(db, request, schemas.ReviewCreate, models.Review, defaults={"club_id": club_id})
+
+
+# EXPORT
+@app.get("/clubs/{club_id}/export", status_code=200)
+async def export_club(request: Request, club_id: int, db: AsyncSession = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
+    # Checked up front: once streaming starts the status code is already sent
+    await crud.get_club_by_id(db=db, club_id=club_id)
+    compress = "gzip" in request.headers.get("accept-encoding", "").lower()
+    headers = {"Content-Disposition": f'attachment; filename="club-{club_id}.ndjson"', "Vary": "Accept-Encoding"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(export.club_export(db, club_id, compress=compress), media_type=export.NDJSON_MEDIA_TYPE, headers=headers)
+
+
 # MEETINGS
-@app.get("/clubs/{club_id}/meetings", status_code=200)
-async def meetings(club_id: int, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return await crud.get_meetings_by_club_id(db=db, club_id=club_id)
+def get_time_cursor(cursor: str | None = None):
+    if cursor is None:
+        return None
+    try:
+        return pagination.decode_time_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.get("/clubs/{club_id}/meetings", status_code=200, dependencies=[Depends(club_cache_validator)])
+async def meetings(response: Response, club_id: int, start: datetime | None = Query(None, alias="from"), end: datetime | None = Query(None, alias="to"), meeting_status: str | None = Query(None, alias="status"), limit: int = Query(100, ge=1, le=1000), after: tuple | None = Depends(get_time_cursor), db: AsyncSession = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
+    meetings = await crud.get_meetings_by_club_id(db=db, club_id=club_id, start=start, end=end, status=meeting_status, limit=limit, after=after)
+    cursor = pagination.next_time_cursor(meetings, limit)
+    if cursor:
+        response.headers[pagination.CURSOR_HEADER] = cursor
+    return meetings
+
+
+@app.get("/me/meetings", status_code=200)
+async def my_upcoming_meetings(response: Response, start: datetime | None = Query(None, alias="from"), end: datetime | None = Query(None, alias="to"), limit: int = Query(100, ge=1, le=1000), after: tuple | None = Depends(get_time_cursor), db: AsyncSession = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
+    meetings = await crud.get_upcoming_meetings_for_user(db=db, user_id=current_user.id, start=start, end=end, limit=limit, after=after)
+    cursor = pagination.next_time_cursor(meetings, limit)
+    if cursor:
+        response.headers[pagination.CURSOR_HEADER] = cursor
+    return meetings
 
 
 @app.get("/clubs/{club_id}/meetings/{meeting_id}", status_code=200)
-async def meetings(club_id: int, meeting_id:int, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+async def meetings(club_id: int, meeting_id:int, db: AsyncSession = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     return await crud.get_meetings_by_id(db=db, meeting_id=meeting_id)
 
 
@@ -0,0 +1,21 @@
+"""Deletes expired refresh tokens and the tokens of ended sessions; run it from cron.
+
+    python scripts/purge_refresh_tokens.py
+"""
+import asyncio
+import sys
+from os.path import dirname, abspath
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+from app import crud, database
+
+
+async def main():
+    async with database.SessionLocal() as db:
+        purged = await crud.purge_refresh_tokens(db)
+    await database.engine.dispose()
+    print(f"{purged} refresh token(s) purged")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
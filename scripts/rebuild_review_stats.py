@@ -0,0 +1,25 @@
+"""Recomputes review_stats from the reviews table, e.g. after manual data fixes.
+
+    python scripts/rebuild_review_stats.py            # every book
+    python scripts/rebuild_review_stats.py --book-id 7
+"""
+import argparse
+import asyncio
+import sys
+from os.path import dirname, abspath
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+from app import crud, database
+
+
+async def main(args):
+    async with database.SessionLocal() as db:
+        books = await crud.rebuild_review_stats(db, book_id=args.book_id)
+    await database.engine.dispose()
+    print(f"review_stats rebuilt for {books} book(s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--book-id", type=int, default=None)
+    asyncio.run(main(parser.parse_args()))
@@ -4,3 +4,34 @@ from os.path import dirname, abspath
 
 # Add the project root to sys.path
 sys.path.append(dirname(dirname(abspath(__file__))))
+# Cheap bcrypt cost for tests; must be set before app.core.security is imported
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# Keep the app's own engine off the checked-in database.db
+import tempfile
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+import pytest
+from sqlalchemy import create_engine
+from app import database
+from app.core.rate_limit import limiter
+from app.core.user_cache import user_cache
+from app.core.result_cache import result_cache
+from app.core.replica import replica_router
+from app.core.security import token_cache
+
+# Tests that don't override get_db still expect the schema to exist
+_sync_engine = create_engine(database.SQLALCHEMY_DATABASE_URL.replace("+aiosqlite", ""))
+database.Base.metadata.create_all(_sync_engine)
+_sync_engine.dispose()
+
+@pytest.fixture(autouse=True)
+async def reset_app_state():
+    # SlowAPI keeps counters in process memory; start every test with a clean slate
+    limiter.reset()
+    # Test databases are rebuilt per test, so cached users would point at stale rows
+    user_cache.invalidate()
+    token_cache.clear()
+    result_cache.reset()
+    replica_router.reset()
+    yield
+    # aiosqlite runs each connection on a non-daemon thread; release it
+    await database.engine.dispose()
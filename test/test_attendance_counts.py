@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import insert, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from main import app, get_db, get_current_user
+from app import models, schemas, crud
+
+engine = create_async_engine("sqlite+aiosqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+async def override_get_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+async def mock_get_current_user():
+    return models.User(id=1, username="testuser", email="test@example.com")
+
+@pytest.fixture
+async def client():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(models.Club.__table__), {"id": 1, "name": "One"})
+        await conn.execute(insert(models.Meeting.__table__), [{"id": 1, "club_id": 1, "book_id": 1}, {"id": 2, "club_id": 1, "book_id": 1}])
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = mock_get_current_user
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+    app.dependency_overrides.clear()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+def answer(client, user_id, status, meeting_id=1):
+    return client.post(f"/clubs/1/meetings/{meeting_id}/attendance", json={"user_id": user_id, "status": status})
+
+async def counts(client, meeting_id=1):
+    meeting = (await client.get(f"/clubs/1/meetings/{meeting_id}")).json()
+    return meeting["attendeeCount"], meeting["maybeCount"], meeting["declinedCount"]
+
+async def attendance_rows():
+    async with TestingSessionLocal() as db:
+        return (await db.execute(select(func.count()).select_from(models.MeetingAttendance))).scalar_one()
+
+@pytest.mark.asyncio
+async def test_new_meetings_start_at_zero(client):
+    res = await client.post("/clubs/1/meetings", json={"bookId": 1, "clubId": 1, "attendeeCount": 50})
+    assert res.status_code == 201
+    # The client can't set the counters
+    assert await counts(client, meeting_id=3) == (0, 0, 0)
+
+@pytest.mark.asyncio
+async def test_answers_are_counted_per_status(client):
+    for user_id, status in ((1, "SI"), (2, "SI"), (3, "TAL_VEZ"), (4, "NO")):
+        assert (await answer(client, user_id, status)).status_code == 201
+    assert await counts(client) == (2, 1, 1)
+    assert await counts(client, meeting_id=2) == (0, 0, 0)
+
+@pytest.mark.asyncio
+async def test_changing_an_answer_moves_it_between_counters(client):
+    await answer(client, 1, "SI")
+    await answer(client, 1, "TAL_VEZ")
+    assert await counts(client) == (0, 1, 0)
+    await answer(client, 1, "NO")
+    await answer(client, 1, "NO")
+    assert await counts(client) == (0, 0, 1)
+    # Still one row for the member
+    assert await attendance_rows() == 1
+
+@pytest.mark.asyncio
+async def test_listing_shows_counts_and_changes_etag(client):
+    res = await client.get("/clubs/1/meetings")
+    etag = res.headers["etag"]
+    await answer(client, 1, "SI")
+    res = await client.get("/clubs/1/meetings", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert [m["attendeeCount"] for m in res.json()] == [1, 0]
+    # Repeating the same answer writes nothing, so the listing stays cached
+    etag = res.headers["etag"]
+    await answer(client, 1, "SI")
+    res = await client.get("/clubs/1/meetings", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+
+@pytest.mark.asyncio
+async def test_unknown_meeting_is_a_404(client):
+    res = await answer(client, 1, "SI", meeting_id=404)
+    assert res.status_code == 404
+    assert await attendance_rows() == 0
+
+@pytest.mark.asyncio
+async def test_unique_constraint_rejects_duplicate_rows(client):
+    async with TestingSessionLocal() as db:
+        db.add(models.MeetingAttendance(meeting_id=1, user_id=1, status="SI"))
+        await db.commit()
+        db.add(models.MeetingAttendance(meeting_id=1, user_id=1, status="NO"))
+        with pytest.raises(IntegrityError):
+            await db.commit()
+
+@pytest.mark.asyncio
+async def test_concurrent_answers_keep_counters_in_step(tmp_path):
+    # Separate connections to a file database, as concurrent requests would have
+    file_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'attendance.db'}")
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=file_engine, class_=AsyncSession, expire_on_commit=False)
+    async with file_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(models.Club.__table__), {"id": 1, "name": "One"})
+        await conn.execute(insert(models.Meeting.__table__), {"id": 1, "club_id": 1, "book_id": 1})
+
+    async def answer_directly(user_id, status):
+        async with SessionLocal() as db:
+            await crud.create_attendance_meeting(db, 1, schemas.MeetingAttendanceCreate(user_id=user_id, status=status))
+
+    statuses = ["SI", "NO", "TAL_VEZ"]
+    try:
+        await asyncio.gather(*[answer_directly(user_id, statuses[i % 3]) for i in range(30) for user_id in (1, 2)])
+        async with SessionLocal() as db:
+            recount = dict((await db.execute(
+                select(models.MeetingAttendance.status, func.count()).group_by(models.MeetingAttendance.status)
+            )).all())
+            meeting = await db.get(models.Meeting, 1)
+        assert sum(recount.values()) == 2
+        for status, counter in models.Meeting.COUNTERS.items():
+            assert getattr(meeting, counter) == recount.get(status, 0), status
+    finally:
+        await file_engine.dispose()
@@ -0,0 +1,44 @@
+import importlib.util
+import os
+from os.path import dirname, abspath
+import pytest
+
+ROOT = dirname(dirname(abspath(__file__)))
+_spec = importlib.util.spec_from_file_location("bench_harness", os.path.join(ROOT, "bench", "harness.py"))
+harness = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(harness)
+
+def scenario(rps, p95, errors=0):
+    return {"requests": 100, "errors": errors, "rps": rps, "p50_ms": p95 / 2, "p95_ms": p95, "p99_ms": p95 * 2}
+
+@pytest.mark.asyncio
+async def test_inprocess_run_covers_every_scenario():
+    args = harness.parse_args(["--clubs", "3", "--books", "2", "--reviews", "2", "--users", "4", "--concurrency", "2", "--requests", "20", "--login-requests", "4"])
+    results = await harness.run(args)
+    assert set(results["scenarios"]) == set(harness.SCENARIOS)
+    for name, row in results["scenarios"].items():
+        assert row["errors"] == 0, name
+        assert row["requests"] == (4 if name == "login" else 20)
+        assert 0 < row["p50_ms"] <= row["p95_ms"] <= row["p99_ms"]
+    assert results["meta"]["scale"] == {"clubs": 3, "books_per_club": 2, "reviews_per_book": 2, "users": 4}
+
+def test_percentile_is_nearest_rank():
+    samples = [float(i) for i in range(1, 101)]
+    assert harness.percentile(samples, 50) == 50
+    assert harness.percentile(samples, 99) == 99
+    assert harness.percentile([3.0], 95) == 3.0
+
+def test_compare_flags_only_regressions_past_the_threshold():
+    baseline = {"scenarios": {"list_clubs": scenario(200, 10), "vote": scenario(100, 20), "login": scenario(5, 300)}}
+    results = {"scenarios": {
+        "list_clubs": scenario(180, 12),    # within 25%
+        "vote": scenario(60, 30),           # slower and less throughput
+        "login": scenario(5, 300, errors=2),
+        "list_reviews": scenario(1, 1000),  # no baseline yet
+    }}
+    regressions = harness.compare(results, baseline, threshold=0.25)
+    assert regressions == [
+        "vote: p95 20.00 -> 30.00 ms",
+        "vote: throughput 100.0 -> 60.0 req/s",
+        "login: errors 0 -> 2",
+    ]
@@ -0,0 +1,98 @@
+import json
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from main import app, get_db, get_current_user
+from app import models
+from app.core import bulk
+
+@pytest.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'bulk.db'}")
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    async def mock_get_current_user():
+        return models.User(id=1, username="testuser", email="test@example.com")
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = mock_get_current_user
+    yield SessionLocal
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+@pytest.fixture
+async def client(session_factory):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+
+async def _count(session_factory, model):
+    async with session_factory() as db:
+        return (await db.execute(select(func.count()).select_from(model))).scalar_one()
+
+@pytest.mark.asyncio
+async def test_bulk_clubs_json_array(client, session_factory):
+    clubs = [{"name": f"Club {i}", "description": "desc"} for i in range(3)]
+    res = await client.post("/clubs/bulk", json=clubs)
+    assert res.status_code == 200
+    body = res.json()
+    assert body["created"] == 3 and body["failed"] == 0
+    assert [r["index"] for r in body["results"]] == [0, 1, 2]
+    assert all(r["id"] for r in body["results"])
+    assert await _count(session_factory, models.Club) == 3
+
+@pytest.mark.asyncio
+async def test_bulk_books_ndjson_stream(client, session_factory, monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_CHUNK_SIZE", 1000)
+    res = await client.post("/clubs", json={"name": "Big Club", "description": "desc"})
+    club_id = res.json()["id"]
+
+    rows = 5000
+    async def ndjson():
+        for i in range(rows):
+            yield (json.dumps({"title": f"Book {i}", "author": "Author"}) + "\n").encode()
+
+    res = await client.post(f"/clubs/{club_id}/books/bulk", content=ndjson(), headers={"Content-Type": "application/x-ndjson"})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["created"] == rows
+    ids = [r["id"] for r in body["results"]]
+    assert ids == sorted(ids)
+    assert await _count(session_factory, models.Book) == rows
+
+@pytest.mark.asyncio
+async def test_bulk_reports_bad_rows_individually(client, session_factory):
+    res = await client.post("/clubs", json={"name": "Taken", "description": "desc"})
+    club_id = res.json()["id"]
+
+    payload = "\n".join([
+        json.dumps({"name": "Fresh", "description": "desc"}),
+        "{not json",
+        json.dumps({"name": "Taken", "description": "duplicate name"}),
+        json.dumps({"description": "missing name"}),
+        json.dumps({"name": "Also Fresh", "description": "desc"}),
+    ])
+    res = await client.post("/clubs/bulk", content=payload, headers={"Content-Type": "application/x-ndjson"})
+    body = res.json()
+    statuses = [r["status"] for r in body["results"]]
+    assert statuses == ["created", "error", "error", "error", "created"]
+    assert body["created"] == 2 and body["failed"] == 3
+    assert await _count(session_factory, models.Club) == 3
+
+    # Rows aimed at another club are refused
+    res = await client.post(f"/clubs/{club_id}/books/bulk", json=[{"club_id": club_id + 1, "title": "T", "author": "A"}])
+    assert res.json()["results"][0]["detail"] == f"club_id must be {club_id}"
+
+@pytest.mark.asyncio
+async def test_bulk_rejects_non_array_json(client):
+    res = await client.post("/clubs/bulk", json={"name": "x"})
+    assert res.status_code == 400
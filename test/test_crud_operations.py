@@ -1,11 +1,12 @@
 import pytest
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.database import Base
 from app import crud, models, schemas
-from app.core.exceptions import ItemNotFound
+from app.core.exceptions import ItemNotFound, ItemAlreadyExists, UniqueViolation
 
 # Setup in-memory DB for testing
 SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -71,6 +72,34 @@ async def test_get_user_by_username(db):
     assert user is not None
     assert user.username == "testuser"
 
+@pytest.mark.asyncio
+async def test_create_user_duplicate_reports_the_violated_column(db):
+    await crud.create_user(db, schemas.UserCreate(email="a@example.com", username="email_fan", password="password123", fullName="A"))
+    # The username mentions "email": the column is taken from the constraint, not the message text
+    with pytest.raises(UniqueViolation) as exc:
+        await crud.create_user(db, schemas.UserCreate(email="b@example.com", username="email_fan", password="password123", fullName="B"))
+    assert exc.value.field == "username"
+    with pytest.raises(UniqueViolation) as exc:
+        await crud.create_user(db, schemas.UserCreate(email="a@example.com", username="other", password="password123", fullName="C"))
+    assert exc.value.field == "email"
+
+@pytest.mark.asyncio
+async def test_create_user_other_integrity_errors_are_reraised(db):
+    user_in = schemas.UserCreate.model_construct(email=None, username="nomail", password="password123", fullName="N")
+    with pytest.raises(IntegrityError):
+        await crud.create_user(db, user_in)
+
+def test_user_unique_field_reads_postgres_constraint_name():
+    class Diag:
+        constraint_name = "ix_users_username"
+    class Orig(Exception):
+        diag = Diag()
+    # The detail text names the email column, the constraint does not
+    error = IntegrityError("INSERT", {}, Orig('duplicate key value violates unique constraint; email taken'))
+    assert crud._user_unique_field(error) == "username"
+    Diag.constraint_name = "book_votes_pkey"
+    assert crud._user_unique_field(error) is None
+
 @pytest.mark.asyncio
 async def test_create_club(db):
     club_in = schemas.ClubCreate(
@@ -172,50 +201,93 @@ async def test_get_book_by_id(db):
 
 @pytest.mark.asyncio
 async def test_add_votes_by_book_id(db):
+    user_in = schemas.UserCreate(email="voter@example.com", username="voter", password="pass", fullName="Voter")
+    db_user = await crud.create_user(db, user_in)
     club_in = schemas.ClubCreate(name="Club for Votes", description="Desc")
     db_club = await crud.create_club(db, club_in)
     book_in = schemas.BookCreate(club_id=db_club.id, title="Vote Book", author="Author", votes=0)
     db_book = await crud.create_book(db, book_in)
 
-    new_votes = await crud.add_votes_by_book_id(db, book_id=db_book.id, club_id=db_club.id)
+    new_votes = await crud.add_votes_by_book_id(db, book_id=db_book.id, club_id=db_club.id, user_id=db_user.id)
     assert new_votes == 1
     
     # We need to re-fetch or rely on the return. Let's re-fetch to be sure about persistence
     book = await crud.get_book_by_id(db, book_id=db_book.id, club_id=db_club.id)
     assert book.votes == 1
 
+@pytest.mark.asyncio
+async def test_add_votes_twice_by_same_user(db):
+    user_in = schemas.UserCreate(email="voter2@example.com", username="voter2", password="pass", fullName="Voter 2")
+    db_user = await crud.create_user(db, user_in)
+    club_in = schemas.ClubCreate(name="Club for Double Votes", description="Desc")
+    db_club = await crud.create_club(db, club_in)
+    book_in = schemas.BookCreate(club_id=db_club.id, title="Double Vote Book", author="Author")
+    db_book = await crud.create_book(db, book_in)
+
+    # The rejected vote rolls the session back, which expires loaded instances
+    book_id, club_id, user_id = db_book.id, db_club.id, db_user.id
+
+    await crud.add_votes_by_book_id(db, book_id=book_id, club_id=club_id, user_id=user_id)
+    with pytest.raises(ItemAlreadyExists):
+        await crud.add_votes_by_book_id(db, book_id=book_id, club_id=club_id, user_id=user_id)
+
+    book = await crud.get_book_by_id(db, book_id=book_id, club_id=club_id)
+    assert book.votes == 1
+
+@pytest.mark.asyncio
+async def test_add_votes_book_not_found(db):
+    with pytest.raises(ItemNotFound):
+        await crud.add_votes_by_book_id(db, book_id=999, club_id=999, user_id=1)
+
 @pytest.mark.asyncio
 async def test_delete_votes_by_book_id(db):
+    user_in = schemas.UserCreate(email="unvoter@example.com", username="unvoter", password="pass", fullName="Unvoter")
+    db_user = await crud.create_user(db, user_in)
     club_in = schemas.ClubCreate(name="Club for Unvotes", description="Desc")
     db_club = await crud.create_club(db, club_in)
     book_in = schemas.BookCreate(club_id=db_club.id, title="Unvote Book", author="Author", votes=5)
     db_book = await crud.create_book(db, book_in)
 
-    new_votes = await crud.delete_votes_by_book_id(db, book_id=db_book.id, club_id=db_club.id)
-    assert new_votes == 4
+    await crud.add_votes_by_book_id(db, book_id=db_book.id, club_id=db_club.id, user_id=db_user.id)
+    new_votes = await crud.delete_votes_by_book_id(db, book_id=db_book.id, club_id=db_club.id, user_id=db_user.id)
+    assert new_votes == 5
     
     book = await crud.get_book_by_id(db, book_id=db_book.id, club_id=db_club.id)
-    assert book.votes == 4
+    assert book.votes == 5
+
+    # Without a recorded vote there is nothing to take back
+    with pytest.raises(ItemNotFound):
+        await crud.delete_votes_by_book_id(db, book_id=book.id, club_id=book.club_id, user_id=db_user.id)
 
 @pytest.mark.asyncio
-async def test_get_book_progress(db):
+async def test_get_reading_progress(db):
+    user_in = schemas.UserCreate(email="progress@example.com", username="progress", password="pass", fullName="Reader")
+    db_user = await crud.create_user(db, user_in)
     club_in = schemas.ClubCreate(name="Club for Progress", description="Desc")
     db_club = await crud.create_club(db, club_in)
-    book_in = schemas.BookCreate(club_id=db_club.id, title="Progress Book", author="Author", progress=50)
+    book_in = schemas.BookCreate(club_id=db_club.id, title="Progress Book", author="Author")
     db_book = await crud.create_book(db, book_in)
 
-    progress = await crud.get_book_progress(db, book_id=db_book.id, club_id=db_club.id)
-    assert progress == 50
+    progress = await crud.get_reading_progress(db, book_id=db_book.id, club_id=db_club.id, user_id=db_user.id)
+    assert progress["progress"] == 0 and progress["readers"] == 0
 
 @pytest.mark.asyncio
-async def test_update_book_progress(db):
+async def test_update_reading_progress(db):
+    user_in = schemas.UserCreate(email="updater@example.com", username="updater", password="pass", fullName="Reader")
+    db_user = await crud.create_user(db, user_in)
     club_in = schemas.ClubCreate(name="Club for Update Progress", description="Desc")
     db_club = await crud.create_club(db, club_in)
-    book_in = schemas.BookCreate(club_id=db_club.id, title="Update Progress Book", author="Author", progress=10)
+    book_in = schemas.BookCreate(club_id=db_club.id, title="Update Progress Book", author="Author")
     db_book = await crud.create_book(db, book_in)
 
-    updated_book = await crud.update_book_progress(db, book_id=db_book.id, club_id=db_club.id, progress=75)
-    assert updated_book.progress == 75
+    await crud.update_reading_progress(db, book_id=db_book.id, club_id=db_club.id, user_id=db_user.id, progress=75)
+    progress = await crud.get_reading_progress(db, book_id=db_book.id, club_id=db_club.id, user_id=db_user.id)
+    assert progress["progress"] == 75 and progress["readers"] == 1
+    # The book-level field mirrors the club average
+    book = await crud.get_book_by_id(db, book_id=db_book.id, club_id=db_club.id)
+    assert book.progress == 75
+    with pytest.raises(ItemNotFound):
+        await crud.update_reading_progress(db, book_id=404, club_id=db_club.id, user_id=db_user.id, progress=10)
 
 @pytest.mark.asyncio
 async def test_create_review(db):
@@ -431,3 +503,35 @@ async def test_get_books_pagination(db):
     books = await crud.get_books_by_club_id(db, club_id=db_club.id, skip=4, limit=10)
     assert len(books) == 1
     assert books[0].title == "Book 4"
+
+@pytest.mark.asyncio
+async def test_get_clubs_keyset_pagination(db):
+    for i in range(5):
+        club_in = schemas.ClubCreate(name=f"Club {i}", description=f"Desc {i}")
+        await crud.create_club(db, club_in)
+
+    first_page = await crud.get_clubs(db, limit=2)
+    assert [c.name for c in first_page] == ["Club 0", "Club 1"]
+
+    second_page = await crud.get_clubs(db, limit=2, after_id=first_page[-1].id)
+    assert [c.name for c in second_page] == ["Club 2", "Club 3"]
+
+    # Rows inserted behind the cursor don't shift the following page
+    await crud.create_club(db, schemas.ClubCreate(name="Club 5", description="Desc 5"))
+    third_page = await crud.get_clubs(db, limit=2, after_id=second_page[-1].id)
+    assert [c.name for c in third_page] == ["Club 4", "Club 5"]
+
+@pytest.mark.asyncio
+async def test_get_books_keyset_pagination(db):
+    club_in = schemas.ClubCreate(name="Club for Keyset Books", description="Desc")
+    db_club = await crud.create_club(db, club_in)
+    other_club = await crud.create_club(db, schemas.ClubCreate(name="Other Club", description="Desc"))
+
+    for i in range(3):
+        await crud.create_book(db, schemas.BookCreate(club_id=db_club.id, title=f"Book {i}", author="Author"))
+        await crud.create_book(db, schemas.BookCreate(club_id=other_club.id, title=f"Other {i}", author="Author"))
+
+    first_page = await crud.get_books_by_club_id(db, club_id=db_club.id, limit=2)
+    assert [b.title for b in first_page] == ["Book 0", "Book 1"]
+    second_page = await crud.get_books_by_club_id(db, club_id=db_club.id, limit=2, after_id=first_page[-1].id)
+    assert [b.title for b in second_page] == ["Book 2"]
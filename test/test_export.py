@@ -0,0 +1,111 @@
+import gzip
+import json
+import os
+import sqlite3
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from main import app, get_db, get_current_user
+from app import models
+from app.core import export
+
+# Raise to a few million to reproduce the memory bound at full scale
+EXPORT_TEST_REVIEWS = int(os.getenv("EXPORT_TEST_REVIEWS", "200000"))
+
+@pytest.fixture
+async def db_path(tmp_path):
+    path = tmp_path / "export.db"
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+    return path
+
+@pytest.fixture
+async def session_factory(db_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    async def mock_get_current_user():
+        return models.User(id=1, username="testuser", email="test@example.com")
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = mock_get_current_user
+    yield SessionLocal
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+@pytest.fixture
+async def client(session_factory):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+
+def seed(db_path, reviews):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (id, email, username, age, age2, hashed_password) VALUES (1, 'e@x.com', 'u', 18, 18, 'h')")
+    conn.execute("INSERT INTO clubes (id, name) VALUES (1, 'Export Club'), (2, 'Other Club')")
+    conn.execute("INSERT INTO libros (id, club_id, title) VALUES (1, 1, 'Book'), (2, 2, 'Elsewhere')")
+    conn.execute(
+        "WITH RECURSIVE seq(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM seq WHERE i < ?) "
+        "INSERT INTO reviews (book_id, club_id, user_id, rating, comment) SELECT 1, 1, 1, i % 5, 'review ' || i FROM seq",
+        (reviews,),
+    )
+    conn.execute("INSERT INTO reviews (book_id, club_id, user_id, rating, comment) VALUES (2, 2, 1, 1, 'not exported')")
+    conn.execute("INSERT INTO meetings (id, book_id, club_id, location) VALUES (1, 1, 1, 'Online'), (2, 2, 2, 'Elsewhere')")
+    conn.execute("INSERT INTO meeting_attendance (meeting_id, user_id, status) VALUES (1, 1, 'SI'), (2, 1, 'NO')")
+    conn.commit()
+    conn.close()
+
+def parse(body: bytes):
+    return [json.loads(line) for line in body.decode().splitlines()]
+
+@pytest.mark.asyncio
+async def test_export_streams_only_the_club(client, db_path):
+    seed(db_path, reviews=3)
+    res = await client.get("/clubs/1/export", headers={"Accept-Encoding": "identity"})
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    assert "content-encoding" not in res.headers
+    records = parse(res.content)
+    assert [r["type"] for r in records] == ["club", "book", "review", "review", "review", "meeting", "attendance"]
+    assert records[0]["name"] == "Export Club"
+    assert records[-1]["meeting_id"] == 1
+
+@pytest.mark.asyncio
+async def test_export_gzip(client, db_path):
+    seed(db_path, reviews=10)
+    # httpx would decode transparently; read the raw bytes to check the encoding
+    async with client.stream("GET", "/clubs/1/export", headers={"Accept-Encoding": "gzip"}) as res:
+        assert res.headers["content-encoding"] == "gzip"
+        raw = b"".join([chunk async for chunk in res.aiter_raw()])
+    assert len(parse(gzip.decompress(raw))) == 1 + 1 + 10 + 1 + 1
+
+@pytest.mark.asyncio
+async def test_export_missing_club(client):
+    res = await client.get("/clubs/404/export")
+    assert res.status_code == 404
+
+def _rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="needs /proc to sample RSS")
+async def test_export_memory_is_bounded(session_factory, db_path):
+    seed(db_path, reviews=EXPORT_TEST_REVIEWS)
+    baseline = peak = _rss_mb()
+    exported = lines = 0
+    async with session_factory() as db:
+        async for chunk in export.club_export(db, 1):
+            exported += len(chunk)
+            lines += chunk.count(b"\n")
+            peak = max(peak, _rss_mb())
+    assert lines == EXPORT_TEST_REVIEWS + 4
+    # The export is tens of MB; the process only ever holds a batch of it
+    assert peak - baseline < min(32, exported / 1e6 / 2)
@@ -0,0 +1,75 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from main import app, get_db, get_current_user
+from app import models
+from app.core import fast_json, pagination
+from app.core.result_cache import result_cache
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(models.Club.__table__),
+            [{"name": f"Club {i}", "description": f"desc {i}", "favorite_genre": "sci-fi", "members": 2} for i in range(5)],
+        )
+    yield engine
+    await engine.dispose()
+
+@pytest.fixture
+async def client(engine):
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    async def mock_get_current_user():
+        return models.User(id=1, username="testuser", email="test@example.com")
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = mock_get_current_user
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+    app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cached", [True, False])
+async def test_fast_path_matches_the_schema_path(client, monkeypatch, cached):
+    monkeypatch.setattr(result_cache, "enabled", cached)
+    monkeypatch.setattr(result_cache, "unversioned_local", cached)
+    pages = {}
+    for enabled in (False, True, True):
+        monkeypatch.setattr(fast_json, "FAST_JSON_ENABLED", enabled)
+        res = await client.get("/clubs", params={"limit": 3})
+        assert res.status_code == 200
+        pages[enabled] = (res.json(), res.headers[pagination.CURSOR_HEADER])
+    assert pages[True] == pages[False]
+    assert list(pages[True][0][0]) == ["id", "name", "description"]
+
+@pytest.mark.asyncio
+async def test_fast_path_selects_only_schema_columns(client, engine, monkeypatch):
+    monkeypatch.setattr(fast_json, "FAST_JSON_ENABLED", True)
+    statements = []
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    res = await client.get("/clubs")
+    assert len(res.json()) == 5
+    (select_clubs,) = [s for s in statements if "FROM clubes" in s]
+    assert "favorite_genre" not in select_clubs and "members" not in select_clubs
+
+def test_response_class_needs_orjson(monkeypatch):
+    assert fast_json.response_class(enabled=False) is fast_json.JSONResponse
+    assert fast_json.response_class(enabled=True) is fast_json.ORJSONResponse
+    monkeypatch.setattr(fast_json, "orjson", None)
+    with pytest.raises(RuntimeError):
+        fast_json.response_class(enabled=True)
@@ -0,0 +1,136 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from main import app, get_db, get_current_user
+from app import models
+from app.core.http_cache import etag_matches
+from app.core.result_cache import result_cache
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+POLLS = 20
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+@pytest.fixture
+def statements(engine):
+    counter = StatementCounter()
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        counter.count += 1
+    return counter
+
+@pytest.fixture
+async def client(engine):
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    async def mock_get_current_user():
+        return models.User(id=1, username="testuser", email="test@example.com")
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = mock_get_current_user
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+    app.dependency_overrides.clear()
+
+@pytest.fixture
+async def club(client):
+    res = await client.post("/clubs", json={"name": "Polled Club", "description": "desc"})
+    club = res.json()
+    await client.post(f"/clubs/{club['id']}/books", json={"club_id": club["id"], "title": "Book", "author": "A"})
+    return club
+
+def test_etag_matches_weakly():
+    assert etag_matches('W/"club-1-v2"', 'W/"club-1-v2"')
+    assert etag_matches('"club-1-v2"', 'W/"club-1-v2"')
+    assert etag_matches('W/"club-1-v1", W/"club-1-v2"', 'W/"club-1-v2"')
+    assert etag_matches("*", 'W/"club-1-v2"')
+    assert not etag_matches('W/"club-1-v1"', 'W/"club-1-v2"')
+    assert not etag_matches(None, 'W/"club-1-v2"')
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/clubs/{id}", "/clubs/{id}/books", "/clubs/{id}/meetings"])
+async def test_conditional_get_returns_304(client, club, path):
+    url = path.format(id=club["id"])
+    res = await client.get(url)
+    assert res.status_code == 200
+    etag = res.headers["etag"]
+    assert etag.startswith('W/"')
+    assert res.headers["cache-control"] == "private, no-cache"
+
+    res = await client.get(url, headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.content == b""
+    assert res.headers["etag"] == etag
+
+@pytest.mark.asyncio
+async def test_club_writes_change_the_etag(client, club):
+    url = f"/clubs/{club['id']}/books"
+    etag = (await client.get(url)).headers["etag"]
+    book_id = (await client.get(url)).json()[0]["id"]
+
+    writes = [
+        lambda: client.get(f"/clubs/{club['id']}/books/{book_id}/votes"),
+        lambda: client.post(f"/clubs/{club['id']}/books/{book_id}/reviews", json={"club_id": club["id"], "book_id": book_id, "user_id": 1, "rating": 5, "comment": "c"}),
+        lambda: client.put(f"/clubs/{club['id']}/books/{book_id}/progress", params={"progress": 30}),
+        lambda: client.post(f"/clubs/{club['id']}/meetings", json={"bookId": book_id, "clubId": club["id"], "location": "Online"}),
+        lambda: client.put(f"/clubs/{club['id']}", json={"name": "Renamed", "description": "desc"}),
+    ]
+    for write in writes:
+        assert (await write()).status_code < 400
+        res = await client.get(url, headers={"If-None-Match": etag})
+        assert res.status_code == 200
+        assert res.headers["etag"] != etag
+        etag = res.headers["etag"]
+
+@pytest.mark.asyncio
+async def test_unknown_club_is_404(client):
+    res = await client.get("/clubs/404/books", headers={"If-None-Match": 'W/"club-404-v1"'})
+    assert res.status_code == 404
+
+@pytest.mark.asyncio
+async def test_steady_polling_skips_the_queries(client, club, statements, monkeypatch):
+    # Measured without the result cache, which would also absorb the listing query
+    monkeypatch.setattr(result_cache, "enabled", False)
+    url = f"/clubs/{club['id']}/books"
+    statements.count = 0
+    for _ in range(POLLS):
+        res = await client.get(url)
+    unconditional = statements.count
+
+    etag = res.headers["etag"]
+    statements.count = 0
+    for _ in range(POLLS):
+        assert (await client.get(url, headers={"If-None-Match": etag})).status_code == 304
+    conditional = statements.count
+
+    # One version lookup per poll instead of the version lookup + the listing
+    assert conditional == POLLS
+    assert unconditional == 2 * POLLS
+
+@pytest.mark.asyncio
+async def test_conditional_polls_count_against_the_rate_limit(client, club):
+    url = f"/clubs/{club['id']}/books"
+    res = await client.get(url)
+    etag = res.headers["etag"]
+    # The 304 is answered by a dependency; the limit must be checked before it
+    codes = [(await client.get(url, headers={"If-None-Match": etag})).status_code for _ in range(100)]
+    assert codes.count(304) == 99
+    assert codes[-1] == 429
@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from app import crud, schemas
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+@pytest.fixture
+async def db(engine):
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with SessionLocal() as session:
+        yield session
+
+@pytest.fixture
+def statements(engine):
+    captured = []
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+    return captured
+
+@pytest.fixture
+async def book(db):
+    club = await crud.create_club(db, schemas.ClubCreate(name="Club", description="desc", favorite_genre="Sci-Fi", members=3))
+    book = await crud.create_book(db, schemas.BookCreate(club_id=club.id, title="Book", author="Author"))
+    user = await crud.create_user(db, schemas.UserCreate(email="r@example.com", username="reader", password="pass", fullName="Reader"))
+    for rating in (5, 4, 4):
+        await crud.create_review(db, schemas.ReviewCreate(club_id=club.id, book_id=book.id, user_id=user.id, rating=rating, comment="c"))
+    db.expunge_all()
+    return book
+
+@pytest.mark.asyncio
+async def test_list_reads_select_only_schema_columns(db, book, statements):
+    statements.clear()
+    clubs = await crud.get_clubs(db)
+    books = await crud.get_books_by_club_id(db, club_id=book.club_id)
+    reviews = await crud.get_reviews_by_book_id(db, book_id=book.id, club_id=book.club_id)
+
+    assert len(statements) == 3
+    for statement in statements:
+        for column in ("created_date", "favorite_genre", "members", "rating_1"):
+            assert column not in statement, statement
+    # Rows, not entities: nothing was added to the session
+    assert len(db.identity_map) == 0
+
+    assert schemas.ClubOut.model_validate(clubs[0], from_attributes=True).name == "Club"
+    assert books[0].review_count == 3 and books[0].average_rating == 4.33
+    assert [review.rating for review in reviews] == [5, 4, 4]
+
+@pytest.mark.asyncio
+async def test_book_rows_match_the_single_book_read(db, book):
+    (listed,) = await crud.get_books_by_club_id(db, club_id=book.club_id)
+    single = await crud.get_book_by_id(db, book_id=book.id, club_id=book.club_id)
+    assert listed == schemas.BookOut.model_validate(single, from_attributes=True)
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from main import app, get_db, get_current_user
+from app import models
+from app.core.pagination import encode_time_cursor, decode_time_cursor, CURSOR_HEADER
+
+engine = create_async_engine("sqlite+aiosqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+async def override_get_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+async def mock_get_current_user():
+    return models.User(id=1, username="testuser", email="test@example.com")
+
+def at(month, day, hour=19):
+    return datetime(2026, month, day, hour)
+
+# Club 1: two meetings on the same evening (a tie on scheduled_at), one cancelled, one undated
+MEETINGS = [
+    {"club_id": 1, "book_id": 1, "scheduled_at": at(1, 15), "status": "Vencida"},
+    {"club_id": 1, "book_id": 1, "scheduled_at": at(3, 10), "status": "Próxima"},
+    {"club_id": 1, "book_id": 1, "scheduled_at": at(3, 10), "status": "Próxima"},
+    {"club_id": 1, "book_id": 1, "scheduled_at": at(6, 1), "status": "Cancelada"},
+    {"club_id": 1, "book_id": 1, "scheduled_at": None, "status": "Próxima"},
+    {"club_id": 1, "book_id": 1, "scheduled_at": at(2, 1), "status": "Próxima"},
+    {"club_id": 2, "book_id": 2, "scheduled_at": at(3, 12), "status": "Próxima"},
+]
+
+@pytest.fixture
+async def client():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(models.Club.__table__), [{"id": 1, "name": "One"}, {"id": 2, "name": "Two"}])
+        await conn.execute(insert(models.Meeting.__table__), MEETINGS)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = mock_get_current_user
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+    app.dependency_overrides.clear()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+async def walk(client, url, params):
+    ids, cursor = [], None
+    for _ in range(10):
+        res = await client.get(url, params=dict(params, **({"cursor": cursor} if cursor else {})))
+        assert res.status_code == 200, res.text
+        ids += [meeting["id"] for meeting in res.json()]
+        cursor = res.headers.get(CURSOR_HEADER)
+        if cursor is None:
+            return ids
+    raise AssertionError("cursor never ran out")
+
+def test_time_cursor_round_trip():
+    assert decode_time_cursor(encode_time_cursor(at(3, 10), 3)) == (at(3, 10), 3)
+    assert decode_time_cursor(encode_time_cursor(None, 5)) == (None, 5)
+    for bad in ["", "not-a-cursor", encode_time_cursor(at(1, 1), 1)[:-2] + "!!"]:
+        with pytest.raises(ValueError):
+            decode_time_cursor(bad)
+
+@pytest.mark.asyncio
+async def test_listing_is_in_date_order_with_undated_last(client):
+    res = await client.get("/clubs/1/meetings")
+    assert [m["id"] for m in res.json()] == [1, 6, 2, 3, 4, 5]
+    assert CURSOR_HEADER not in res.headers
+
+@pytest.mark.asyncio
+async def test_range_and_status_filters(client):
+    res = await client.get("/clubs/1/meetings", params={"from": "2026-02-01T00:00:00", "to": "2026-06-01T19:00:00"})
+    # from is inclusive, to is exclusive
+    assert [m["id"] for m in res.json()] == [6, 2, 3]
+    res = await client.get("/clubs/1/meetings", params={"from": "2026-01-01T00:00:00", "status": "Cancelada"})
+    assert [m["id"] for m in res.json()] == [4]
+
+@pytest.mark.asyncio
+async def test_cursor_walks_ties_and_undated_meetings(client):
+    assert await walk(client, "/clubs/1/meetings", {"limit": 2}) == [1, 6, 2, 3, 4, 5]
+    assert await walk(client, "/clubs/1/meetings", {"limit": 1, "from": "2026-01-01T00:00:00"}) == [1, 6, 2, 3, 4]
+
+@pytest.mark.asyncio
+async def test_bad_cursor_is_a_400(client):
+    res = await client.get("/clubs/1/meetings", params={"cursor": "nope"})
+    assert res.status_code == 400
+
+@pytest.mark.asyncio
+async def test_my_meetings_across_clubs(client):
+    async with engine.begin() as conn:
+        await conn.execute(insert(models.MeetingAttendance.__table__), [
+            {"meeting_id": 1, "user_id": 1, "status": "SI"},       # in the past
+            {"meeting_id": 3, "user_id": 1, "status": "TAL_VEZ"},
+            {"meeting_id": 6, "user_id": 1, "status": "NO"},       # declined
+            {"meeting_id": 7, "user_id": 1, "status": "SI"},       # another club
+            {"meeting_id": 2, "user_id": 2, "status": "SI"},       # someone else
+        ])
+    res = await client.get("/me/meetings", params={"from": "2026-02-01T00:00:00"})
+    assert [(m["id"], m["club_id"]) for m in res.json()] == [(3, 1), (7, 2)]
+    assert await walk(client, "/me/meetings", {"from": "2026-01-01T00:00:00", "limit": 1}) == [1, 3, 7]
+    # Without from, "upcoming" starts now
+    async with engine.begin() as conn:
+        await conn.execute(insert(models.Meeting.__table__), {"id": 8, "club_id": 2, "book_id": 2, "scheduled_at": datetime.now() + timedelta(days=30)})
+        await conn.execute(insert(models.MeetingAttendance.__table__), {"meeting_id": 8, "user_id": 1, "status": "SI"})
+    res = await client.get("/me/meetings")
+    assert [m["id"] for m in res.json()] == [8]
@@ -0,0 +1,36 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from main import app
+from app.core import metrics, security
+from app.core.result_cache import result_cache
+
+@pytest.fixture
+async def client():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+
+@pytest.mark.asyncio
+async def test_metrics_are_off_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "")
+    assert (await client.get("/metrics")).status_code == 404
+    assert (await client.get("/metrics", headers={"X-Metrics-Token": ""})).status_code == 404
+
+@pytest.mark.asyncio
+async def test_metrics_need_the_configured_token(client, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "s3cret")
+    assert (await client.get("/metrics")).status_code == 404
+    assert (await client.get("/metrics", headers={"X-Metrics-Token": "guess"})).status_code == 404
+
+@pytest.mark.asyncio
+async def test_metrics_report_pools_caches_and_hashing(client, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "s3cret")
+    await security.get_password_hash_async("password123")
+    result_cache.hits += 3
+    res = await client.get("/metrics", headers={"X-Metrics-Token": "s3cret"})
+    assert res.status_code == 200
+    body = res.json()
+    assert {"db_pool", "user_cache", "token_cache", "password_hashing", "result_cache", "vote_buffer", "progress_buffer"} <= body.keys()
+    assert "status" in body["db_pool"]
+    assert body["password_hashing"]["workers"] == security.PASSWORD_HASH_WORKERS
+    assert body["result_cache"]["hits"] == 3
+    assert body["user_cache"]["hits"] >= 0
@@ -0,0 +1,76 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from main import app, get_db, get_current_user
+from app import models
+from app.core.pagination import encode_cursor, decode_cursor, CURSOR_HEADER
+
+# Setup in-memory DB
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+async def override_get_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+async def mock_get_current_user():
+    return models.User(id=1, username="testuser", email="test@example.com")
+
+@pytest.fixture
+async def client():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = mock_get_current_user
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+    app.dependency_overrides.clear()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(42)) == 42
+    for bad in ["", "not-a-cursor", encode_cursor(1)[:-2] + "!!"]:
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+@pytest.mark.asyncio
+async def test_walk_clubs_with_cursor(client):
+    for i in range(5):
+        await client.post("/clubs", json={"name": f"Club {i}", "description": "desc"})
+
+    names, cursor = [], None
+    for _ in range(5):
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        res = await client.get("/clubs", params=params)
+        assert res.status_code == 200
+        names += [club["name"] for club in res.json()]
+        cursor = res.headers.get(CURSOR_HEADER)
+        if cursor is None:
+            break
+    assert names == [f"Club {i}" for i in range(5)]
+
+@pytest.mark.asyncio
+async def test_walk_books_with_cursor(client):
+    res = await client.post("/clubs", json={"name": "Books Club", "description": "desc"})
+    club_id = res.json()["id"]
+    for i in range(3):
+        await client.post(f"/clubs/{club_id}/books", json={"club_id": club_id, "title": f"Book {i}", "author": "Author"})
+
+    res = await client.get(f"/clubs/{club_id}/books", params={"limit": 2})
+    assert [b["title"] for b in res.json()] == ["Book 0", "Book 1"]
+    res = await client.get(f"/clubs/{club_id}/books", params={"limit": 2, "cursor": res.headers[CURSOR_HEADER]})
+    assert [b["title"] for b in res.json()] == ["Book 2"]
+    assert CURSOR_HEADER not in res.headers
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_is_rejected(client):
+    res = await client.get("/clubs", params={"cursor": "garbage"})
+    assert res.status_code == 400
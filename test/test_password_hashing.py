@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from httpx import AsyncClient, ASGITransport
+from passlib.context import CryptContext
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from main import app, get_db
+from app import models
+from app.core import security
+from app.core.exceptions import ServiceUnavailable
+
+# Setup in-memory DB
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+async def override_get_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+@pytest.fixture(autouse=True)
+async def override_db_dependency():
+    app.dependency_overrides[get_db] = override_get_db
+    yield
+    app.dependency_overrides.pop(get_db, None)
+    # aiosqlite runs each connection on a non-daemon thread; release it
+    await engine.dispose()
+
+@pytest.fixture
+async def prepare_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+@pytest.mark.asyncio
+async def test_async_hash_and_verify():
+    hashed = await security.get_password_hash_async("secret")
+    assert hashed.startswith("$2")
+    assert await security.verify_password_async("secret", hashed)
+    assert not await security.verify_password_async("wrong", hashed)
+    assert security.password_hashing_stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_hashing_rejects_when_saturated(monkeypatch):
+    monkeypatch.setattr(security, "PASSWORD_HASH_MAX_PENDING", 2)
+    hashed = security.get_password_hash("secret")
+    results = await asyncio.gather(
+        *[security.verify_password_async("secret", hashed) for _ in range(4)],
+        return_exceptions=True,
+    )
+    assert results.count(True) == 2
+    assert sum(isinstance(r, ServiceUnavailable) for r in results) == 2
+    assert security.password_hashing_stats()["rejected"] >= 2
+
+@pytest.mark.asyncio
+async def test_login_rehashes_outdated_hash(prepare_db):
+    # Stored with a different cost than the configured BCRYPT_ROUNDS
+    old_rounds = security.BCRYPT_ROUNDS + 1
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=old_rounds).hash("password")
+    async with TestingSessionLocal() as db:
+        db.add(models.User(email="old@example.com", username="olduser", hashed_password=old_hash))
+        await db.commit()
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        res = await client.post("/token", data={"username": "olduser", "password": "password"})
+        assert res.status_code == 200
+
+    async with TestingSessionLocal() as db:
+        result = await db.execute(select(models.User.hashed_password).filter(models.User.username == "olduser"))
+        new_hash = result.scalar_one()
+    assert new_hash != old_hash
+    assert not security.pwd_context.needs_update(new_hash)
+    assert security.verify_password("password", new_hash)
+
+@pytest.mark.asyncio
+async def test_login_returns_503_when_saturated(prepare_db, monkeypatch):
+    async with TestingSessionLocal() as db:
+        db.add(models.User(email="busy@example.com", username="busyuser", hashed_password=security.get_password_hash("password")))
+        await db.commit()
+    monkeypatch.setattr(security, "PASSWORD_HASH_MAX_PENDING", 0)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        res = await client.post("/token", data={"username": "busyuser", "password": "password"})
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
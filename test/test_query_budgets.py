@@ -0,0 +1,117 @@
+import logging
+import re
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.responses import PlainTextResponse
+from app.database import Base
+from main import app, get_db
+from app import crud, schemas
+from app.core import security, query_stats
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.result_cache import result_cache
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+def db_queries(res) -> int:
+    return int(re.search(r'desc="(\d+) queries"', res.headers["server-timing"]).group(1))
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+@pytest.fixture
+async def client(engine, monkeypatch):
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    # Budgets are for the database path, not for cache hits
+    monkeypatch.setattr(result_cache, "enabled", False)
+    async with SessionLocal() as db:
+        await crud.create_user(db, schemas.UserCreate(email="budget@example.com", username="budget", password="pass", fullName="Budget"))
+    app.dependency_overrides[get_db] = override_get_db
+    token = security.create_access_token({"sub": "budget"})
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", headers={"Authorization": f"Bearer {token}"}) as ac:
+        # The first authenticated call loads the user; later ones hit the user cache
+        res = await ac.get("/clubs")
+        assert db_queries(res) == 2
+        yield ac
+    app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_endpoint_query_budgets(client):
+    res = await client.post("/clubs", json={"name": "Club", "description": "desc"})
+    club_id = res.json()["id"]
+    assert db_queries(res) == 1
+    res = await client.post(f"/clubs/{club_id}/books", json={"club_id": club_id, "title": "Book", "author": "A"})
+    book_id = res.json()["id"]
+    book = f"/clubs/{club_id}/books/{book_id}"
+
+    budgets = [
+        ("GET", "/clubs", None, 1),
+        # Version lookup for the ETag, then the page
+        ("GET", f"/clubs/{club_id}", None, 2),
+        ("GET", f"/clubs/{club_id}/books", None, 2),
+        ("GET", book, None, 1),
+        ("GET", f"{book}/votes", None, 3),
+        ("DELETE", f"{book}/votes", None, 3),
+        ("POST", f"{book}/reviews", {"club_id": club_id, "book_id": book_id, "user_id": 1, "rating": 4, "comment": "c"}, 3),
+        ("GET", f"{book}/reviews", None, 1),
+        ("GET", f"{book}/reviews/stats", None, 1),
+        # Book lock (SQLite), validate + old value, progress upsert, aggregate upsert, book mean, club version, then the response read
+        ("PUT", f"{book}/progress?progress=50", None, 7),
+        ("GET", f"{book}/progress", None, 1),
+    ]
+    for method, url, body, budget in budgets:
+        res = await client.request(method, url, json=body)
+        assert res.status_code < 400, (method, url, res.text)
+        assert db_queries(res) <= budget, (method, url, db_queries(res))
+
+@pytest.mark.asyncio
+async def test_server_timing_reports_db_time(client):
+    res = await client.get("/clubs")
+    timing = dict(re.findall(r"([\w-]+);dur=([\d.]+)", res.headers["server-timing"]))
+    assert float(timing["db"]) >= float(timing["db-slowest"]) > 0
+    res = await client.get("/health")
+    assert db_queries(res) == 0
+
+@pytest.mark.asyncio
+async def test_repeated_statements_are_logged_as_n_plus_one(engine, caplog, monkeypatch):
+    # alembic's fileConfig (test_indexes) disables loggers that already exist
+    monkeypatch.setattr(query_stats.logger, "disabled", False)
+    async def endpoint(scope, receive, send):
+        async with engine.connect() as conn:
+            for book_id in range(6):
+                await conn.execute(text("SELECT title FROM libros WHERE id = :id"), {"id": book_id})
+            await conn.execute(text("SELECT count(*) FROM clubes"))
+        await PlainTextResponse("ok")(scope, receive, send)
+
+    middleware = QueryStatsMiddleware(endpoint, enabled=True, server_timing=True)
+    with caplog.at_level(logging.WARNING, logger=query_stats.__name__):
+        async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as ac:
+            res = await ac.get("/books")
+    assert db_queries(res) == 7
+    (record,) = caplog.records
+    assert '"queries": 7' in record.message
+    assert '"sql": "SELECT title FROM libros WHERE id = ?", "times": 6' in record.message
+
+@pytest.mark.asyncio
+async def test_track_counts_outside_requests(engine):
+    with query_stats.track() as queries:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            with pytest.raises(Exception):
+                await conn.execute(text("SELECT * FROM missing_table"))
+            await conn.execute(text("SELECT 2"))
+    assert queries.count == 3
+    assert set(queries.statements) == {"SELECT 1", "SELECT * FROM missing_table", "SELECT 2"}
@@ -0,0 +1,109 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app import crud, schemas
+from app.core.exceptions import ItemNotFound
+
+# Statement budgets for crud write paths: each mutation is a single round trip
+# (the vote functions also maintain the voters ledger and the review writers
+# the review_stats row, hence the extra statement). Writes below a club also
+# bump its version for ETags: CLUB_BUMP more.
+CLUB_BUMP = 1
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+class StatementCounter:
+    def __init__(self):
+        self.statements = []
+
+    async def run(self, coro):
+        self.statements.clear()
+        result = await coro
+        return result, len(self.statements)
+
+@pytest.fixture
+async def db_and_counter():
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    counter = StatementCounter()
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    async with TestingSessionLocal() as session:
+        yield session, counter
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_write_paths_query_budget(db_and_counter):
+    db, counter = db_and_counter
+
+    user, n = await counter.run(crud.create_user(db, schemas.UserCreate(email="q@example.com", username="q", password="pass", fullName="Q")))
+    assert n == 1
+    assert user.id is not None and user.created_at is not None
+
+    club, n = await counter.run(crud.create_club(db, schemas.ClubCreate(name="Budget Club", description="Desc")))
+    assert n == 1
+    assert club.created_date is not None
+
+    club, n = await counter.run(crud.update_club(db, schemas.ClubCreate(name="Renamed", description="New"), club_id=club.id))
+    assert n == 1
+    assert club.name == "Renamed"
+
+    book, n = await counter.run(crud.create_book(db, schemas.BookCreate(club_id=club.id, title="Budget Book", author="Author")))
+    assert n == 1 + CLUB_BUMP
+    assert book.created_date is not None
+
+    # Book lock (SQLite), old value, progress upsert, aggregate upsert, book mean
+    _, n = await counter.run(crud.update_reading_progress(db, book_id=book.id, club_id=club.id, user_id=user.id, progress=40))
+    assert n == 5 + CLUB_BUMP
+
+    _, n = await counter.run(crud.add_votes_by_book_id(db, book_id=book.id, club_id=club.id, user_id=user.id))
+    assert n == 2 + CLUB_BUMP
+    _, n = await counter.run(crud.delete_votes_by_book_id(db, book_id=book.id, club_id=club.id, user_id=user.id))
+    assert n == 2 + CLUB_BUMP
+
+    review_in = schemas.ReviewCreate(club_id=club.id, book_id=book.id, user_id=user.id, rating=4, comment="Good")
+    review, n = await counter.run(crud.create_review(db, review_in))
+    assert n == 2 + CLUB_BUMP
+
+    review_update = schemas.ReviewUpdate(id=review.id, club_id=club.id, book_id=book.id, rating=2, comment="Meh")
+    # Review lock (SQLite), then the old rating is read to move it between histogram buckets
+    review, n = await counter.run(crud.update_review(db, review_update))
+    assert n == 4 + CLUB_BUMP
+    assert review.rating == 2
+
+    _, n = await counter.run(crud.delete_review(db, review_id=review.id))
+    assert n == 2 + CLUB_BUMP
+
+    meeting_in = schemas.MeetingCreate(bookId=book.id, clubId=club.id, location="Online")
+    meeting, n = await counter.run(crud.create_meeting(db, meeting_in))
+    assert n == 1 + CLUB_BUMP
+
+    attendance_in = schemas.MeetingAttendanceCreate(user_id=user.id, status=schemas.AttendanceValue.SI)
+    # Meeting lock (SQLite), previous answer, upsert, meeting counters
+    _, n = await counter.run(crud.create_attendance_meeting(db, meeting.id, attendance_in))
+    assert n == 4 + CLUB_BUMP
+    # The same answer again changes nothing
+    _, n = await counter.run(crud.create_attendance_meeting(db, meeting.id, attendance_in))
+    assert n == 2
+
+    _, n = await counter.run(crud.delete_meeting(db, club_id=club.id, meeting_id=meeting.id))
+    assert n == 1 + CLUB_BUMP
+
+    _, n = await counter.run(crud.delete_club(db, club_id=club.id))
+    assert n == 1
+
+@pytest.mark.asyncio
+async def test_update_missing_rows_still_raise(db_and_counter):
+    db, counter = db_and_counter
+    with pytest.raises(ItemNotFound):
+        await crud.update_club(db, schemas.ClubCreate(name="X", description="Y"), club_id=404)
+    with pytest.raises(ItemNotFound):
+        await crud.update_review(db, schemas.ReviewUpdate(id=404, club_id=1, book_id=1, rating=1, comment="x"))
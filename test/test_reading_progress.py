@@ -0,0 +1,128 @@
+import asyncio
+import pytest
+from fastapi import Request
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from main import app, get_db, get_current_user
+from app import models, crud
+from app.core.progress_buffer import progress_buffer
+
+@pytest.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'progress.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+@pytest.fixture
+async def session_factory(engine):
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    async def override_get_current_user(request: Request):
+        user_id = int(request.headers.get("X-User-Id", "1"))
+        return models.User(id=user_id, username=f"reader{user_id}", email=f"reader{user_id}@example.com")
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = override_get_current_user
+    yield SessionLocal
+    await progress_buffer.stop()
+    app.dependency_overrides.clear()
+
+@pytest.fixture
+async def client(session_factory):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+
+@pytest.fixture
+async def book(client):
+    res = await client.post("/clubs", json={"name": "Readers", "description": "desc"})
+    club_id = res.json()["id"]
+    res = await client.post(f"/clubs/{club_id}/books", json={"club_id": club_id, "title": "Long Book", "author": "A"})
+    return res.json()
+
+def progress_url(book):
+    return f"/clubs/{book['club_id']}/books/{book['id']}/progress"
+
+async def put_progress(client, book, user_id, progress):
+    res = await client.put(progress_url(book), params={"progress": progress}, headers={"X-User-Id": str(user_id)})
+    assert res.status_code == 200
+    return res.json()
+
+@pytest.mark.asyncio
+async def test_individual_and_collective_progress(client, book):
+    res = await client.get(progress_url(book))
+    assert res.json() == {"book_id": book["id"], "progress": 0, "readers": 0, "mean_progress": None, "median_bucket": None, "finished_count": 0}
+
+    for user_id, progress in ((1, 10), (2, 45), (3, 100), (4, 60)):
+        await put_progress(client, book, user_id, progress)
+    body = await put_progress(client, book, 1, 30)  # moves reader 1 from 10% to 30%
+    assert body["progress"] == 30
+    assert body["readers"] == 4
+    assert body["mean_progress"] == 58.75
+    assert body["median_bucket"] == "40-49"
+    assert body["finished_count"] == 1
+
+    res = await client.get(progress_url(book), headers={"X-User-Id": "3"})
+    assert res.json()["progress"] == 100
+    # The book-level field mirrors the club average
+    res = await client.get(f"/clubs/{book['club_id']}/books/{book['id']}")
+    assert res.json()["progress"] == 59
+
+@pytest.mark.asyncio
+async def test_progress_is_clamped_and_missing_book_404(client, book):
+    body = await put_progress(client, book, 1, 250)
+    assert body["progress"] == 100 and body["finished_count"] == 1
+    res = await client.put(f"/clubs/{book['club_id']}/books/404/progress", params={"progress": 5})
+    assert res.status_code == 404
+
+@pytest.mark.asyncio
+async def test_buffer_coalesces_page_turns(client, book, engine, session_factory):
+    writes = []
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO reading_progress"):
+            writes.append(parameters)
+
+    progress_buffer.start(session_factory)
+    for page in range(1, 51):
+        body = await put_progress(client, book, 1, page)
+        # The reader sees their own latest value straight away
+        assert body["progress"] == page
+    await put_progress(client, book, 2, 20)
+    await progress_buffer.flush()
+
+    assert len(writes) == 2
+    res = await client.get(progress_url(book))
+    assert res.json()["readers"] == 2
+    assert res.json()["mean_progress"] == 35.0
+    async with session_factory() as db:
+        rows = (await db.execute(select(models.ReadingProgress.progress).order_by(models.ReadingProgress.user_id))).scalars().all()
+    assert rows == [50, 20]
+
+@pytest.mark.asyncio
+async def test_concurrent_updates_keep_stats_in_step(book, session_factory):
+    # Same readers updating at once on separate connections, as concurrent requests would
+    async def update(user_id, progress):
+        async with session_factory() as db:
+            await crud.update_reading_progress(db, book_id=book["id"], club_id=book["club_id"], user_id=user_id, progress=progress)
+
+    await asyncio.gather(*[update(user_id, progress) for progress in range(5, 100, 5) for user_id in (1, 2, 3)])
+
+    async with session_factory() as db:
+        rows = (await db.execute(select(models.ReadingProgress.progress).filter(models.ReadingProgress.book_id == book["id"]))).scalars().all()
+        stats = await db.get(models.ProgressStats, book["id"])
+    assert stats.reader_count == len(rows) == 3
+    assert stats.progress_sum == sum(rows)
+    assert stats.finished_count == sum(1 for p in rows if p == 100)
+    for bucket in models.ProgressStats.BUCKETS:
+        expected = sum(1 for p in rows if models.ProgressStats.bucket_for(p) == bucket)
+        assert getattr(stats, f"bucket_{bucket}") == expected, bucket
@@ -0,0 +1,154 @@
+import re
+from datetime import datetime, timezone
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import update, func
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from main import app, get_db
+from app import models, crud
+from app.core import security
+
+@pytest.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'tokens.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with SessionLocal() as db:
+        db.add(models.User(username="reader", email="reader@example.com", hashed_password=security.get_password_hash("secret123")))
+        await db.commit()
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield SessionLocal
+    app.dependency_overrides.pop(get_db, None)
+    await engine.dispose()
+
+@pytest.fixture
+async def client(session_factory):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+
+async def login(client):
+    res = await client.post("/token", data={"username": "reader", "password": "secret123"})
+    assert res.status_code == 200
+    return res.json()
+
+def refresh(client, token):
+    return client.post("/token/refresh", json={"refresh_token": token})
+
+def db_queries(res) -> int:
+    return int(re.search(r'desc="(\d+) queries"', res.headers["server-timing"]).group(1))
+
+async def stored_tokens(session_factory):
+    async with session_factory() as db:
+        return (await db.execute(select(models.RefreshToken).order_by(models.RefreshToken.id))).scalars().all()
+
+@pytest.mark.asyncio
+async def test_refresh_rotates_without_bcrypt(client, monkeypatch):
+    tokens = await login(client)
+    assert tokens["refresh_token"]
+
+    def no_bcrypt(*args):
+        raise AssertionError("refresh must not verify a password")
+    monkeypatch.setattr(security.pwd_context, "verify", no_bcrypt)
+    monkeypatch.setattr(security.pwd_context, "verify_and_update", no_bcrypt)
+
+    res = await refresh(client, tokens["refresh_token"])
+    assert res.status_code == 200
+    body = res.json()
+    assert body["token_type"] == "bearer"
+    assert body["refresh_token"] != tokens["refresh_token"]
+    assert security.decode_access_token(body["access_token"])["sub"] == "reader"
+    # One UPDATE ... RETURNING spends the old token, one INSERT stores the next
+    assert db_queries(res) == 2
+    # The new access token works
+    res = await client.get("/clubs", headers={"Authorization": f"Bearer {body['access_token']}"})
+    assert res.status_code == 200
+
+@pytest.mark.asyncio
+async def test_only_the_hash_is_stored(client, session_factory):
+    tokens = await login(client)
+    [row] = await stored_tokens(session_factory)
+    assert row.token_hash == security.hash_refresh_token(tokens["refresh_token"])
+    assert tokens["refresh_token"] not in row.token_hash
+
+@pytest.mark.asyncio
+async def test_rotated_token_cannot_be_used_twice(client):
+    tokens = await login(client)
+    assert (await refresh(client, tokens["refresh_token"])).status_code == 200
+    res = await refresh(client, tokens["refresh_token"])
+    assert res.status_code == 401
+    assert res.json() == {"detail": "Invalid or expired refresh token"}
+
+@pytest.mark.asyncio
+async def test_reuse_revokes_the_whole_family(client, session_factory):
+    first = await login(client)
+    other_session = await login(client)
+    second = (await refresh(client, first["refresh_token"])).json()
+    # The old token shows up again: someone copied it, so the session it started ends
+    assert (await refresh(client, first["refresh_token"])).status_code == 401
+    assert (await refresh(client, second["refresh_token"])).status_code == 401
+    # Other logins of the same user are a different family and keep working
+    assert (await refresh(client, other_session["refresh_token"])).status_code == 200
+    rows = await stored_tokens(session_factory)
+    family = {row.family_id for row in rows if row.token_hash == security.hash_refresh_token(first["refresh_token"])}
+    assert [row.revoked_at is None for row in rows if row.family_id in family] == [False, False]
+
+@pytest.mark.asyncio
+async def test_revoke_logs_the_session_out(client):
+    tokens = await login(client)
+    rotated = (await refresh(client, tokens["refresh_token"])).json()
+    res = await client.post("/token/revoke", json={"refresh_token": tokens["refresh_token"]})
+    assert res.status_code == 204
+    assert (await refresh(client, rotated["refresh_token"])).status_code == 401
+    # Unknown tokens are accepted silently
+    res = await client.post("/token/revoke", json={"refresh_token": "not-a-token"})
+    assert res.status_code == 204
+
+@pytest.mark.asyncio
+async def test_expired_refresh_token_is_rejected(client, session_factory):
+    tokens = await login(client)
+    async with session_factory() as db:
+        await db.execute(update(models.RefreshToken).values(expires_at=datetime(2020, 1, 1, tzinfo=timezone.utc)))
+        await db.commit()
+    res = await refresh(client, tokens["refresh_token"])
+    assert res.status_code == 401
+    # Expired is not reuse: nothing else was revoked
+    [row] = await stored_tokens(session_factory)
+    assert row.revoked_at is None
+
+@pytest.mark.asyncio
+async def test_unknown_token_is_a_401(client):
+    res = await refresh(client, "not-a-token")
+    assert res.status_code == 401
+    assert res.headers["www-authenticate"] == "Bearer"
+
+@pytest.mark.asyncio
+async def test_purge_keeps_only_live_sessions(client, session_factory):
+    live = await login(client)
+    live = (await refresh(client, live["refresh_token"])).json()
+    logged_out = await login(client)
+    await client.post("/token/revoke", json={"refresh_token": logged_out["refresh_token"]})
+    await login(client)
+    async with session_factory() as db:
+        newest = (await db.execute(select(func.max(models.RefreshToken.id)))).scalar_one()
+        await db.execute(update(models.RefreshToken).where(models.RefreshToken.id == newest).values(expires_at=datetime(2020, 1, 1, tzinfo=timezone.utc)))
+        await db.commit()
+
+    async with session_factory() as db:
+        assert await crud.purge_refresh_tokens(db) == 2
+    rows = await stored_tokens(session_factory)
+    # The live session and the token it rotated away from, kept to catch its reuse
+    assert len(rows) == 2
+    assert len({row.family_id for row in rows}) == 1
+    assert (await refresh(client, live["refresh_token"])).status_code == 200
+
+    async with session_factory() as db:
+        assert await crud.purge_refresh_tokens(db) == 0
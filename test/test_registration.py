@@ -0,0 +1,69 @@
+import asyncio
+import re
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import func
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from main import app, get_db
+from app import models
+
+@pytest.fixture
+async def session_factory(tmp_path):
+    # A file database so concurrent registrations really use separate connections
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'users.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield SessionLocal
+    app.dependency_overrides.pop(get_db, None)
+    await engine.dispose()
+
+@pytest.fixture
+async def client(session_factory):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+
+def user(email="reader@example.com", username="reader"):
+    return {"email": email, "username": username, "password": "secret123", "fullName": "Reader"}
+
+def db_queries(res) -> int:
+    return int(re.search(r'desc="(\d+) queries"', res.headers["server-timing"]).group(1))
+
+@pytest.mark.asyncio
+async def test_registration_is_a_single_insert(client):
+    res = await client.post("/auth/register", json=user())
+    assert res.status_code == 201
+    assert db_queries(res) == 1
+
+@pytest.mark.asyncio
+async def test_duplicates_keep_their_messages(client):
+    await client.post("/auth/register", json=user())
+    res = await client.post("/auth/register", json=user(username="someone-else"))
+    assert res.status_code == 400
+    assert res.json() == {"detail": "Email ya registrado"}
+    assert db_queries(res) == 1
+    res = await client.post("/auth/register", json=user(email="other@example.com"))
+    assert res.status_code == 400
+    assert res.json() == {"detail": "Username ya registrado"}
+    # The failed insert was rolled back; the session is usable again
+    res = await client.post("/auth/register", json=user(email="other@example.com", username="other"))
+    assert res.status_code == 201
+
+@pytest.mark.asyncio
+async def test_concurrent_registrations_let_exactly_one_through(client, session_factory):
+    responses = await asyncio.gather(*[
+        client.post("/auth/register", json=user(email=f"racer{i}@example.com", username="racer")) for i in range(5)
+    ])
+    assert sorted(res.status_code for res in responses) == [201, 400, 400, 400, 400]
+    assert {res.json()["detail"] for res in responses if res.status_code == 400} == {"Username ya registrado"}
+    async with session_factory() as db:
+        assert await db.scalar(select(func.count()).select_from(models.User)) == 1
@@ -0,0 +1,115 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from main import app, get_db
+from app import database, models
+from app.core import replica
+
+# Two SQLite files stand in for the primary and its replica. Nothing replicates
+# between them, which makes it easy to see where each read was served from.
+@pytest.fixture
+async def databases(tmp_path, monkeypatch):
+    engines = []
+    factories = []
+    for name in ("primary", "replica"):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        engines.append(engine)
+        factories.append(sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False))
+    primary, replica_factory = factories
+
+    async with replica_factory() as db:
+        db.add(models.Club(name="Replica Club", description="only on the replica"))
+        await db.commit()
+
+    async def override_get_db():
+        async with primary() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    monkeypatch.setattr(database, "ReplicaSessionLocal", replica_factory)
+    yield
+    app.dependency_overrides.pop(get_db, None)
+    for engine in engines:
+        await engine.dispose()
+
+async def _login(client, username):
+    user_data = {"email": f"{username}@example.com", "username": username, "password": "password", "fullName": username}
+    await client.post("/auth/register", json=user_data)
+    res = await client.post("/token", data={"username": username, "password": "password"})
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+async def _club_names(client, headers):
+    res = await client.get("/clubs", headers=headers)
+    assert res.status_code == 200
+    return [club["name"] for club in res.json()]
+
+@pytest.mark.asyncio
+async def test_reads_use_replica_with_read_your_writes(databases, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(replica.time, "monotonic", lambda: now[0])
+    # The cookie's window is on the wall clock; move it by the same amount
+    wall = replica.time.time
+    monkeypatch.setattr(replica.time, "time", lambda: wall() + now[0] - 1000.0)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        writer = await _login(client, "writer")
+        reader = await _login(client, "reader")
+
+        assert await _club_names(client, writer) == ["Replica Club"]
+
+        res = await client.post("/clubs", json={"name": "Primary Club", "description": "desc"}, headers=writer)
+        assert res.status_code == 201
+
+        # The writer reads its own write from the primary...
+        assert await _club_names(client, writer) == ["Primary Club"]
+        # ...while everybody else keeps reading from the replica
+        assert await _club_names(client, reader) == ["Replica Club"]
+
+        now[0] += replica.REPLICA_STICKY_SECONDS + 1
+        assert await _club_names(client, writer) == ["Replica Club"]
+
+@pytest.mark.asyncio
+async def test_read_your_writes_holds_on_another_worker(databases):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        writer = await _login(client, "writer")
+        res = await client.post("/clubs", json={"name": "Primary Club", "description": "desc"}, headers=writer)
+        assert res.status_code == 201
+        assert replica.REPLICA_STICKY_COOKIE in res.cookies
+
+        # The next read lands on a worker that never saw the write
+        replica.replica_router.reset()
+        assert await _club_names(client, writer) == ["Primary Club"]
+
+        # The cookie only counts for the user who wrote
+        reader = await _login(client, "reader")
+        assert await _club_names(client, reader) == ["Replica Club"]
+
+def test_sticky_cookie_is_bounded_to_one_window(monkeypatch):
+    monkeypatch.setattr(replica.time, "time", lambda: 100.0)
+    router = replica.ReplicaRouter(sticky_seconds=5)
+    cookie = router.sticky_cookie("a:b")
+    assert router.cookie_wants_primary("a:b", cookie)
+    assert not router.cookie_wants_primary("b", cookie)
+    assert not router.cookie_wants_primary("a:b", "a:b:9999999999")
+    assert not router.cookie_wants_primary("a:b", "a:b:soon")
+    assert not router.cookie_wants_primary("a:b", None)
+    monkeypatch.setattr(replica.time, "time", lambda: 106.0)
+    assert not router.cookie_wants_primary("a:b", cookie)
+
+def test_router_expires_and_is_bounded(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(replica.time, "monotonic", lambda: now[0])
+    router = replica.ReplicaRouter(sticky_seconds=5, max_users=2)
+    router.mark_write("a")
+    assert router.use_primary("a")
+    assert not router.use_primary("b")
+    now[0] = 6
+    assert not router.use_primary("a")
+    router.mark_write("b")
+    router.mark_write("c")
+    router.mark_write("d")
+    assert len(router._primary_until) <= 3
@@ -0,0 +1,237 @@
+import asyncio
+import pytest
+from httpx import AsyncClient, ASGITransport
+from pydantic import TypeAdapter
+from sqlalchemy import event, update
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from main import app, get_db, get_current_user
+from app import models
+from app.core import result_cache as result_cache_module
+from app.core.result_cache import MemoryBackend, ResultCache, result_cache
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+ints = TypeAdapter(list[int])
+
+class ListingCounter:
+    def __init__(self):
+        self.clubs = 0
+        self.books = 0
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+@pytest.fixture
+def listings(engine):
+    counter = ListingCounter()
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT") and "FROM clubes ORDER BY" in statement:
+            counter.clubs += 1
+        if statement.startswith("SELECT") and "FROM libros" in statement and "ORDER BY libros.id" in statement:
+            counter.books += 1
+    return counter
+
+@pytest.fixture
+async def client(engine):
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    async def mock_get_current_user():
+        return models.User(id=1, username="testuser", email="test@example.com")
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = mock_get_current_user
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+    app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    cache = ResultCache(backend=MemoryBackend(), ttl=30, enabled=True)
+    loads = 0
+
+    async def slow_loader():
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.05)
+        return [1, 2, 3]
+
+    results = await asyncio.gather(*[cache.get_or_load("ns", "k", slow_loader, ints) for _ in range(20)])
+    assert loads == 1
+    assert all(result == [1, 2, 3] for result in results)
+    assert await cache.get_or_load("ns", "k", slow_loader, ints) == [1, 2, 3]
+    assert cache.stats() == {"backend": "memory", "hits": 1, "misses": 1, "coalesced": 19, "invalidations": 0, "hit_ratio": 20 / 21}
+
+@pytest.mark.asyncio
+async def test_failed_load_reaches_every_waiter_and_is_not_cached():
+    cache = ResultCache(backend=MemoryBackend(), ttl=30, enabled=True)
+
+    async def failing_loader():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("db down")
+
+    results = await asyncio.gather(*[cache.get_or_load("ns", "k", failing_loader, ints) for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    async def loader():
+        return [7]
+    assert await cache.get_or_load("ns", "k", loader, ints) == [7]
+
+@pytest.mark.asyncio
+async def test_cancelled_owner_leaves_waiters_to_load_again():
+    cache = ResultCache(backend=MemoryBackend(), ttl=30, enabled=True)
+    started = asyncio.Event()
+    loads = 0
+
+    async def loader():
+        nonlocal loads
+        loads += 1
+        started.set()
+        await asyncio.sleep(0.05)
+        return [loads]
+
+    owner = asyncio.create_task(cache.get_or_load("ns", "k", loader, ints))
+    await started.wait()
+    waiters = [asyncio.create_task(cache.get_or_load("ns", "k", loader, ints)) for _ in range(3)]
+    await asyncio.sleep(0)
+    # The client behind the first request disconnects mid-load
+    owner.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await owner
+    # One waiter takes over the load and the others share it
+    assert await asyncio.gather(*waiters) == [[2], [2], [2]]
+    assert loads == 2
+    assert cache.stats()["coalesced"] == 2
+
+@pytest.mark.asyncio
+async def test_stale_load_lands_in_a_dead_generation():
+    cache = ResultCache(backend=MemoryBackend(), ttl=30, enabled=True)
+    release = asyncio.Event()
+
+    async def old_snapshot():
+        await release.wait()
+        return [1]
+
+    # The reader looks up the generation, then a writer commits and invalidates
+    reader = asyncio.create_task(cache.get_or_load("ns", "k", old_snapshot, ints))
+    await asyncio.sleep(0)
+    await cache.invalidate("ns")
+    release.set()
+    assert await reader == [1]
+
+    async def fresh():
+        return [2]
+    assert await cache.get_or_load("ns", "k", fresh, ints) == [2]
+
+@pytest.mark.asyncio
+async def test_memory_backend_is_bounded_and_expires(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(result_cache_module.time, "monotonic", lambda: now[0])
+    backend = MemoryBackend(maxsize=2)
+    for key in ("a", "b", "c"):
+        await backend.set(key, b"1", ttl=10)
+    assert len(backend) == 2 and await backend.get("a") is None
+    now[0] = 11
+    assert await backend.get("c") is None
+
+@pytest.mark.asyncio
+async def test_shared_backend_invalidates_other_workers():
+    # Two processes' caches over one store, as with RESULT_CACHE_URL=redis://
+    shared = MemoryBackend()
+    worker_a = ResultCache(backend=shared, ttl=30, enabled=True)
+    worker_b = ResultCache(backend=shared, ttl=30, enabled=True)
+    data = [1]
+
+    async def loader():
+        return list(data)
+
+    assert await worker_a.get_or_load("clubs", "page", loader, ints) == [1]
+    data.append(2)
+    assert await worker_b.get_or_load("clubs", "page", loader, ints) == [1]
+    assert worker_b.hits == 1
+    await worker_a.invalidate("clubs")
+    assert await worker_b.get_or_load("clubs", "page", loader, ints) == [1, 2]
+
+@pytest.mark.asyncio
+async def test_club_listing_is_not_cached_per_process_by_default(client, listings, engine):
+    await client.post("/clubs", json={"name": "First", "description": "desc"})
+    await client.get("/clubs")
+    # Another worker creates a club: this process's memory cache never hears of it
+    async with engine.begin() as conn:
+        await conn.execute(models.Club.__table__.insert().values(name="Elsewhere", description="desc"))
+    res = await client.get("/clubs")
+    assert [club["name"] for club in res.json()] == ["First", "Elsewhere"]
+    assert listings.clubs == 2
+
+@pytest.mark.asyncio
+async def test_club_listing_is_cached_until_a_write(client, listings, monkeypatch):
+    # A single worker opts in to the memory backend
+    monkeypatch.setattr(result_cache, "unversioned_local", True)
+    await client.post("/clubs", json={"name": "First", "description": "desc"})
+    for _ in range(5):
+        res = await client.get("/clubs")
+    assert [club["name"] for club in res.json()] == ["First"]
+    assert listings.clubs == 1
+
+    res = await client.post("/clubs", json={"name": "Second", "description": "desc"})
+    club_id = res.json()["id"]
+    res = await client.get("/clubs")
+    assert [club["name"] for club in res.json()] == ["First", "Second"]
+    assert listings.clubs == 2
+
+    await client.put(f"/clubs/{club_id}", json={"name": "Renamed", "description": "desc"})
+    res = await client.get("/clubs")
+    assert res.json()[1]["name"] == "Renamed"
+    await client.delete(f"/clubs/{club_id}")
+    res = await client.get("/clubs")
+    assert len(res.json()) == 1
+    assert result_cache.stats()["hit_ratio"] == 4 / 8
+
+@pytest.mark.asyncio
+async def test_book_list_follows_votes(client, listings):
+    res = await client.post("/clubs", json={"name": "Club", "description": "desc"})
+    club_id = res.json()["id"]
+    res = await client.post(f"/clubs/{club_id}/books", json={"club_id": club_id, "title": "Book", "author": "A"})
+    book_id = res.json()["id"]
+
+    for _ in range(3):
+        res = await client.get(f"/clubs/{club_id}/books")
+    assert listings.books == 1
+    assert res.json()[0]["votes"] == 0
+
+    await client.get(f"/clubs/{club_id}/books/{book_id}/votes")
+    res = await client.get(f"/clubs/{club_id}/books")
+    assert res.json()[0]["votes"] == 1
+    await client.delete(f"/clubs/{club_id}/books/{book_id}/votes")
+    res = await client.get(f"/clubs/{club_id}/books")
+    assert res.json()[0]["votes"] == 0
+    assert listings.books == 3
+
+@pytest.mark.asyncio
+async def test_write_on_another_worker_never_serves_a_stale_body_under_the_new_etag(client, engine):
+    res = await client.post("/clubs", json={"name": "Club", "description": "desc"})
+    club_id = res.json()["id"]
+    res = await client.post(f"/clubs/{club_id}/books", json={"club_id": club_id, "title": "Book", "author": "A"})
+    res = await client.get(f"/clubs/{club_id}/books")
+    assert res.json()[0]["title"] == "Book"
+
+    # Another worker renames the book: the DB and the club version change, this process's memory cache doesn't hear of it
+    async with engine.begin() as conn:
+        await conn.execute(update(models.Book).values(title="Renamed"))
+        await conn.execute(update(models.Club).values(version=models.Club.version + 1))
+    res = await client.get(f"/clubs/{club_id}/books")
+    assert res.json()[0]["title"] == "Renamed"
+    etag = res.headers["etag"]
+    res = await client.get(f"/clubs/{club_id}/books", headers={"If-None-Match": etag})
+    assert res.status_code == 304
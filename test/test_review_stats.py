@@ -0,0 +1,187 @@
+import asyncio
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from main import app, get_db, get_current_user
+from app import models, schemas, crud
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    async def mock_get_current_user():
+        return models.User(id=1, username="testuser", email="test@example.com")
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = mock_get_current_user
+    yield SessionLocal
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+@pytest.fixture
+async def client(session_factory):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+
+@pytest.fixture
+async def book(client):
+    res = await client.post("/clubs", json={"name": "Stats Club", "description": "desc"})
+    club_id = res.json()["id"]
+    res = await client.post(f"/clubs/{club_id}/books", json={"club_id": club_id, "title": "Rated", "author": "A"})
+    return res.json()
+
+async def add_review(client, book, rating):
+    res = await client.post(
+        f"/clubs/{book['club_id']}/books/{book['id']}/reviews",
+        json={"club_id": book["club_id"], "book_id": book["id"], "user_id": 1, "rating": rating, "comment": "c"},
+    )
+    assert res.status_code == 201
+    return res.json()
+
+async def get_stats(client, book):
+    res = await client.get(f"/clubs/{book['club_id']}/books/{book['id']}/reviews/stats")
+    assert res.status_code == 200
+    return res.json()
+
+@pytest.mark.asyncio
+async def test_stats_follow_review_writes(client, book):
+    stats = await get_stats(client, book)
+    assert stats == {"book_id": book["id"], "review_count": 0, "average_rating": None, "histogram": {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}}
+
+    first = await add_review(client, book, 5)
+    await add_review(client, book, 4)
+    await add_review(client, book, 4)
+    stats = await get_stats(client, book)
+    assert stats["review_count"] == 3
+    assert stats["average_rating"] == 4.33
+    assert stats["histogram"] == {"1": 0, "2": 0, "3": 0, "4": 2, "5": 1}
+
+    res = await client.put(
+        f"/clubs/{book['club_id']}/books/{book['id']}/reviews/{first['id']}",
+        json={"id": first["id"], "club_id": book["club_id"], "book_id": book["id"], "rating": 1, "comment": "changed my mind"},
+    )
+    assert res.status_code == 200
+    stats = await get_stats(client, book)
+    assert stats["average_rating"] == 3.0
+    assert stats["histogram"] == {"1": 1, "2": 0, "3": 0, "4": 2, "5": 0}
+
+    res = await client.delete(f"/clubs/{book['club_id']}/books/{book['id']}/reviews/{first['id']}")
+    assert res.status_code == 204
+    stats = await get_stats(client, book)
+    assert stats["review_count"] == 2
+    assert stats["average_rating"] == 4.0
+    assert stats["histogram"]["1"] == 0
+
+@pytest.mark.asyncio
+async def test_ratings_outside_the_histogram_are_rejected(client, book):
+    url = f"/clubs/{book['club_id']}/books/{book['id']}/reviews"
+    for rating in (0, 6):
+        res = await client.post(url, json={"club_id": book["club_id"], "book_id": book["id"], "user_id": 1, "rating": rating, "comment": "c"})
+        assert res.status_code == 422
+    review = await add_review(client, book, 3)
+    res = await client.put(
+        f"{url}/{review['id']}",
+        json={"id": review["id"], "club_id": book["club_id"], "book_id": book["id"], "rating": 9, "comment": "c"},
+    )
+    assert res.status_code == 422
+    rows = [{"book_id": book["id"], "user_id": 1, "rating": rating, "comment": "bulk"} for rating in (4, -1)]
+    res = await client.post(f"/clubs/{book['club_id']}/reviews/bulk", json=rows)
+    assert res.json()["created"] == 1
+    stats = await get_stats(client, book)
+    assert stats["review_count"] == 2
+    assert stats["histogram"] == {"1": 0, "2": 0, "3": 1, "4": 1, "5": 0}
+
+@pytest.mark.asyncio
+async def test_book_out_carries_the_average(client, book):
+    await add_review(client, book, 2)
+    await add_review(client, book, 3)
+    res = await client.get(f"/clubs/{book['club_id']}/books/{book['id']}")
+    assert res.json()["review_count"] == 2
+    assert res.json()["average_rating"] == 2.5
+    res = await client.get(f"/clubs/{book['club_id']}/books")
+    assert res.json()[0]["average_rating"] == 2.5
+
+@pytest.mark.asyncio
+async def test_bulk_imported_reviews_are_counted(client, book):
+    rows = [{"book_id": book["id"], "user_id": 1, "rating": rating, "comment": "bulk"} for rating in (1, 2, 3, 4, 5)]
+    res = await client.post(f"/clubs/{book['club_id']}/reviews/bulk", json=rows)
+    assert res.json()["created"] == 5
+    stats = await get_stats(client, book)
+    assert stats["review_count"] == 5
+    assert stats["average_rating"] == 3.0
+
+@pytest.mark.asyncio
+async def test_rebuild_recovers_from_drift(client, book, session_factory):
+    await add_review(client, book, 5)
+    await add_review(client, book, 3)
+    async with session_factory() as db:
+        await db.execute(update(models.ReviewStats).values(review_count=40, rating_sum=7, rating_5=0))
+        await db.commit()
+    res = await client.get(f"/clubs/{book['club_id']}/books")
+    assert res.json()[0]["review_count"] == 40
+    etag = res.headers["etag"]
+    async with session_factory() as db:
+        assert await crud.rebuild_review_stats(db) == 1
+    # The book list shows the aggregates, so its ETag and cached body move too
+    res = await client.get(f"/clubs/{book['club_id']}/books", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.json()[0]["review_count"] == 2
+    stats = await get_stats(client, book)
+    assert stats["review_count"] == 2
+    assert stats["average_rating"] == 4.0
+    assert stats["histogram"] == {"1": 0, "2": 0, "3": 1, "4": 0, "5": 1}
+
+@pytest.mark.asyncio
+async def test_stats_for_missing_book(client, book):
+    res = await client.get(f"/clubs/{book['club_id']}/books/404/reviews/stats")
+    assert res.status_code == 404
+
+@pytest.mark.asyncio
+async def test_concurrent_updates_of_one_review_keep_stats_in_step(tmp_path):
+    # Separate connections to a file database, as concurrent requests would have
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'reviews.db'}")
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        async with SessionLocal() as db:
+            club = models.Club(name="Race Club")
+            db.add(club)
+            await db.flush()
+            book = models.Book(club_id=club.id, title="Raced")
+            db.add(book)
+            await db.commit()
+            review = await crud.create_review(db, schemas.ReviewCreate(club_id=club.id, book_id=book.id, user_id=1, rating=1, comment="c"))
+
+        async def rate(rating):
+            async with SessionLocal() as db:
+                await crud.update_review(db, schemas.ReviewUpdate(id=review.id, club_id=club.id, book_id=book.id, rating=rating, comment="c"))
+
+        await asyncio.gather(*[rate(rating) for _ in range(6) for rating in (2, 3, 4, 5, 1)])
+
+        columns = ["review_count", "rating_sum", *[f"rating_{rating}" for rating in models.ReviewStats.BUCKETS]]
+        async def snapshot():
+            async with SessionLocal() as db:
+                stats = await db.get(models.ReviewStats, book.id, populate_existing=True)
+                return {column: getattr(stats, column) for column in columns}
+
+        maintained = await snapshot()
+        async with SessionLocal() as db:
+            await crud.rebuild_review_stats(db, book_id=book.id)
+        assert maintained == await snapshot()
+        assert maintained["review_count"] == 1
+    finally:
+        await engine.dispose()
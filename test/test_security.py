@@ -18,10 +18,12 @@ async def override_get_db():
         yield db
 
 @pytest.fixture(autouse=True)
-def override_db_dependency():
+async def override_db_dependency():
     app.dependency_overrides[get_db] = override_get_db
     yield
     app.dependency_overrides.pop(get_db, None)
+    # aiosqlite runs each connection on a non-daemon thread; release it
+    await engine.dispose()
 
 @pytest.fixture
 async def prepare_db():
@@ -0,0 +1,97 @@
+import time
+from datetime import timedelta
+import pytest
+from httpx import AsyncClient, ASGITransport
+from jose import JWTError, ExpiredSignatureError
+from main import app
+from app import models
+from app.core import security
+from app.core.security import TokenCache, token_cache
+from app.core.user_cache import user_cache
+from app.core.rate_limit import limiter
+
+@pytest.fixture
+def decodes(monkeypatch):
+    calls = []
+    backend_decode = security.jwt_backend.decode
+    def counting(token):
+        calls.append(token)
+        return backend_decode(token)
+    monkeypatch.setattr(security.jwt_backend, "decode", counting)
+    return calls
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(security.time, "time", lambda: now[0])
+    return now
+
+def test_verified_tokens_are_decoded_once(decodes):
+    token = security.create_access_token({"sub": "alice"})
+    for _ in range(3):
+        assert security.decode_access_token(token)["sub"] == "alice"
+    assert len(decodes) == 1
+    assert token_cache.stats()["hits"] == 2
+
+def test_invalid_tokens_are_never_cached(decodes):
+    token = security.create_access_token({"sub": "alice"})
+    forged = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+    for _ in range(2):
+        with pytest.raises(JWTError):
+            security.decode_access_token(forged)
+    assert len(decodes) == 2
+    assert token_cache.stats()["size"] == 0
+
+def test_cached_claims_expire_like_jose(decodes, clock):
+    token = security.create_access_token({"sub": "alice"}, expires_delta=timedelta(seconds=60))
+    exp = security.decode_access_token(token)["exp"]
+    # jose accepts through the whole second named by exp and rejects after it
+    clock[0] = exp + 0.999
+    assert security.decode_access_token(token)["sub"] == "alice"
+    clock[0] = exp + 1
+    with pytest.raises(ExpiredSignatureError):
+        security.decode_access_token(token)
+    assert token_cache.stats()["size"] == 0
+    assert len(decodes) == 1
+
+def test_cache_is_bounded():
+    cache = TokenCache(maxsize=2)
+    for key in (b"a", b"b", b"c"):
+        cache.set(key, {"sub": key.decode()})
+    assert cache.get(b"a") is None
+    assert cache.get(b"c") == {"sub": "c"}
+
+@pytest.mark.asyncio
+async def test_expired_token_is_still_a_401(clock, monkeypatch):
+    # Only the cache sees the fake clock. The rate limiter's key lookup would evict the
+    # expired entry first, leaving get_current_user to jose and the real clock
+    monkeypatch.setattr(limiter, "enabled", False)
+    token = security.create_access_token({"sub": "alice"}, expires_delta=timedelta(seconds=60))
+    user_cache.set(models.User(id=1, username="alice", email="alice@example.com"))
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {token}"}
+        res = await client.get("/clubs/404/books/1/reviews/stats", headers=headers)
+        assert res.status_code == 404
+        clock[0] += 3600
+        res = await client.get("/clubs/404/books/1/reviews/stats", headers=headers)
+        assert res.status_code == 401
+        assert res.json() == {"detail": "Could not validate credentials"}
+        assert res.headers["www-authenticate"] == "Bearer"
+
+def test_pyjwt_backend_matches_jose(clock, monkeypatch):
+    pytest.importorskip("jwt")
+    # PyJWT warns about HMAC keys shorter than the 32 bytes SHA-256 wants
+    monkeypatch.setattr(security, "SECRET_KEY", "test-secret-key-that-is-at-least-32-bytes")
+    backend = security.PyJWTBackend()
+    token = security.create_access_token({"sub": "alice"}, expires_delta=timedelta(seconds=60))
+    assert backend.decode(token) == security.JoseBackend().decode(token)
+    assert security.JoseBackend().decode(backend.encode({"sub": "bob"})) == {"sub": "bob"}
+    with pytest.raises(JWTError):
+        backend.decode(token[:-2] + ("AA" if not token.endswith("AA") else "BB"))
+    expired = security.create_access_token({"sub": "alice"}, expires_delta=timedelta(seconds=-5))
+    with pytest.raises(ExpiredSignatureError):
+        backend.decode(expired)
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        security.build_jwt_backend("hs256-by-hand")
@@ -0,0 +1,106 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from main import app, get_db
+from app import models
+from app.core import user_cache as user_cache_module
+from app.core.user_cache import UserCache, user_cache
+
+# Setup in-memory DB
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+async def override_get_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+@pytest.fixture(autouse=True)
+async def override_db_dependency():
+    app.dependency_overrides[get_db] = override_get_db
+    yield
+    app.dependency_overrides.pop(get_db, None)
+    # aiosqlite runs each connection on a non-daemon thread; release it
+    await engine.dispose()
+
+@pytest.fixture
+async def prepare_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+def _user(username, user_id=1):
+    return models.User(id=user_id, username=username, email=f"{username}@example.com", hashed_password="x")
+
+def test_cache_hit_and_miss():
+    cache = UserCache(maxsize=10, ttl=60)
+    assert cache.get("alice") is None
+    cache.set(_user("alice"))
+    cached = cache.get("alice")
+    assert cached.username == "alice"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_cache_evicts_least_recently_used():
+    cache = UserCache(maxsize=2, ttl=60)
+    cache.set(_user("alice", 1))
+    cache.set(_user("bob", 2))
+    cache.get("alice")
+    cache.set(_user("carol", 3))
+    assert cache.get("bob") is None
+    assert cache.get("alice") is not None
+    assert cache.get("carol") is not None
+
+def test_cache_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(user_cache_module.time, "monotonic", lambda: now[0])
+    cache = UserCache(maxsize=10, ttl=30)
+    cache.set(_user("alice"))
+    now[0] += 29
+    assert cache.get("alice") is not None
+    now[0] += 2
+    assert cache.get("alice") is None
+    assert cache.stats()["size"] == 0
+
+def test_cache_invalidate():
+    cache = UserCache(maxsize=10, ttl=60)
+    cache.set(_user("alice", 1))
+    cache.set(_user("bob", 2))
+    cache.invalidate("alice")
+    assert cache.get("alice") is None
+    assert cache.get("bob") is not None
+    cache.invalidate()
+    assert cache.stats()["size"] == 0
+
+@pytest.mark.asyncio
+async def test_warm_cache_skips_users_query(prepare_db):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        user_data = {"email": "cached@example.com", "username": "cacheduser", "password": "password", "fullName": "Cached User"}
+        await client.post("/auth/register", json=user_data)
+        login_res = await client.post("/token", data={"username": "cacheduser", "password": "password"})
+        headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine.sync_engine, "before_cursor_execute", record)
+        try:
+            res = await client.get("/clubs", headers=headers)
+            assert res.status_code == 200
+            assert any("FROM users" in s for s in statements)
+
+            statements.clear()
+            res = await client.get("/clubs", headers=headers)
+            assert res.status_code == 200
+            assert not any("FROM users" in s for s in statements)
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+        assert user_cache.stats()["hits"] >= 1
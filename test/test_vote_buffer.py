@@ -0,0 +1,147 @@
+import asyncio
+import pytest
+from fastapi import Request
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from main import app, get_db, get_current_user
+from app import models
+from app.core.vote_buffer import vote_buffer
+
+VOTERS = 500
+
+@pytest.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'vote_buffer.db'}",
+        connect_args={"timeout": 60},
+        pool_size=10,
+        pool_timeout=60,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+class CommitCounter:
+    def __init__(self):
+        self.count = 0
+
+@pytest.fixture
+def commits(engine):
+    # Count COMMITs actually sent to the database
+    counter = CommitCounter()
+    @event.listens_for(engine.sync_engine, "commit")
+    def count_commit(conn):
+        counter.count += 1
+    return counter
+
+@pytest.fixture
+async def session_factory(engine):
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    async def override_get_current_user(request: Request):
+        user_id = int(request.headers["X-User-Id"])
+        return models.User(id=user_id, username=f"voter{user_id}", email=f"voter{user_id}@example.com")
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = override_get_current_user
+    yield SessionLocal
+    await vote_buffer.stop()
+    app.dependency_overrides.clear()
+
+@pytest.fixture
+async def book(session_factory):
+    async with session_factory() as db:
+        club = models.Club(name="Buffer Club", description="Desc")
+        db.add(club)
+        await db.flush()
+        book = models.Book(club_id=club.id, title="Buffer Book", author="Author", votes=0)
+        db.add(book)
+        await db.commit()
+        return book
+
+@pytest.fixture
+async def client():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+
+async def _stored_votes(session_factory, book_id):
+    async with session_factory() as db:
+        result = await db.execute(select(models.Book.votes).filter(models.Book.id == book_id))
+        return result.scalar_one()
+
+async def _vote_all(client, url, voters):
+    return await asyncio.gather(*[
+        client.get(url, headers={"X-User-Id": str(user_id)}) for user_id in voters
+    ])
+
+@pytest.mark.asyncio
+async def test_buffered_votes_reduce_commits(commits, session_factory, book, client):
+    url = f"/clubs/{book.club_id}/books/{book.id}/votes"
+
+    # Direct path: one commit per vote
+    commits.count = 0
+    await _vote_all(client, url, range(1, VOTERS + 1))
+    direct_commits = commits.count
+    assert direct_commits == VOTERS
+
+    # Buffered path: flushed every 100 votes
+    vote_buffer.flush_ms, vote_buffer.max_pending = 60_000, 100
+    vote_buffer.start(session_factory)
+    commits.count = 0
+    responses = await _vote_all(client, url, range(VOTERS + 1, 2 * VOTERS + 1))
+    assert all(r.status_code == 200 for r in responses)
+    await vote_buffer.stop()
+    buffered_commits = commits.count
+
+    assert await _stored_votes(session_factory, book.id) == 2 * VOTERS
+    assert buffered_commits <= VOTERS // 100 + 1
+    print(f"\n{VOTERS} votes: {direct_commits} commits direct, {buffered_commits} commits buffered")
+
+@pytest.mark.asyncio
+async def test_buffered_votes_are_read_your_writes(commits, session_factory, book, client):
+    url = f"/clubs/{book.club_id}/books/{book.id}/votes"
+    vote_buffer.flush_ms, vote_buffer.max_pending = 60_000, 10_000
+    vote_buffer.start(session_factory)
+
+    commits.count = 0
+    await _vote_all(client, url, range(1, 11))
+    assert commits.count == 0
+    assert await _stored_votes(session_factory, book.id) == 0
+
+    headers = {"X-User-Id": "1"}
+    res = await client.get(f"/clubs/{book.club_id}/books/{book.id}", headers=headers)
+    assert res.json()["votes"] == 10
+    res = await client.get(f"/clubs/{book.club_id}/books", headers=headers)
+    assert res.json()[0]["votes"] == 10
+
+    # Same user can't vote twice, whether the first vote is pending or stored
+    res = await client.get(url, headers=headers)
+    assert res.status_code == 409
+    await vote_buffer.flush()
+    res = await client.get(url, headers=headers)
+    assert res.status_code == 409
+
+    # Taking back a stored vote and a pending vote
+    res = await client.delete(url, headers=headers)
+    assert res.status_code == 204
+    res = await client.get(url, headers={"X-User-Id": "11"})
+    assert res.json() == 10
+    res = await client.delete(url, headers={"X-User-Id": "11"})
+    assert res.status_code == 204
+    res = await client.delete(url, headers={"X-User-Id": "11"})
+    assert res.status_code == 404
+
+    await vote_buffer.stop()
+    assert await _stored_votes(session_factory, book.id) == 9
+    async with session_factory() as db:
+        result = await db.execute(select(models.BookVote.user_id).filter(models.BookVote.book_id == book.id))
+        assert sorted(result.scalars().all()) == list(range(2, 11))
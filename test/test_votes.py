@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+from fastapi import Request
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from main import app, get_db, get_current_user
+from app import models, crud
+from app.core.exceptions import ItemNotFound, ItemAlreadyExists
+
+VOTERS = 2000
+
+# Concurrent voting needs a real connection pool, so use a file DB instead of :memory:
+@pytest.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'votes.db'}",
+        connect_args={"timeout": 60},
+        pool_size=10,
+        pool_timeout=60,
+    )
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    # Each request votes as the user named in the X-User-Id header
+    async def override_get_current_user(request: Request):
+        user_id = int(request.headers["X-User-Id"])
+        return models.User(id=user_id, username=f"voter{user_id}", email=f"voter{user_id}@example.com")
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = override_get_current_user
+    yield SessionLocal
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+@pytest.fixture
+async def book(session_factory):
+    async with session_factory() as db:
+        club = models.Club(name="Vote Club", description="Desc")
+        db.add(club)
+        await db.flush()
+        book = models.Book(club_id=club.id, title="Vote Book", author="Author", votes=0)
+        db.add(book)
+        await db.commit()
+        return book
+
+async def _current_votes(session_factory, book_id):
+    async with session_factory() as db:
+        result = await db.execute(select(models.Book.votes).filter(models.Book.id == book_id))
+        return result.scalar_one()
+
+@pytest.mark.asyncio
+async def test_parallel_votes_are_not_lost(session_factory, book):
+    url = f"/clubs/{book.club_id}/books/{book.id}/votes"
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        responses = await asyncio.gather(*[
+            client.get(url, headers={"X-User-Id": str(user_id)}) for user_id in range(1, VOTERS + 1)
+        ])
+        assert all(r.status_code == 200 for r in responses)
+        assert sorted(r.json() for r in responses) == list(range(1, VOTERS + 1))
+        assert await _current_votes(session_factory, book.id) == VOTERS
+
+        # Half of the voters change their minds at the same time
+        responses = await asyncio.gather(*[
+            client.delete(url, headers={"X-User-Id": str(user_id)}) for user_id in range(1, VOTERS // 2 + 1)
+        ])
+        assert all(r.status_code == 204 for r in responses)
+        assert await _current_votes(session_factory, book.id) == VOTERS - VOTERS // 2
+
+@pytest.mark.asyncio
+async def test_parallel_duplicate_votes_count_once(session_factory, book):
+    url = f"/clubs/{book.club_id}/books/{book.id}/votes"
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        responses = await asyncio.gather(*[
+            client.get(url, headers={"X-User-Id": "1"}) for _ in range(50)
+        ])
+    codes = sorted(r.status_code for r in responses)
+    assert codes.count(200) == 1
+    assert codes.count(409) == 49
+    assert await _current_votes(session_factory, book.id) == 1
+
+@pytest.mark.asyncio
+async def test_vote_for_missing_book_is_404_with_foreign_keys_enforced(tmp_path):
+    # PostgreSQL checks the ledger's foreign keys; SQLite only does with the pragma on
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'fk.db'}")
+    @event.listens_for(engine.sync_engine, "connect")
+    def enable_foreign_keys(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        async with SessionLocal() as db:
+            db.add(models.User(id=1, username="voter", email="voter@example.com", hashed_password="x"))
+            club = models.Club(name="FK Club")
+            db.add(club)
+            await db.flush()
+            book = models.Book(club_id=club.id, title="FK Book")
+            db.add(book)
+            await db.commit()
+            club_id, book_id = club.id, book.id
+
+            with pytest.raises(ItemNotFound):
+                await crud.add_votes_by_book_id(db, book_id=404, club_id=club_id, user_id=1)
+            assert await crud.add_votes_by_book_id(db, book_id=book_id, club_id=club_id, user_id=1) == 1
+            with pytest.raises(ItemAlreadyExists):
+                await crud.add_votes_by_book_id(db, book_id=book_id, club_id=club_id, user_id=1)
+            # The failed duplicate rolled its increment back
+            assert (await db.execute(select(models.Book.votes).filter(models.Book.id == book_id))).scalar_one() == 1
+    finally:
+        await engine.dispose()